@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Body, HTTPException
-from pydantic import BaseModel
-from ..services.analysis_service import AnalysisService
+import json
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from ..core.config import settings
+from ..services.analysis_service import get_analysis_service
+from ..utils.fast_json import dumps
 from ..utils.logger import logger
 
 router = APIRouter()
-analysis_service = AnalysisService()
+analysis_service = get_analysis_service()
 
 class AnalysisRequest(BaseModel):
     text: str
@@ -36,4 +43,115 @@ def analyze_text(request: AnalysisRequest):
         
     except Exception as e:
         logger.error(f"处理情感分析请求时发生错误: {e}")
-        raise HTTPException(status_code=500, detail="处理请求时发生内部错误。")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="处理请求时发生内部错误。")
+
+
+class BatchAnalysisRequest(BaseModel):
+    # 每一项是字符串或 {"id": ..., "text": ...}；逐项在 _parse_item 中校验，单项格式错误不拒绝整个请求
+    texts: List[Any] = Field(..., min_length=1)
+
+# (输入序号, 调用方给的 id, 文本；解析失败时为 None, 错误信息)
+_Item = Tuple[int, Any, Optional[str], Optional[str]]
+
+def _parse_item(index: int, value: Any) -> _Item:
+    if isinstance(value, str):
+        return index, None, value, None
+    if isinstance(value, dict) and isinstance(value.get("text"), str):
+        return index, value.get("id"), value["text"], None
+    return index, None, None, "每一项必须是字符串或包含 text 字段的对象"
+
+def _ndjson_lines(body: bytes) -> List[bytes]:
+    """NDJSON 请求体：每行一个字符串或 {"id": ..., "text": ...}，空行忽略"""
+    return [line for line in body.split(b"\n") if line.strip()]
+
+def _ndjson_items(lines: List[bytes]) -> Iterator[_Item]:
+    for index, line in enumerate(lines):
+        try:
+            yield _parse_item(index, json.loads(line))
+        except ValueError as e:
+            yield index, None, None, f"JSON 解析失败: {e}"
+
+def _json_items(payload: BatchAnalysisRequest) -> Iterator[_Item]:
+    for index, value in enumerate(payload.texts):
+        yield _parse_item(index, value)
+
+def _score_chunk(chunk: List[_Item]) -> bytes:
+    """一次向量化打分一整块，输出对应的 NDJSON 行"""
+    scorable = [item for item in chunk if item[2] is not None]
+    scores = iter(analysis_service.score_batch([item[2] for item in scorable]))
+    lines = []
+    for index, item_id, text, error in chunk:
+        if text is None:
+            record = {"index": index, "error": error}
+        else:
+            score = next(scores)
+            record = {"index": index, "sentiment": analysis_service.label(score), "score": score}
+        if item_id is not None:
+            record["id"] = item_id
+        lines.append(dumps(record))
+    return b"\n".join(lines) + b"\n"
+
+async def _stream_scores(items: Iterator[_Item]) -> AsyncIterator[bytes]:
+    """按块打分，每块算完立即输出，不必等整批完成"""
+    chunk: List[_Item] = []
+    total = 0
+    for item in items:
+        chunk.append(item)
+        total += 1
+        if len(chunk) >= settings.ANALYSIS_BATCH_CHUNK_SIZE:
+            yield await run_in_threadpool(_score_chunk, chunk)
+            chunk = []
+    if chunk:
+        yield await run_in_threadpool(_score_chunk, chunk)
+    logger.info(f"批量情感分析完成，共 {total} 条文本。")
+
+def _check_count(count: int) -> None:
+    if count > settings.ANALYSIS_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=413, detail=f"共 {count} 条文本，超过单次请求上限 {settings.ANALYSIS_BATCH_MAX_TEXTS} 条"
+        )
+
+async def _read_body(request: Request) -> bytes:
+    """读取请求体：先看 Content-Length，再边读边计数，超过 ANALYSIS_BATCH_MAX_BYTES 时返回 413"""
+    limit = settings.ANALYSIS_BATCH_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail=f"请求体超过上限 {limit} 字节")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+@router.post("/batch")
+async def analyze_batch(request: Request):
+    """
+    批量情感分析，结果以 NDJSON 逐块流式返回 (每行 {"index", "sentiment", "score"}，输入带 id 时原样带回)。
+
+    - 请求体为 JSON：{"texts": ["...", {"id": 1, "text": "..."}]}；
+    - 或 Content-Type 为 application/x-ndjson：每行一个字符串或 {"id": ..., "text": ...}。
+    单条格式错误时该行返回 {"index", "error"}，不影响其余文本。
+    请求体超过 ANALYSIS_BATCH_MAX_BYTES 或文本超过 ANALYSIS_BATCH_MAX_TEXTS 条时整个请求返回 413，不做截断。
+    """
+    # 请求体在返回流式响应之前读完：流式响应发送期间 receive 通道用于监听客户端断开
+    body = await _read_body(request)
+    if "ndjson" in request.headers.get("content-type", ""):
+        lines = _ndjson_lines(body)
+        _check_count(len(lines))
+        items = _ndjson_items(lines)
+    else:
+        # 先数条数再逐项校验，超限的请求不必为每一项构建校验结果
+        try:
+            raw = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"JSON 解析失败: {e}")
+        if isinstance(raw, dict) and isinstance(raw.get("texts"), list):
+            _check_count(len(raw["texts"]))
+        try:
+            payload = BatchAnalysisRequest.model_validate(raw)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+        items = _json_items(payload)
+    return StreamingResponse(_stream_scores(items), media_type="application/x-ndjson")
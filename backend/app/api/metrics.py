@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from ..utils.metrics import collect_metrics
+
+router = APIRouter()
+
+@router.get("/")
+async def get_metrics():
+    """
+    输出进程内各组件的运行统计（请求合并、缓存命中等）。
+    """
+    return collect_metrics()
@@ -1,17 +1,31 @@
+import asyncio
+from contextlib import aclosing
 from fastapi import APIRouter, Query, HTTPException
 from fastapi.concurrency import run_in_threadpool
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncIterator, Literal, Optional, Tuple
 from ..core.config import settings
+from ..utils.cache import LRUCache
+from ..utils.fast_json import FastJSONResponse, dumps
 from ..utils.logger import logger
+from ..utils.metrics import register_metrics
+from ..utils.query import normalize_query
+from ..utils.single_flight import SingleFlight
 from ..services.working_social_media_service import WorkingSocialMediaService
+from ..services.fan_out import BatchCallback, FanOutResult, fan_out
+from ..services.result_cache import TieredResultCache
+from ..services.incremental_collector import IncrementalCollector
 from ..services.llm_service import get_llm_provider
 from ..data.models.database import RawPost
+from ..data.collectors.scheduler import CollectionScheduler
+from ..data.processors.dedup import NearDuplicateFilter
+from ..data.processors.ranking import post_engagement
 
 router = APIRouter()
 
 # 初始化服务
 social_media_service = WorkingSocialMediaService()
-logger.info("使用可工作的社交媒体服务 (PowerShell curl)")
+logger.info("使用可工作的社交媒体服务 (共享 HTTP 传输层)")
 
 # 在应用启动时获取一次 LLM 提供者实例
 try:
@@ -21,12 +35,165 @@ except ValueError as e:
     llm_provider = None
     logger.error(f"LLM 服务初始化失败: {e}")
 
+# 基于水位线的增量收集：只抓取新帖子，再与已入库的帖子合并
+incremental_collector = IncrementalCollector(merge_limit=settings.INCREMENTAL_MERGE_LIMIT)
+
+# 后台定时收集跟踪的关键词，由 main.py 的 lifespan 启动
+collection_scheduler = CollectionScheduler(
+    sources={
+        "twitter": lambda query: lambda since_id=None: social_media_service.iter_twitter_posts(query, since_id=since_id),
+        "reddit": lambda query: lambda since_id=None: social_media_service.iter_reddit_posts(query, since_id=since_id),
+    },
+    collector=incremental_collector,
+    tracked_keywords=settings.TRACKED_KEYWORDS,
+    refresh_interval=settings.SCHEDULER_REFRESH_SECONDS,
+    fresh_for=settings.SCHEDULER_FRESH_SECONDS,
+    tick_interval=settings.SCHEDULER_TICK_SECONDS,
+    workers=settings.SCHEDULER_WORKERS,
+    source_concurrency=settings.SCHEDULER_SOURCE_CONCURRENCY,
+    job_timeout=settings.SOURCE_TIMEOUT_SECONDS,
+    max_tracked=settings.SCHEDULER_MAX_TRACKED,
+    popularity_half_life=settings.SCHEDULER_POPULARITY_HALF_LIFE_SECONDS,
+    min_popularity=settings.SCHEDULER_MIN_POPULARITY,
+    max_backoff=settings.SCHEDULER_MAX_BACKOFF_SECONDS,
+)
+register_metrics("collection_scheduler", collection_scheduler.stats)
+
+# 送入 LLM 采样前去掉近似重复的帖子 (转发、模板内容)，每组保留互动量得分 (点赞、转发、粉丝) 最高的一条
+near_duplicate_filter = NearDuplicateFilter(threshold=settings.NEAR_DUPLICATE_THRESHOLD)
+register_metrics("near_duplicate_filter", near_duplicate_filter.stats)
+
+# 相同关键词的并发请求共享同一次抓取和 LLM 调用
+trend_requests = SingleFlight()
+register_metrics("trend_single_flight", trend_requests.stats)
+
+def _is_cacheable(result: List[Dict[str, Any]]) -> bool:
+    """
+    空结果、LLM 失败的结果和降级的本地结果不进入缓存 (后者等 LLM 结果写入洞察缓存后再请求即可拿到)；
+    有数据源超时或错过截止时间的部分结果也不缓存，否则一次慢响应会让缺了数据源的洞察在整个 TTL + stale 窗口内被复用
+    """
+    return (
+        bool(result)
+        and result[0].get("category") != "Error"
+        and not result[0].get("degraded")
+        and not result[0].get("missed_sources")
+    )
+
+result_cache = TieredResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    memory_ttl=settings.RESULT_CACHE_MEMORY_TTL_SECONDS,
+    persistent_ttl=settings.RESULT_CACHE_PERSISTENT_TTL_SECONDS,
+    stale_ttl=settings.RESULT_CACHE_STALE_SECONDS,
+    persistent=settings.RESULT_CACHE_PERSISTENT,
+    cacheable=_is_cacheable,
+)
+register_metrics("trend_result_cache", result_cache.stats)
+
+# 快速响应模式下缓存结果对应的已序列化字节：缓存键 -> (结果对象, JSON 字节)
+# 同一个缓存结果对象只序列化一次，之后的命中直接输出字节
+serialized_results = LRUCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.RESULT_CACHE_PERSISTENT_TTL_SECONDS + settings.RESULT_CACHE_STALE_SECONDS,
+)
+
+def _fast_response(key: str, result: List[Dict[str, Any]]) -> FastJSONResponse:
+    """绕过 response_model 的重新校验，直接输出 (可复用的) 预序列化字节"""
+    cached = serialized_results.get(key)
+    if cached is not None and cached[0][0] is result:
+        return FastJSONResponse(cached[0][1])
+    body = dumps(result)
+    if _is_cacheable(result):
+        serialized_results.set(key, (result, body))
+    return FastJSONResponse(body)
+
+async def _collect_posts(
+    query: str, on_batch: Optional[BatchCallback] = None
+) -> Tuple[FanOutResult, List[RawPost]]:
+    """
+    抓取并去重：返回各数据源的抓取结果，以及转换为 RawPost 的去重后帖子
+    (先按 URL 去重，再去掉近似重复的文本)。
+    """
+    # 1. 同时从所有平台获取原始数据，单个数据源超时不会拖住整个请求
+    sources = {
+        "twitter": lambda since_id=None: social_media_service.iter_twitter_posts(query, since_id=since_id),
+        "reddit": lambda since_id=None: social_media_service.iter_reddit_posts(query, since_id=since_id),
+    }
+    if settings.INCREMENTAL_COLLECTION_ENABLED:
+        sources = {
+            platform: (lambda platform=platform, stream=stream: incremental_collector.iter_posts(platform, query, stream))
+            for platform, stream in sources.items()
+        }
+    upstream = set(sources)
+    if settings.SCHEDULER_ENABLED:
+        # 最近收集过的数据源直接读本地数据
+        for platform in sources:
+            if collection_scheduler.is_fresh(platform, query):
+                sources[platform] = lambda platform=platform: incremental_collector.iter_stored_posts(platform, query)
+                upstream.discard(platform)
+    fan_out_result = await fan_out(
+        sources,
+        per_source_timeout=settings.SOURCE_TIMEOUT_SECONDS,
+        deadline=settings.FANOUT_DEADLINE_SECONDS,
+        on_batch=on_batch,
+    )
+    if settings.SCHEDULER_ENABLED:
+        # 本次请求已经完整地从上游收集过，后台不必马上重复收集 (也避免与后台同时写入相同的帖子)
+        for platform in upstream - set(fan_out_result.missed_sources):
+            collection_scheduler.mark_collected(platform, query)
+    
+    unique_posts_map = {post['url']: post for post in fan_out_result.all_posts}
+    unique_posts = list(unique_posts_map.values())
+    
+    # 2. 将字典列表转换为 RawPost 对象列表以供 LLM 服务使用
+    raw_posts_for_analysis = [
+        RawPost(
+            platform=post.get('platform', 'Unknown'),
+            author=post.get('author', 'Unknown'),
+            text=post.get('text') or post.get('title', ''), # 没有正文时回退到 'title'
+            url=post.get('url', ''),
+            likes=int(post.get('likes', post.get('upvotes', post.get('score', 0)))), # Reddit 使用 'upvotes'/'score'
+            created_at=post.get('created_at'),
+            retweets=int(post.get('retweets', post.get('comments', 0)) or 0), # Reddit 以评论数代替转发数
+            followers=int((post.get('user_info') or {}).get('followers', 0) or 0),
+        ) for post in unique_posts
+    ]
+    if settings.NEAR_DUPLICATE_FILTER_ENABLED:
+        # MinHash 计算是纯 CPU 开销，放到线程池里，避免阻塞事件循环
+        raw_posts_for_analysis = await run_in_threadpool(
+            near_duplicate_filter.filter, raw_posts_for_analysis, engagement=post_engagement
+        )
+    return fan_out_result, raw_posts_for_analysis
+
+async def _analyze_query(query: str, tier: str) -> List[Dict[str, Any]]:
+    """
+    执行一次完整的趋势分析：抓取 -> 去重 -> LLM 生成洞察 (按 tier 选择模型档位)。
+    """
+    fan_out_result, raw_posts_for_analysis = await _collect_posts(query)
+    if not raw_posts_for_analysis:
+        logger.warning(f"查询 '{query}' 未找到任何帖子。")
+        return []
+
+    logger.info(f"为查询 '{query}' 收集了 {len(raw_posts_for_analysis)} 条独特的帖子，正在发送给 LLM 进行分析...")
+
+    # 3. 异步调用 LLM 分析，等待期间不占用线程池
+    analysis_result = await llm_provider.agenerate_insights_for_cluster(raw_posts_for_analysis, tier=tier)
+    
+    analysis_result["missed_sources"] = sorted(fan_out_result.missed_sources)
+    logger.info(f"已成功为查询 '{query}' 生成分析洞察。")
+    
+    # 4. API希望返回一个列表，所以我们将单个分析结果包装在列表中
+    return [analysis_result]
+
 @router.get("/", response_model=List[Dict[str, Any]])
-async def get_trends(query: str = Query(..., min_length=1, max_length=50)):
+async def get_trends(
+    query: str = Query(..., min_length=1, max_length=50),
+    tier: Optional[Literal["fast", "quality"]] = Query(None),
+):
     """
     获取并分析社交媒体趋势，返回一个包含洞察的单一分析结果。
     
     - **query**: 用于搜索的关键词。
+    - **tier**: 模型档位，fast (小模型，更快) 或 quality (默认档位由 LLM_DEFAULT_TIER 配置)。
     """
     logger.info(f"收到趋势分析请求，查询: '{query}'")
     
@@ -34,42 +201,101 @@ async def get_trends(query: str = Query(..., min_length=1, max_length=50)):
         raise HTTPException(status_code=503, detail="LLM服务未配置或初始化失败，无法处理分析。")
 
     try:
-        # 1. 从不同平台获取原始数据
-        twitter_posts = await social_media_service.get_twitter_posts(query)
-        reddit_posts = await social_media_service.get_reddit_posts(query)
-        
-        all_posts = twitter_posts + reddit_posts
-        if not all_posts:
-            logger.warning(f"查询 '{query}' 未找到任何帖子。")
-            return []
-
-        unique_posts_map = {post['url']: post for post in all_posts}
-        unique_posts = list(unique_posts_map.values())
-        
-        # 2. 将字典列表转换为 RawPost 对象列表以供 LLM 服务使用
-        raw_posts_for_analysis = [
-            RawPost(
-                platform=post.get('platform', 'Unknown'),
-                author=post.get('author', 'Unknown'),
-                text=post.get('title', ''), # 将 'title' 映射到 'text'
-                url=post.get('url', ''),
-                likes=int(post.get('score', 0)), # 将 'score' 映射到 'likes'
-                created_at=post.get('created_at')
-            ) for post in unique_posts
-        ]
-
-        logger.info(f"为查询 '{query}' 收集了 {len(raw_posts_for_analysis)} 条独特的帖子，正在发送给 LLM 进行分析...")
-
-        # 3. 在线程池中运行 LLM 分析，避免阻塞事件循环
-        analysis_result = await run_in_threadpool(
-            llm_provider.generate_insights_for_cluster, raw_posts_for_analysis
-        )
-        
-        logger.info(f"已成功为查询 '{query}' 生成分析洞察。")
-        
-        # 4. API希望返回一个列表，所以我们将单个分析结果包装在列表中
-        return [analysis_result]
+        key = normalize_query(query)
+        tier = tier or settings.LLM_DEFAULT_TIER
+        if settings.SCHEDULER_ENABLED and settings.SCHEDULER_TRACK_REQUESTS:
+            collection_scheduler.track(key)
+        compute = lambda: trend_requests.do(f"{tier}:{key}", lambda: _analyze_query(key, tier))
+        if not settings.RESULT_CACHE_ENABLED:
+            result = await compute()
+        else:
+            result = await result_cache.get_or_compute(f"trends:{tier}:{key}", compute)
+        if settings.FAST_JSON_RESPONSES:
+            return _fast_response(f"trends:{tier}:{key}", result)
+        return result
         
     except Exception as e:
         logger.error(f"处理趋势分析请求时发生严重错误: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"处理请求时发生内部错误: {str(e)}")
+
+
+def _sse(event: str, data: Any) -> str:
+    """格式化一条 server-sent event"""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+async def _stream_analysis(query: str, tier: str) -> AsyncIterator[str]:
+    """
+    以 SSE 事件流的形式执行趋势分析：
+    stage (阶段进度) / batch (某个数据源到达一批帖子) / token (LLM 输出片段) / result (最终结果) / error
+    客户端断开时生成器被取消，正在进行的抓取和 LLM 请求随之取消。
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_batch(source: str, batch: List[Dict[Any, Any]]):
+        events.put_nowait(_sse("batch", {"source": source, "posts": len(batch)}))
+
+    yield _sse("stage", {"stage": "collecting", "query": query})
+    collect = asyncio.create_task(_collect_posts(query, on_batch))
+    collect.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        fan_out_result, raw_posts = collect.result()
+    except Exception as e:
+        logger.error(f"流式分析 '{query}' 抓取阶段失败: {e}", exc_info=True)
+        yield _sse("error", {"detail": f"处理请求时发生内部错误: {str(e)}"})
+        return
+    finally:
+        collect.cancel()
+
+    missed_sources = sorted(fan_out_result.missed_sources)
+    yield _sse("stage", {
+        "stage": "sources_fetched",
+        "posts_by_source": {name: len(posts) for name, posts in fan_out_result.posts_by_source.items()},
+        "missed_sources": missed_sources,
+    })
+    yield _sse("stage", {"stage": "deduplicated", "unique_posts": len(raw_posts)})
+    if not raw_posts:
+        logger.warning(f"查询 '{query}' 未找到任何帖子。")
+        yield _sse("result", [])
+        return
+
+    yield _sse("stage", {"stage": "analyzing"})
+    try:
+        async with aclosing(llm_provider.astream_insights_for_cluster(raw_posts, tier=tier)) as stream:
+            async for event in stream:
+                if event["type"] == "token":
+                    yield _sse("token", {"content": event["content"]})
+                else:
+                    analysis_result = event["data"]
+                    analysis_result["missed_sources"] = missed_sources
+                    yield _sse("result", [analysis_result])
+    except Exception as e:
+        logger.error(f"流式分析 '{query}' LLM 阶段失败: {e}", exc_info=True)
+        yield _sse("error", {"detail": f"处理请求时发生内部错误: {str(e)}"})
+
+@router.get("/stream")
+async def stream_trends(
+    query: str = Query(..., min_length=1, max_length=50),
+    tier: Optional[Literal["fast", "quality"]] = Query(None),
+):
+    """
+    get_trends 的流式版本 (text/event-stream)：边抓取边推送进度，随后逐段推送 LLM 输出，
+    最后以 result 事件返回与 get_trends 相同结构的分析结果。
+
+    - **query**: 用于搜索的关键词。
+    - **tier**: 模型档位，同 get_trends。
+    """
+    logger.info(f"收到流式趋势分析请求，查询: '{query}'")
+
+    if not llm_provider:
+        raise HTTPException(status_code=503, detail="LLM服务未配置或初始化失败，无法处理分析。")
+
+    key = normalize_query(query)
+    if settings.SCHEDULER_ENABLED and settings.SCHEDULER_TRACK_REQUESTS:
+        collection_scheduler.track(key)
+    return StreamingResponse(
+        _stream_analysis(key, tier or settings.LLM_DEFAULT_TIER),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
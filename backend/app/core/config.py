@@ -1,4 +1,5 @@
 import os
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -38,9 +39,81 @@ class Settings(BaseSettings):
     # We set a default value to avoid Pydantic validation errors if the key is not set,
     # but our application logic will check for its presence.
     ZHIPU_API_KEY: str = "not_set"
+    # Insights are cached in the llm_insight_cache table, keyed by a hash of
+    # (model, prompt version, normalized sampled texts); the least recently
+    # hit entries are evicted beyond LLM_CACHE_MAX_ENTRIES.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    # The API calls GLM asynchronously over a keep-alive pool; at most
+    # LLM_MAX_CONCURRENCY requests are in flight, the rest wait their turn.
+    LLM_API_BASE: str = "https://open.bigmodel.cn/api/paas/v4"
+    LLM_MAX_CONCURRENCY: int = 64
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # Routing: requests ask for the "fast" or "quality" tier (LLM_DEFAULT_TIER
+    # by default). Models are tried in order of moving-average latency plus
+    # error rate, each attempt cut off after LLM_ATTEMPT_TIMEOUT_SECONDS; once
+    # LLM_ROUTER_DEADLINE_SECONDS are spent, or with no ZhipuAI key, the local
+    # keyword-based provider answers instead (unless LLM_LOCAL_FALLBACK is off).
+    # Both are per GLM round trip (a glm-4 call takes 10-30 s): map-reduce
+    # requests, which make a map wave or more plus the reduce call, get a
+    # proportionally longer attempt timeout and deadline.
+    LLM_FAST_MODELS: List[str] = ["glm-4-flash"]
+    LLM_QUALITY_MODELS: List[str] = ["glm-4"]
+    LLM_DEFAULT_TIER: str = "quality"
+    LLM_ATTEMPT_TIMEOUT_SECONDS: float = 40.0
+    LLM_ROUTER_DEADLINE_SECONDS: float = 90.0
+    LLM_LOCAL_FALLBACK: bool = True
+    LLM_ROUTER_EWMA_ALPHA: float = 0.2
+    LLM_ROUTER_ERROR_HALF_LIFE_SECONDS: float = 120.0
+    # Latency budget for /trends: without a model answer after
+    # LLM_LATENCY_BUDGET_SECONDS the local insight is returned flagged
+    # "degraded" (and not result-cached); the model call finishes in the
+    # background and fills the LLM insight cache. Off (0) by default: typical
+    # GLM latency exceeds any useful budget, so most requests would degrade.
+    LLM_LATENCY_BUDGET_SECONDS: float = 0.0
+    # Prompt packing: the whole insight prompt (template + posts) is kept
+    # within LLM_PROMPT_TOKEN_BUDGET estimated GLM tokens. At most
+    # LLM_PROMPT_MAX_POSTS posts are packed, each trimmed to between
+    # LLM_POST_MIN_TOKENS and LLM_POST_MAX_TOKENS.
+    LLM_PROMPT_TOKEN_BUDGET: int = 3000
+    LLM_PROMPT_MAX_POSTS: int = 40
+    LLM_POST_MIN_TOKENS: int = 24
+    LLM_POST_MAX_TOKENS: int = 160
+    # Map-reduce: with LLM_MAP_REDUCE_MIN_POSTS or more posts that don't fit one
+    # prompt, posts are split into up to LLM_MAP_MAX_CHUNKS token-balanced
+    # chunks of at most LLM_MAP_CHUNK_MAX_POSTS posts, summarized in parallel
+    # (LLM_MAP_CONCURRENCY at a time per request), and the chunk summaries are
+    # reduced into the final insight.
+    LLM_MAP_REDUCE_ENABLED: bool = True
+    LLM_MAP_REDUCE_MIN_POSTS: int = 100
+    LLM_MAP_MAX_CHUNKS: int = 16
+    LLM_MAP_CHUNK_MAX_POSTS: int = 100
+    LLM_MAP_CONCURRENCY: int = 16
+
+    # Top mentions: the TOP_MENTIONS_COUNT most representative posts, picked
+    # from the TOP_MENTIONS_CANDIDATES most engaging ones. TOP_MENTIONS_DIVERSITY
+    # (0-1) trades engagement (1.0) against novelty versus posts already picked.
+    TOP_MENTIONS_COUNT: int = 3
+    TOP_MENTIONS_CANDIDATES: int = 50
+    TOP_MENTIONS_DIVERSITY: float = 0.7
     
     # --- Data Sources (placeholders) ---
     TWITTERAPI_IO_KEY: str = "your_twitterapi_io_key"
+    # Optional comma-separated pool of twitterapi.io keys; when set it replaces
+    # TWITTERAPI_IO_KEY. Keys are picked "least_loaded" or "round_robin"; a key
+    # answered with 429 or 401/403 is benched for the matching number of seconds.
+    # The last available key is only benched API_KEY_BENCH_SECONDS_LAST_KEY on
+    # 401/403, so one auth hiccup doesn't stop collection for an hour.
+    # API_KEY_QUOTA is the request quota per key used to estimate what is left
+    # when upstream does not report it (0 = unknown).
+    TWITTERAPI_IO_KEYS: str = ""
+    API_KEY_SELECTION: str = "least_loaded"
+    API_KEY_QUOTA: int = 0
+    API_KEY_BENCH_SECONDS_429: float = 60.0
+    API_KEY_BENCH_SECONDS_401: float = 3600.0
+    API_KEY_BENCH_SECONDS_LAST_KEY: float = 60.0
+    API_KEY_ERROR_WINDOW_SECONDS: float = 300.0
     REDDIT_CLIENT_ID: str = "your_reddit_client_id"
     REDDIT_CLIENT_SECRET: str = "your_reddit_client_secret"
     REDDIT_USER_AGENT: str = "trend-analyzer/1.0 by your_username"
@@ -50,6 +123,136 @@ class Settings(BaseSettings):
     HTTP_PROXY: str = ""
     HTTPS_PROXY: str = ""
 
+    # --- HTTP Transport ---
+    # Shared keep-alive connection pool used by all collectors.
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 10
+    # Requires the optional h2 package (pip install "httpx[http2]").
+    HTTP2_ENABLED: bool = False
+
+    # --- Upstream Response Cache ---
+    # Raw twitterapi.io responses, keyed on endpoint + normalized params.
+    # Only endpoints listed in UPSTREAM_CACHE_TTLS (path -> seconds) are cached.
+    # Set UPSTREAM_CACHE_DIR to also keep compressed entries on disk; expired
+    # files are swept and the directory is capped at UPSTREAM_CACHE_DISK_MAX_BYTES
+    # (oldest files go first).
+    UPSTREAM_CACHE_ENABLED: bool = True
+    UPSTREAM_CACHE_TTLS: Dict[str, float] = {"/twitter/user/search": 3600}
+    UPSTREAM_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    UPSTREAM_CACHE_DIR: str = ""
+    UPSTREAM_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # --- Upstream Rate Limiting ---
+    # Token bucket per (upstream host, API key): RATE_LIMIT_RPS overrides the
+    # default refill rate per host; bursts of up to RATE_LIMIT_BURST_SECONDS
+    # worth of tokens are allowed. On top of it an AIMD limiter adapts the
+    # number of concurrent requests, backing off on 429/5xx and latency spikes.
+    RATE_LIMIT_DEFAULT_RPS: float = 10.0
+    RATE_LIMIT_RPS: Dict[str, float] = {}
+    RATE_LIMIT_BURST_SECONDS: float = 2.0
+    ADAPTIVE_CONCURRENCY_INITIAL: int = 8
+    ADAPTIVE_CONCURRENCY_MIN: int = 1
+    ADAPTIVE_CONCURRENCY_MAX: int = 64
+    ADAPTIVE_LATENCY_TOLERANCE: float = 2.0
+
+    # --- Circuit Breaker & Hedging ---
+    # An upstream (twitterapi.io host, ZhipuAI) is short-circuited after
+    # CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive failures and probed again
+    # after CIRCUIT_BREAKER_RECOVERY_SECONDS.
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30.0
+    # Hedged GETs: send a second attempt once the primary has been pending
+    # longer than the HEDGE_PERCENTILE latency of that host.
+    HEDGE_REQUESTS_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_SAMPLES: int = 20
+
+    # --- Source Fan-out ---
+    # Every source is queried concurrently; a slow source is dropped after
+    # SOURCE_TIMEOUT_SECONDS and the whole stage stops at FANOUT_DEADLINE_SECONDS.
+    SOURCE_TIMEOUT_SECONDS: float = 20.0
+    FANOUT_DEADLINE_SECONDS: float = 25.0
+
+    # --- Paginated Collectors ---
+    # Streaming collectors follow upstream cursors until they have enough
+    # posts, hit COLLECTOR_MAX_PAGES pages or run for COLLECTOR_MAX_SECONDS.
+    COLLECTOR_MAX_PAGES: int = 5
+    COLLECTOR_MAX_SECONDS: float = 15.0
+    # Twitter: recent tweets are pulled for the most-followed relevant users,
+    # at most TWITTER_TIMELINE_CONCURRENCY at a time, and a query may spend at
+    # most TWITTER_CALL_BUDGET upstream calls (search pages + timelines,
+    # including retries on another API key; response-cache hits are free).
+    TWITTER_CALL_BUDGET: int = 12
+    TWITTER_TIMELINE_MAX_USERS: int = 10
+    TWITTER_TIMELINE_CONCURRENCY: int = 4
+    TWITTER_TWEETS_PER_USER: int = 20
+
+    # --- Incremental Collection ---
+    # Only posts newer than the stored (platform, query) watermark are fetched;
+    # up to INCREMENTAL_MERGE_LIMIT previously stored posts are merged back in.
+    INCREMENTAL_COLLECTION_ENABLED: bool = True
+    INCREMENTAL_MERGE_LIMIT: int = 200
+
+    # --- Background Collection ---
+    # An opt-in scheduler started with the app re-collects tracked keywords
+    # (the pinned TRACKED_KEYWORDS, plus recently requested queries when
+    # SCHEDULER_TRACK_REQUESTS is on) into raw_posts. Stale (keyword, source)
+    # pairs are queued by popularity x staleness; requests for a keyword
+    # collected within SCHEDULER_FRESH_SECONDS read local data. Failed jobs are
+    # retried with exponential backoff capped at SCHEDULER_MAX_BACKOFF_SECONDS.
+    SCHEDULER_ENABLED: bool = False
+    TRACKED_KEYWORDS: List[str] = []
+    SCHEDULER_TRACK_REQUESTS: bool = False
+    SCHEDULER_REFRESH_SECONDS: float = 600.0
+    SCHEDULER_FRESH_SECONDS: float = 900.0
+    SCHEDULER_TICK_SECONDS: float = 10.0
+    SCHEDULER_WORKERS: int = 4
+    SCHEDULER_SOURCE_CONCURRENCY: Dict[str, int] = {"twitter": 2, "reddit": 2}
+    SCHEDULER_MAX_TRACKED: int = 100
+    SCHEDULER_POPULARITY_HALF_LIFE_SECONDS: float = 3600.0
+    SCHEDULER_MIN_POPULARITY: float = 0.05
+    SCHEDULER_MAX_BACKOFF_SECONDS: float = 3600.0
+
+    # --- Near-duplicate Filter ---
+    # Posts whose texts have a Jaccard similarity >= NEAR_DUPLICATE_THRESHOLD
+    # (MinHash/LSH candidates) are collapsed to their highest-engagement member
+    # before the LLM samples them.
+    NEAR_DUPLICATE_FILTER_ENABLED: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7
+
+    # --- Result Cache ---
+    # Final trend payloads are cached in an in-process LRU and in the
+    # result_cache table of DATABASE_URL. Entries past their TTL are still
+    # served for RESULT_CACHE_STALE_SECONDS while a background refresh runs.
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PERSISTENT: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 256
+    RESULT_CACHE_MEMORY_TTL_SECONDS: int = 300
+    RESULT_CACHE_PERSISTENT_TTL_SECONDS: int = 1800
+    RESULT_CACHE_STALE_SECONDS: int = 3600
+
+    # --- Fast JSON Responses ---
+    # Opt-in: responses are encoded with orjson (stdlib json if it is not
+    # installed), trend payloads skip response_model re-validation, and
+    # cached trend results are served from pre-serialized bytes.
+    FAST_JSON_RESPONSES: bool = False
+
+    # --- Sentiment Analysis ---
+    # Optional lexicon file merged over the built-in keywords: one
+    # "term<TAB or comma>weight" per line, the weight being a number (e.g.
+    # AFINN's -5..5) or positive/negative. Matching is whole-word.
+    SENTIMENT_LEXICON_PATH: Optional[str] = None
+    # /analysis/batch scores up to ANALYSIS_BATCH_MAX_TEXTS texts per request,
+    # vectorized ANALYSIS_BATCH_CHUNK_SIZE at a time, streaming results back.
+    # Larger requests are rejected with 413 before any text is scored, as are
+    # bodies over ANALYSIS_BATCH_MAX_BYTES (checked against Content-Length
+    # first, then while reading).
+    ANALYSIS_BATCH_MAX_TEXTS: int = 100000
+    ANALYSIS_BATCH_MAX_BYTES: int = 64 * 1024 * 1024
+    ANALYSIS_BATCH_CHUNK_SIZE: int = 5000
+
 # Create a single, importable instance of the settings
 settings = Settings()
 
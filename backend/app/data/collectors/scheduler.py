@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ...services.incremental_collector import IncrementalCollector, IncrementalStream
+from ...utils.logger import logger
+from ...utils.query import normalize_query
+
+# 接收查询词，返回该数据源的增量抓取流 (since_id -> 批次)
+SourceFactory = Callable[[str], IncrementalStream]
+
+
+class _TrackedKeyword:
+    """一个被跟踪的关键词：按时间衰减的热度，各数据源最近一次收集的时间，以及连续失败后的重试时间"""
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.popularity = 0.0
+        self.touched_at = time.time()
+        self.collected_at: Dict[str, float] = {}
+        self.failures: Dict[str, int] = {}
+        self.retry_at: Dict[str, float] = {}
+
+    def decayed_popularity(self, now: float, half_life: float) -> float:
+        return self.popularity * math.pow(0.5, (now - self.touched_at) / half_life)
+
+    def hit(self, now: float, half_life: float):
+        self.popularity = self.decayed_popularity(now, half_life) + 1.0
+        self.touched_at = now
+
+
+class CollectionScheduler:
+    """
+    后台定时收集
+    跟踪的关键词 = 配置中的固定关键词 + 用户最近查询过的关键词。
+    每个调度周期为过期的 (关键词, 数据源) 计算优先级 = (热度 + 1) * 过期程度，
+    放入优先队列，由 worker 按优先级取出执行；每个数据源有独立的并发上限。
+    收集结果经 IncrementalCollector 写入 raw_posts，
+    用户请求在数据足够新时可以直接读本地数据，不必等待上游；
+    用户请求自己从上游收集后也会调用 mark_collected，避免后台立即重复收集。
+    失败或超时的任务按指数退避 (tick_interval * 2^连续失败次数，最多 max_backoff 秒) 后再重试。
+    """
+
+    def __init__(
+        self,
+        sources: Dict[str, SourceFactory],
+        collector: IncrementalCollector,
+        tracked_keywords: Iterable[str] = (),
+        refresh_interval: float = 600.0,
+        fresh_for: float = 900.0,
+        tick_interval: float = 10.0,
+        workers: int = 4,
+        source_concurrency: Optional[Dict[str, int]] = None,
+        job_timeout: float = 20.0,
+        max_tracked: int = 100,
+        popularity_half_life: float = 3600.0,
+        min_popularity: float = 0.05,
+        max_backoff: float = 3600.0,
+    ):
+        self.sources = sources
+        self.collector = collector
+        self.refresh_interval = refresh_interval
+        self.fresh_for = fresh_for
+        self.tick_interval = tick_interval
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.max_tracked = max_tracked
+        self.popularity_half_life = popularity_half_life
+        self.min_popularity = min_popularity
+        self.max_backoff = max_backoff
+        self._semaphores = {
+            name: asyncio.Semaphore((source_concurrency or {}).get(name, 1)) for name in sources
+        }
+        self._keywords: Dict[str, _TrackedKeyword] = {}
+        for keyword in tracked_keywords:
+            if normalize_query(keyword):
+                self._keywords[normalize_query(keyword)] = _TrackedKeyword(pinned=True)
+        # 优先队列元素: (-优先级, 序号, 关键词, 数据源)
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._queued: set = set()
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.counters = {"jobs_run": 0, "jobs_failed": 0, "jobs_timed_out": 0, "posts_collected": 0}
+
+    # --- 关键词跟踪 ---
+
+    def track(self, query: str):
+        """记录一次用户查询，提升该关键词的热度"""
+        key = normalize_query(query)
+        if not key:
+            return
+        now = time.time()
+        keyword = self._keywords.get(key)
+        if keyword is None:
+            keyword = _TrackedKeyword()
+            self._keywords[key] = keyword
+            self._evict(now)
+        keyword.hit(now, self.popularity_half_life)
+
+    def is_fresh(self, platform: str, query: str) -> bool:
+        """该数据源最近 fresh_for 秒内是否已由后台收集过该关键词"""
+        keyword = self._keywords.get(normalize_query(query))
+        if keyword is None or platform not in keyword.collected_at:
+            return False
+        return time.time() - keyword.collected_at[platform] < self.fresh_for
+
+    def mark_collected(self, platform: str, query: str):
+        """用户请求已从上游收集过该关键词：刷新新鲜度，后台不必马上再收集"""
+        keyword = self._keywords.get(normalize_query(query))
+        if keyword is not None:
+            keyword.collected_at[platform] = time.time()
+            keyword.failures.pop(platform, None)
+            keyword.retry_at.pop(platform, None)
+
+    def _evict(self, now: float):
+        """超出跟踪上限时淘汰热度最低的非固定关键词"""
+        candidates = [(k.decayed_popularity(now, self.popularity_half_life), key)
+                      for key, k in self._keywords.items() if not k.pinned]
+        overflow = len(self._keywords) - self.max_tracked
+        for _, key in sorted(candidates)[:max(overflow, 0)]:
+            del self._keywords[key]
+
+    # --- 调度 ---
+
+    def _priority(self, keyword: _TrackedKeyword, platform: str, now: float) -> float:
+        """(热度 + 1) * 过期程度；从未收集过的关键词视为过期程度很高"""
+        collected_at = keyword.collected_at.get(platform)
+        staleness = 100.0 if collected_at is None else (now - collected_at) / self.refresh_interval
+        return (keyword.decayed_popularity(now, self.popularity_half_life) + 1.0) * staleness
+
+    def _schedule(self):
+        now = time.time()
+        for key, keyword in list(self._keywords.items()):
+            popularity = keyword.decayed_popularity(now, self.popularity_half_life)
+            if not keyword.pinned and popularity < self.min_popularity:
+                del self._keywords[key]
+                continue
+            for platform in self.sources:
+                if (key, platform) in self._queued:
+                    continue
+                collected_at = keyword.collected_at.get(platform)
+                if collected_at is not None and now - collected_at < self.refresh_interval:
+                    continue
+                if now < keyword.retry_at.get(platform, 0.0):
+                    continue
+                self._sequence += 1
+                heapq.heappush(self._heap, (-self._priority(keyword, platform, now), self._sequence, key, platform))
+                self._queued.add((key, platform))
+        if self._heap:
+            self._wakeup.set()
+
+    async def _scheduler_loop(self):
+        while True:
+            self._schedule()
+            await asyncio.sleep(self.tick_interval)
+
+    async def _next_job(self) -> Tuple[str, str]:
+        while not self._heap:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        _, _, key, platform = heapq.heappop(self._heap)
+        return key, platform
+
+    async def _worker_loop(self):
+        while True:
+            key, platform = await self._next_job()
+            try:
+                async with self._semaphores[platform]:
+                    await self._run_job(key, platform)
+            finally:
+                self._queued.discard((key, platform))
+
+    async def _run_job(self, query: str, platform: str):
+        self.counters["jobs_run"] += 1
+        try:
+            collected = await asyncio.wait_for(self._collect(query, platform), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            self.counters["jobs_timed_out"] += 1
+            delay = self._back_off(query, platform)
+            logger.warning(f"[调度] {platform} 收集 '{query}' 超时 ({self.job_timeout}s)，{delay:.0f}s 后重试")
+            return
+        except Exception as e:
+            self.counters["jobs_failed"] += 1
+            delay = self._back_off(query, platform)
+            logger.error(f"[调度] {platform} 收集 '{query}' 失败: {e}，{delay:.0f}s 后重试")
+            return
+
+        self.counters["posts_collected"] += collected
+        self.mark_collected(platform, query)
+        logger.info(f"[调度] {platform} 收集 '{query}' 完成，新增 {collected} 条帖子")
+
+    def _back_off(self, query: str, platform: str) -> float:
+        """记录一次失败，返回距离下次重试的秒数"""
+        keyword = self._keywords.get(query)
+        if keyword is None:
+            return 0.0
+        failures = keyword.failures.get(platform, 0) + 1
+        keyword.failures[platform] = failures
+        delay = min(self.max_backoff, self.tick_interval * 2 ** failures)
+        keyword.retry_at[platform] = time.time() + delay
+        return delay
+
+    async def _collect(self, query: str, platform: str) -> int:
+        collected = 0
+        stream = self.sources[platform](query)
+        async for batch in self.collector.iter_posts(platform, query, stream, merge_stored=False):
+            collected += len(batch)
+        return collected
+
+    # --- 生命周期 ---
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._scheduler_loop()))
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker_loop()))
+        logger.info(f"[调度] 后台收集已启动: {len(self.sources)} 个数据源, {self.workers} 个 worker")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            **self.counters,
+            "running": bool(self._tasks),
+            "tracked_keywords": len(self._keywords),
+            "queued_jobs": len(self._heap),
+            "top_keywords": sorted(
+                ((key, round(k.decayed_popularity(now, self.popularity_half_life), 2)) for key, k in self._keywords.items()),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:10],
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -26,6 +26,63 @@ class RawPost(Base):
     likes = Column(Integer, default=0)
     created_at = Column(DateTime, nullable=False)
 
+    # Engagement signals used for ranking; stored in raw_post_engagement,
+    # these attributes only carry them on posts built from collector output.
+    retweets = 0
+    followers = 0
+
+class RawPostEngagement(Base):
+    """
+    Upstream post id and engagement counters of a stored raw post.
+    Kept in a side table so existing databases pick it up via create_all without a migration.
+    """
+    __tablename__ = "raw_post_engagement"
+
+    raw_post_id = Column(Integer, ForeignKey("raw_posts.id"), primary_key=True)
+    post_id = Column(String, nullable=True)
+    retweets = Column(Integer, default=0)
+    followers = Column(Integer, default=0)
+
+class RawPostQuery(Base):
+    """Links stored raw posts to the normalized queries that collected them."""
+    __tablename__ = "raw_post_queries"
+
+    raw_post_id = Column(Integer, ForeignKey("raw_posts.id"), primary_key=True)
+    query = Column(String, primary_key=True, index=True)
+
+class CollectionWatermark(Base):
+    """Newest post already ingested per (platform, normalized query)."""
+    __tablename__ = "collection_watermarks"
+    __table_args__ = (UniqueConstraint("platform", "query"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    platform = Column(String, nullable=False)
+    query = Column(String, nullable=False)
+    last_post_id = Column(String, nullable=True)
+    last_post_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+class ResultCacheEntry(Base):
+    """Persistent tier of the trend result cache, shared by all workers."""
+    __tablename__ = "result_cache"
+
+    cache_key = Column(String, primary_key=True)
+    payload = Column(Text, nullable=False)
+    stored_at = Column(Float, nullable=False, index=True)
+
+class LLMInsightCacheEntry(Base):
+    """LLM insights keyed by a fingerprint of (model, prompt version, sampled post texts)."""
+    __tablename__ = "llm_insight_cache"
+
+    fingerprint = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    stored_at = Column(Float, nullable=False, index=True)
+    last_hit_at = Column(Float, nullable=False, index=True)
+
 def get_db():
     """Dependency to get a DB session for each request."""
     db = SessionLocal()
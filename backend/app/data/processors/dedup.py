@@ -0,0 +1,125 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, FrozenSet, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# 梅森素数 2^61 - 1，用作 MinHash 置换的模数
+_PRIME = (1 << 61) - 1
+_URL_PATTERN = re.compile(r"https?://\S+")
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """
+    将文本切分为 shingle 集合
+    有空格分词的文本使用相邻词二元组；中文等无空格文本使用 4 字符片段
+    """
+    normalized = " ".join(_URL_PATTERN.sub(" ", text.lower()).split())
+    words = normalized.split(" ")
+    if len(words) >= 3:
+        return frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+    compact = normalized.replace(" ", "")
+    if len(compact) <= 4:
+        return frozenset([compact]) if compact else frozenset()
+    return frozenset(compact[i:i + 4] for i in range(len(compact) - 3))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        self.parent[self.find(a)] = self.find(b)
+
+
+class NearDuplicateFilter:
+    """
+    基于 MinHash + LSH 的近似重复过滤
+
+    每条文本计算 num_perm 个 MinHash 值，按 bands 个分段做 LSH 分桶：
+    同一个桶内的成员与桶的代表 (第一个成员) 用真实的 Jaccard 相似度确认 (>= threshold 视为重复)。
+    每个重复组只保留 engagement 最高的一条，其余按原顺序输出。
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 32, bands: int = 8, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self.counters = {"posts_in": 0, "duplicates_removed": 0, "candidate_pairs": 0}
+
+    def signature(self, items: FrozenSet[str]) -> List[int]:
+        if not items:
+            return [0] * self.num_perm
+        hashes = [
+            int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+            for item in items
+        ]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+
+    def filter(
+        self,
+        posts: Sequence[T],
+        text: Callable[[T], str] = lambda post: post.text,
+        engagement: Callable[[T], Any] = lambda post: post.likes or 0,
+    ) -> List[T]:
+        self.counters["posts_in"] += len(posts)
+        if len(posts) < 2:
+            return list(posts)
+
+        shingle_sets = [shingles(text(post) or "") for post in posts]
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        for index, items in enumerate(shingle_sets):
+            signature = self.signature(items)
+            for band in range(self.bands):
+                key = (band, *signature[band * self.rows:(band + 1) * self.rows])
+                buckets[key].append(index)
+
+        # 每个桶只拿其余成员与桶内第一个成员 (代表) 比较，候选对数与桶大小成线性关系，
+        # 避免大量转发落入同一个桶时退化为两两比较
+        groups = _UnionFind(len(posts))
+        candidate_pairs = 0
+        for members in buckets.values():
+            representative = members[0]
+            for member in members[1:]:
+                if groups.find(member) == groups.find(representative):
+                    continue
+                candidate_pairs += 1
+                if jaccard(shingle_sets[representative], shingle_sets[member]) >= self.threshold:
+                    groups.union(member, representative)
+        self.counters["candidate_pairs"] += candidate_pairs
+
+        # 每组保留互动量最高的一条；并列时保留靠前的
+        best: Dict[int, int] = {}
+        for index, post in enumerate(posts):
+            root = groups.find(index)
+            if root not in best or engagement(post) > engagement(posts[best[root]]):
+                best[root] = index
+        kept = sorted(best.values())
+        self.counters["duplicates_removed"] += len(posts) - len(kept)
+        return [posts[index] for index in kept]
+
+    def stats(self) -> Dict[str, Any]:
+        posts_in = self.counters["posts_in"]
+        return {
+            **self.counters,
+            "removal_rate": round(self.counters["duplicates_removed"] / posts_in, 4) if posts_in else 0.0,
+        }
@@ -0,0 +1,235 @@
+import heapq
+import math
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .dedup import jaccard, shingles
+
+T = TypeVar("T")
+
+# CJK 统一表意文字、日文假名、韩文音节
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_PIECES = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+|[^\w\s]|\s+")
+
+# GLM 分词器的离线近似：一个汉字约 0.6 token，拉丁词约每 4 个字符 1 token，标点 1 token
+_CJK_TOKENS = 0.6
+_CHARS_PER_TOKEN = 4
+
+
+def _piece_tokens(piece: str) -> float:
+    if piece.isspace():
+        return 0.0
+    if len(piece) == 1 and re.match(rf"[{_CJK}]", piece):
+        return _CJK_TOKENS
+    if piece[0].isalnum() or piece[0] == "_":
+        return float(math.ceil(len(piece) / _CHARS_PER_TOKEN))
+    return 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """近似估算 GLM 分词后的 token 数 (偏保守，不需要加载分词器)"""
+    return math.ceil(sum(_piece_tokens(piece) for piece in _PIECES.findall(text)))
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """截断到不超过 max_tokens 个 token (含末尾省略号的 1 token)，只在词/字边界处截断"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    for match in _PIECES.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens - 1:
+            return text[:match.start()].rstrip() + "…"
+    return text
+
+
+class PromptPacker:
+    """
+    按 token 预算装填提示词中的帖子样本
+
+    1. 排序：按互动量 (log 缩放) 排序，并对与已选帖子内容相似、或来自同一作者的帖子降权，
+       让有限的预算覆盖更多不同的声音；
+    2. 选择：按顺序加入帖子，直到达到 max_posts 条或剩余预算不足以再给一条帖子 min_post_tokens；
+    3. 截断：用“注水”方式求每条帖子的统一上限，短帖子保持原文，长帖子平分剩余预算，
+       单条不超过 max_post_tokens；上限低于 min_post_tokens 时去掉排在最后的帖子，而不是突破预算。
+
+    帖子太多、一个提示词装不下时，pack_chunks 把帖子分成多块，每块各自装入同样的预算 (map-reduce)。
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        min_post_tokens: int = 24,
+        max_post_tokens: int = 160,
+        max_posts: int = 40,
+        per_post_overhead: int = 2,
+        max_candidates: int = 300,
+    ):
+        self.token_budget = token_budget
+        self.max_posts = max_posts
+        self.min_post_tokens = min_post_tokens
+        self.max_post_tokens = max_post_tokens
+        self.per_post_overhead = per_post_overhead
+        self.max_candidates = max_candidates
+        self.counters = {"packs": 0, "chunked_packs": 0, "chunks": 0, "posts_considered": 0, "posts_packed": 0, "tokens_packed": 0}
+
+    def rank(
+        self,
+        posts: Sequence[T],
+        text: Callable[[T], str],
+        engagement: Callable[[T], float],
+        author: Callable[[T], Any],
+    ) -> Iterator[T]:
+        """
+        贪心排序：互动量得分 * (1 - 与已选帖子的最大相似度)，同一作者 (已知时) 的后续帖子减半
+        按需逐条产出，预算装满后调用方停止迭代即可，不必排完全部候选
+        """
+        candidates = sorted(posts, key=lambda post: engagement(post) or 0, reverse=True)[:self.max_candidates]
+        base = [math.log1p(max(0.0, float(engagement(post) or 0))) + 1.0 for post in candidates]
+        shingle_sets = [shingles(text(post) or "") for post in candidates]
+        max_similarity = [0.0] * len(candidates)
+        author_counts: Dict[Any, int] = {}
+        remaining = set(range(len(candidates)))
+
+        while remaining:
+            best = max(
+                remaining,
+                key=lambda i: (
+                    base[i] * (1.0 - max_similarity[i]) * 0.5 ** author_counts.get(author(candidates[i]), 0),
+                    -i,
+                ),
+            )
+            remaining.discard(best)
+            yield candidates[best]
+            key = author(candidates[best])
+            if key:
+                author_counts[key] = author_counts.get(key, 0) + 1
+            for i in remaining:
+                similarity = jaccard(shingle_sets[i], shingle_sets[best])
+                if similarity > max_similarity[i]:
+                    max_similarity[i] = similarity
+
+    def pack(
+        self,
+        posts: Sequence[T],
+        template_tokens: int,
+        text: Callable[[T], str] = lambda post: post.text,
+        engagement: Callable[[T], float] = lambda post: post.likes or 0,
+        author: Callable[[T], Any] = lambda post: post.author if post.author != "Unknown" else None,
+    ) -> List[str]:
+        """返回装入预算的帖子文本 (已按需截断)，顺序即排序结果"""
+        budget = self.token_budget - template_tokens
+        self.counters["packs"] += 1
+        self.counters["posts_considered"] += len(posts)
+        if budget <= 0 or not posts:
+            return []
+
+        selected: List[str] = []
+        lengths: List[int] = []
+        reserved = 0
+        for post in self.rank(posts, text, engagement, author):
+            if len(selected) >= self.max_posts:
+                break
+            body = " ".join((text(post) or "").split())
+            if not body:
+                continue
+            tokens = estimate_tokens(body)
+            need = min(tokens, self.min_post_tokens) + self.per_post_overhead
+            if reserved + need > budget:
+                break
+            reserved += need
+            selected.append(body)
+            lengths.append(tokens)
+
+        count, cap = self._fit(lengths, budget)
+        selected, lengths = selected[:count], lengths[:count]
+        packed = [body if tokens <= cap else trim_to_tokens(body, cap) for body, tokens in zip(selected, lengths)]
+
+        self.counters["posts_packed"] += len(packed)
+        self.counters["tokens_packed"] += sum(min(tokens, cap) for tokens in lengths)
+        return packed
+
+    def pack_chunks(
+        self,
+        posts: Sequence[T],
+        template_tokens: int,
+        max_chunks: int,
+        max_posts_per_chunk: Optional[int] = None,
+        text: Callable[[T], str] = lambda post: post.text,
+        engagement: Callable[[T], float] = lambda post: post.likes or 0,
+    ) -> List[List[str]]:
+        """
+        把帖子分成若干块，每块都能装入一个提示词的预算
+        块数按帖子总 token 数和每块条数上限 (默认 max_posts) 自适应 (不超过 max_chunks)：
+        按互动量从高到低依次放入当前 token 最少的块，各块负载均衡、都包含高互动帖子；
+        max_chunks 块仍装不下时丢弃互动量最低的帖子。不做相似度排序，适合上千条帖子。
+        """
+        budget = self.token_budget - template_tokens
+        per_chunk = max_posts_per_chunk or self.max_posts
+        self.counters["chunked_packs"] += 1
+        self.counters["posts_considered"] += len(posts)
+        if budget <= 0 or not posts:
+            return []
+
+        capacity = max_chunks * per_chunk
+        ranked = heapq.nlargest(capacity, range(len(posts)), key=lambda i: (engagement(posts[i]) or 0, -i))
+        bodies = [(body, estimate_tokens(body)) for body in (" ".join((text(posts[i]) or "").split()) for i in ranked) if body]
+        if not bodies:
+            return []
+
+        needed = sum(min(tokens, self.max_post_tokens) + self.per_post_overhead for _, tokens in bodies)
+        count = min(max_chunks, max(math.ceil(needed / budget), math.ceil(len(bodies) / per_chunk)))
+        chunks: List[List[Tuple[str, int]]] = [[] for _ in range(count)]
+        loads = [(0, i) for i in range(count)]
+        for body, tokens in bodies:
+            if not loads:
+                break
+            load, i = heapq.heappop(loads)
+            chunks[i].append((body, tokens))
+            if len(chunks[i]) < per_chunk:
+                heapq.heappush(loads, (load + min(tokens, self.max_post_tokens), i))
+
+        packed_chunks = []
+        for chunk in chunks:
+            # 块内按互动量从高到低排列，装不下时去掉的是末尾互动量最低的帖子
+            count, cap = self._fit([tokens for _, tokens in chunk], budget)
+            chunk = chunk[:count]
+            lengths = [tokens for _, tokens in chunk]
+            packed_chunks.append([body if tokens <= cap else trim_to_tokens(body, cap) for body, tokens in chunk])
+            self.counters["posts_packed"] += len(chunk)
+            self.counters["tokens_packed"] += sum(min(tokens, cap) for tokens in lengths)
+        self.counters["chunks"] += len(packed_chunks)
+        return packed_chunks
+
+    def _fit(self, lengths: List[int], budget: int) -> Tuple[int, int]:
+        """
+        按排序保留尽可能多的前若干条帖子，使统一上限不低于 min_post_tokens
+        返回 (保留条数, 上限)；保留的帖子截断到上限后合计不超过预算 (含每条的固定开销)
+        """
+        count = len(lengths)
+        while count:
+            cap = self._water_level(lengths[:count], budget - self.per_post_overhead * count)
+            if cap >= self.min_post_tokens:
+                return count, cap
+            count -= 1
+        return 0, 0
+
+    def _water_level(self, lengths: List[int], budget: int) -> int:
+        """求最大的单条上限 cap，使 sum(min(长度, cap)) 不超过预算"""
+        cap = self.max_post_tokens
+        remaining = budget
+        pending = sorted(lengths)
+        while pending:
+            share = remaining // len(pending)
+            if pending[0] > share:
+                return max(0, min(cap, share))
+            remaining -= pending.pop(0)
+        return cap
+
+    def stats(self) -> Dict[str, Any]:
+        packs = self.counters["packs"] + self.counters["chunks"]
+        return {
+            **self.counters,
+            "avg_posts_per_prompt": round(self.counters["posts_packed"] / packs, 2) if packs else 0.0,
+            "avg_post_tokens_per_prompt": round(self.counters["tokens_packed"] / packs, 1) if packs else 0.0,
+        }
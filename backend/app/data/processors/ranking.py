@@ -0,0 +1,103 @@
+import heapq
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from .dedup import jaccard, shingles
+
+T = TypeVar("T")
+
+# 互动量得分的权重：转发比点赞更能说明传播力，粉丝数只做弱加成
+LIKE_WEIGHT = 1.0
+RETWEET_WEIGHT = 2.0
+FOLLOWER_WEIGHT = 0.5
+
+
+def engagement_score(likes: Any = 0, retweets: Any = 0, followers: Any = 0) -> float:
+    """点赞、转发、作者粉丝数的 log 加权和，避免头部大号一家独大"""
+    return (
+        LIKE_WEIGHT * math.log1p(max(0.0, float(likes or 0)))
+        + RETWEET_WEIGHT * math.log1p(max(0.0, float(retweets or 0)))
+        + FOLLOWER_WEIGHT * math.log1p(max(0.0, float(followers or 0)))
+    )
+
+
+def post_engagement(post: Any) -> float:
+    return engagement_score(post.likes, getattr(post, "retweets", 0), getattr(post, "followers", 0))
+
+
+class MentionRanker:
+    """
+    选出代表性帖子 (top mentions)
+
+    1. 用大小为 candidates 的堆按互动量得分取前若干条候选，复杂度 O(n log candidates)，不对全部帖子排序；
+    2. 在候选中做 MMR 选择：diversity * 归一化得分 - (1 - diversity) * 与已选帖子的最大相似度，
+       避免选出几条几乎相同的帖子；
+    3. 对选中的 k 条帖子一次性批量计算情感。
+    """
+
+    def __init__(
+        self,
+        k: int = 3,
+        candidates: int = 50,
+        diversity: float = 0.7,
+        sentiment: Optional[Callable[[List[str]], List[str]]] = None,
+    ):
+        self.k = k
+        self.candidates = max(candidates, k)
+        self.diversity = diversity
+        self.sentiment = sentiment
+        self.counters = {"rankings": 0, "posts_considered": 0, "posts_selected": 0}
+
+    def select(
+        self,
+        posts: Sequence[T],
+        score: Callable[[T], float] = post_engagement,
+        text: Callable[[T], str] = lambda post: post.text,
+    ) -> List[T]:
+        self.counters["rankings"] += 1
+        self.counters["posts_considered"] += len(posts)
+        scored = heapq.nlargest(self.candidates, ((score(post), -i, post) for i, post in enumerate(posts)), key=lambda x: x[:2])
+        if not scored:
+            return []
+
+        top = scored[0][0]
+        relevance = [value / top if top > 0 else 0.0 for value, _, _ in scored]
+        shingle_sets = [shingles(text(post) or "") for _, _, post in scored]
+        max_similarity = [0.0] * len(scored)
+        remaining = set(range(len(scored)))
+        selected: List[T] = []
+
+        while remaining and len(selected) < self.k:
+            best = max(
+                remaining,
+                key=lambda i: (self.diversity * relevance[i] - (1 - self.diversity) * max_similarity[i], -i),
+            )
+            remaining.discard(best)
+            selected.append(scored[best][2])
+            for i in remaining:
+                similarity = jaccard(shingle_sets[i], shingle_sets[best])
+                if similarity > max_similarity[i]:
+                    max_similarity[i] = similarity
+
+        self.counters["posts_selected"] += len(selected)
+        return selected
+
+    def top_mentions(self, posts: Sequence[Any]) -> List[Dict[str, Any]]:
+        """返回接口使用的 top_mentions 结构"""
+        selected = self.select(posts)
+        texts = [post.text or "" for post in selected]
+        sentiments = self.sentiment(texts) if self.sentiment else ["neutral"] * len(selected)
+        return [
+            {
+                "platform": post.platform,
+                "author": post.author,
+                "text": post.text,
+                "url": post.url,
+                "likes": post.likes,
+                "retweets": getattr(post, "retweets", 0) or 0,
+                "sentiment": sentiment.capitalize(),
+            } for post, sentiment in zip(selected, sentiments)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters)
@@ -1,25 +1,35 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # All environment loading is now handled centrally in core.config
-from .api import trends, health, seed, analysis
+from .api import trends, health, seed, analysis, metrics
 from .core.config import settings
 from .data.models.database import create_db_and_tables
+from .services.http_transport import close_http_transports
+from .utils.fast_json import FastJSONResponse
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Code to run on startup
     print("INFO:     Creating database and tables...")
     create_db_and_tables()
+    if settings.SCHEDULER_ENABLED:
+        trends.collection_scheduler.start()
     yield
     # Code to run on shutdown
     print("INFO:     Shutting down...")
+    await trends.collection_scheduler.stop()
+    if trends.llm_provider:
+        await trends.llm_provider.aclose()
+    await close_http_transports()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse,
 )
 
 # Set up CORS middleware
@@ -38,6 +48,7 @@ app.include_router(health.router, prefix=f"{api_prefix}/health", tags=["health"]
 app.include_router(trends.router, prefix=f"{api_prefix}/analyze-trends", tags=["trends"])
 app.include_router(seed.router, prefix=f"{api_prefix}/seed", tags=["seed"])
 app.include_router(analysis.router, prefix=f"{api_prefix}/analysis", tags=["analysis"])
+app.include_router(metrics.router, prefix=f"{api_prefix}/metrics", tags=["metrics"])
 
 @app.get("/")
 async def root():
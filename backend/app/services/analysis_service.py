@@ -1,11 +1,113 @@
+import importlib.util
+import re
+from itertools import chain, repeat
+from typing import Dict, List, Optional, Sequence
+
+from ..core.config import settings
+from ..utils.aho_corasick import AhoCorasick
 from ..utils.logger import logger
 
+# numpy 为可选依赖：安装后批量打分走向量化路径，未安装时逐条用自动机打分
+_HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+if _HAS_NUMPY:
+    import numpy as np
+
+# 与 AhoCorasick 的词边界一致：ASCII 字母、数字和下划线组成的连续片段
+_TOKEN = re.compile(r"[a-z0-9_]+")
+# ASCII 文本的快速分词：其余 ASCII 字符都换成空格 (同时转小写)，再 split
+_ASCII_TOKEN_TABLE = str.maketrans({
+    chr(code): (chr(code).lower() if chr(code).isalnum() or chr(code) == "_" else " ") for code in range(128)
+})
+
+
+def _tokenize(text: str) -> List[str]:
+    if text.isascii():
+        return text.translate(_ASCII_TOKEN_TABLE).split()
+    return _TOKEN.findall(text.lower())
+
+
+class _LexiconMatrix:
+    """
+    批量打分的向量化实现：每条文本分词一次，得到 (文本, 词) 的稀疏 0/1 矩阵，再乘以词权重向量
+    (np.bincount)。结果与逐条的自动机打分完全一致：
+    只由单个完整词构成的词典词直接按词表查；短语、带标点的词和非 ASCII 词 (如中文) 只对
+    可能命中它们的少数文本 (出现短语的前两个词、包含该字面量、或含非 ASCII 字符) 退回自动机逐条打分。
+    """
+
+    def __init__(self, lexicon: Dict[str, float]):
+        self.vocab: Dict[str, int] = {}
+        weights: List[float] = []
+        single_triggers: List[int] = []
+        pair_triggers: List[tuple] = []
+        self.literals: List[str] = []
+        self.has_non_ascii = False
+
+        def token_id(token: str) -> int:
+            if token not in self.vocab:
+                self.vocab[token] = len(weights)
+                weights.append(0.0)
+            return self.vocab[token]
+
+        for term, weight in lexicon.items():
+            if not term.isascii():
+                self.has_non_ascii = True
+                continue
+            tokens = _TOKEN.findall(term)
+            if len(tokens) == 1 and tokens[0] == term:
+                weights[token_id(term)] = weight
+            elif len(tokens) == 1:
+                single_triggers.append(token_id(tokens[0]))
+            elif tokens:
+                pair_triggers.append((token_id(tokens[0]), token_id(tokens[1])))
+            else:
+                self.literals.append(term)
+
+        size = len(weights)
+        self.size = size
+        self.weights = np.array(weights, dtype=np.float64)
+        self.single_triggers = np.zeros(size, dtype=bool)
+        self.single_triggers[single_triggers] = True
+        self.pair_triggers = np.array(sorted({a * size + b for a, b in pair_triggers}), dtype=np.int64)
+
+    def scores(self, texts: List[str], fallback) -> List[float]:
+        count = len(texts)
+        token_lists = [_tokenize(text) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=count)
+        ids = np.fromiter(
+            map(self.vocab.get, chain.from_iterable(token_lists), repeat(-1)), dtype=np.int64, count=int(lengths.sum())
+        )
+        rows = np.repeat(np.arange(count), lengths)
+
+        known = ids >= 0
+        rows_known, ids_known = rows[known], ids[known]
+        # 去重后的 (文本, 词) 对即稀疏 0/1 矩阵的非零元素，每个词每条文本只计一次
+        pairs = np.unique(rows_known * self.size + ids_known)
+        scores = np.bincount(pairs // self.size, weights=self.weights[pairs % self.size], minlength=count)
+
+        needs_fallback = np.zeros(count, dtype=bool)
+        needs_fallback[rows_known[self.single_triggers[ids_known]]] = True
+        if len(self.pair_triggers) and len(ids) > 1:
+            adjacent = (rows[:-1] == rows[1:]) & known[:-1] & known[1:]
+            bigrams = ids[:-1][adjacent] * self.size + ids[1:][adjacent]
+            needs_fallback[rows[:-1][adjacent][np.isin(bigrams, self.pair_triggers)]] = True
+        if self.literals:
+            lowered = [text.lower() for text in texts]
+            for literal in self.literals:
+                needs_fallback |= np.fromiter((literal in text for text in lowered), dtype=bool, count=count)
+        if self.has_non_ascii:
+            needs_fallback |= ~np.fromiter(map(str.isascii, texts), dtype=bool, count=count)
+
+        for index in np.flatnonzero(needs_fallback):
+            scores[index] = fallback(texts[index])
+        return scores.tolist()
+
 class AnalysisService:
     """
     一个简单的服务，用于对文本进行情感分析。
+    情感词典在初始化时编译为 Aho-Corasick 自动机，每条文本只扫描一遍，耗时与词典大小无关。
     """
 
-    def __init__(self):
+    def __init__(self, lexicon_path: Optional[str] = None):
         # 定义简单的关键词列表用于情感判断
         self.positive_keywords = [
             "great", "excellent", "amazing", "love", "recommend", "future", 
@@ -15,7 +117,61 @@ class AnalysisService:
             "bad", "terrible", "disappointing", "hate", "avoid", "problem",
             "long way", "bugs", "end of", "can't handle", "failed", "error"
         ]
-        logger.info("情感分析服务已初始化。")
+        # 词 -> 权重 (正数为积极，负数为消极)；外部词典中的词覆盖内置词
+        self.lexicon: Dict[str, float] = {word: 1.0 for word in self.positive_keywords}
+        self.lexicon.update({word: -1.0 for word in self.negative_keywords})
+        lexicon_path = lexicon_path or settings.SENTIMENT_LEXICON_PATH
+        if lexicon_path:
+            self.lexicon.update(self.load_lexicon(lexicon_path))
+        self.matcher = AhoCorasick(self.lexicon)
+        self._weights = [self.lexicon[word] for word in self.matcher.patterns]
+        self._matrix = _LexiconMatrix(self.lexicon) if _HAS_NUMPY else None
+        logger.info(f"情感分析服务已初始化，词典共 {len(self.matcher)} 个词。")
+
+    @staticmethod
+    def load_lexicon(path: str) -> Dict[str, float]:
+        """
+        读取情感词典：每行 "词<Tab或逗号>权重"，权重为数字 (如 AFINN 的 -5..5) 或 positive/negative；
+        空行和 # 开头的行会被忽略。
+        """
+        labels = {"positive": 1.0, "negative": -1.0}
+        lexicon: Dict[str, float] = {}
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                word, _, value = line.replace("\t", ",").rpartition(",")
+                word, value = word.strip().lower(), value.strip().lower()
+                try:
+                    weight = labels[value] if value in labels else float(value)
+                except ValueError:
+                    logger.warning(f"情感词典 {path} 第 {line_number} 行格式无法识别，已跳过: {line}")
+                    continue
+                if word and weight:
+                    lexicon[word] = weight
+        logger.info(f"已加载情感词典 {path}，共 {len(lexicon)} 个词。")
+        return lexicon
+
+    def score(self, text: str) -> float:
+        """一趟扫描文本，累加命中词 (每个词只计一次) 的权重"""
+        matched = {index for _, index in self.matcher.iter_matches(text.lower())}
+        return float(sum(self._weights[index] for index in matched))
+
+    def score_batch(self, texts: Sequence[str]) -> List[float]:
+        """批量打分，结果与逐条调用 score 相同；安装了 numpy 时向量化计算"""
+        if self._matrix is None or len(texts) < 32:
+            return [self.score(text) for text in texts]
+        return self._matrix.scores(list(texts), self.score)
+
+    @staticmethod
+    def label(score: float) -> str:
+        if score > 0:
+            return "positive"
+        elif score < 0:
+            return "negative"
+        else:
+            return "neutral"
 
     def analyze_sentiment(self, text: str) -> str:
         """
@@ -24,17 +180,26 @@ class AnalysisService:
         - **text**: 需要分析的文本。
         - **返回**: 'positive', 'negative', 或 'neutral'。
         """
-        text_lower = text.lower()
-        
-        # 计算积极和消极词汇的得分
-        positive_score = sum(1 for word in self.positive_keywords if word in text_lower)
-        negative_score = sum(1 for word in self.negative_keywords if word in text_lower)
-        
-        logger.debug(f"文本: '{text[:50]}...' | 积极得分: {positive_score}, 消极得分: {negative_score}")
-
-        if positive_score > negative_score:
-            return "positive"
-        elif negative_score > positive_score:
-            return "negative"
-        else:
-            return "neutral"
\ No newline at end of file
+        score = self.score(text)
+        logger.debug(f"文本: '{text[:50]}...' | 情感得分: {score}")
+        return self.label(score)
+
+    def analyze_sentiments(self, texts: Sequence[str]) -> List[str]:
+        """
+        批量情感分析，结果与逐条调用 analyze_sentiment 相同。
+
+        - **texts**: 需要分析的文本列表。
+        - **返回**: 与 texts 一一对应的 'positive' / 'negative' / 'neutral' 列表。
+        """
+        return [self.label(score) for score in self.score_batch(texts)]
+
+
+_analysis_service: Optional[AnalysisService] = None
+
+
+def get_analysis_service() -> AnalysisService:
+    """进程内共享的情感分析服务"""
+    global _analysis_service
+    if _analysis_service is None:
+        _analysis_service = AnalysisService()
+    return _analysis_service
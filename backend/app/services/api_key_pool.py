@@ -0,0 +1,184 @@
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+from ..utils.logger import logger
+from ..utils.metrics import register_metrics
+
+
+class ApiKeyState:
+    """单个 API Key 的使用情况：进行中的请求、最近的错误率、剩余配额、冷却时间"""
+
+    def __init__(self, key: str, quota: int = 0):
+        self.key = key
+        self.quota = quota
+        self.in_flight = 0
+        self.requests = 0
+        self.benched_until = 0.0
+        self.times_benched = 0
+        self.upstream_remaining: Optional[int] = None
+        # 最近的请求结果: (时间, 是否失败)
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+
+    @property
+    def remaining_quota(self) -> Optional[int]:
+        """优先使用上游返回的剩余额度，否则按配置的配额估算；都没有时为 None"""
+        if self.upstream_remaining is not None:
+            return self.upstream_remaining
+        if self.quota > 0:
+            return max(0, self.quota - self.requests)
+        return None
+
+    def record_outcome(self, failed: bool):
+        self._outcomes.append((time.monotonic(), failed))
+
+    def error_rate(self, window: float) -> float:
+        cutoff = time.monotonic() - window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, failed in self._outcomes if failed) / len(self._outcomes)
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.benched_until and self.remaining_quota != 0
+
+
+class ApiKeyPool:
+    """
+    上游 API Key 池
+    - least_loaded: 选择进行中请求最少的 Key，其次是最近错误率、累计请求数最低的；
+    - round_robin: 在可用的 Key 之间轮转。
+    收到 429 / 401 / 403 的 Key 会被暂时停用 (冷却)，冷却结束后自动恢复；
+    最后一个可用的 Key 收到 401 / 403 时只冷却 bench_seconds_last_key 秒并记录错误，避免收集整整停摆一小时。
+    每个 Key 在传输层有独立的令牌桶与并发限流，因此吞吐量随 Key 数量近似线性增长。
+    """
+
+    REMAINING_HEADERS = ("X-RateLimit-Remaining", "X-Ratelimit-Remaining")
+
+    def __init__(
+        self,
+        keys: List[str],
+        strategy: str = "least_loaded",
+        quota_per_key: int = 0,
+        bench_seconds_429: float = 60.0,
+        bench_seconds_401: float = 3600.0,
+        error_window: float = 300.0,
+        bench_seconds_last_key: float = 60.0,
+    ):
+        if strategy not in ("least_loaded", "round_robin"):
+            raise ValueError(f"不支持的 API Key 选择策略: {strategy}")
+        self.strategy = strategy
+        self.bench_seconds_429 = bench_seconds_429
+        self.bench_seconds_401 = bench_seconds_401
+        self.bench_seconds_last_key = bench_seconds_last_key
+        self.error_window = error_window
+        self._keys = [ApiKeyState(key, quota_per_key) for key in dict.fromkeys(keys) if key]
+        self._round_robin = itertools.cycle(range(len(self._keys))) if self._keys else None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def acquire(self) -> Optional[ApiKeyState]:
+        """取出一个可用的 Key 并计入进行中请求；全部冷却或配额用尽时返回 None"""
+        now = time.monotonic()
+        available = [state for state in self._keys if state.is_available(now)]
+        if not available:
+            return None
+
+        if self.strategy == "round_robin":
+            while True:
+                state = self._keys[next(self._round_robin)]
+                if state.is_available(now):
+                    break
+        else:
+            state = min(
+                available,
+                key=lambda s: (s.in_flight, s.error_rate(self.error_window), s.requests),
+            )
+        state.in_flight += 1
+        state.requests += 1
+        return state
+
+    def release(self, state: ApiKeyState, response: Optional[httpx.Response]):
+        """回报请求结果：更新错误率和剩余配额，必要时让该 Key 进入冷却"""
+        state.in_flight -= 1
+        status = response.status_code if response is not None else None
+        state.record_outcome(status is None or status >= 400)
+        if response is None:
+            return
+
+        for header in self.REMAINING_HEADERS:
+            value = response.headers.get(header)
+            if value is not None and value.isdigit():
+                state.upstream_remaining = int(value)
+                break
+
+        if status == 429:
+            retry_after = response.headers.get("Retry-After")
+            seconds = self.bench_seconds_429
+            try:
+                seconds = max(seconds, float(retry_after)) if retry_after else seconds
+            except ValueError:
+                pass
+            self._bench(state, seconds, "429 限流")
+        elif status in (401, 403):
+            now = time.monotonic()
+            if any(other is not state and other.is_available(now) for other in self._keys):
+                self._bench(state, self.bench_seconds_401, f"{status} 鉴权失败")
+            else:
+                logger.error(f"最后一个可用的 API Key ...{state.key[-4:]} 鉴权失败 ({status})，请检查 Key 是否有效")
+                self._bench(state, min(self.bench_seconds_401, self.bench_seconds_last_key), f"{status} 鉴权失败")
+
+    def _bench(self, state: ApiKeyState, seconds: float, reason: str):
+        state.benched_until = time.monotonic() + seconds
+        state.times_benched += 1
+        logger.warning(f"API Key ...{state.key[-4:]} 因 {reason} 暂停使用 {seconds:.0f} 秒")
+
+    def stats(self) -> Dict[str, Any]:
+        # API Key 只保留末尾 4 位，避免在指标中泄露
+        now = time.monotonic()
+        return {
+            "strategy": self.strategy,
+            "available": sum(1 for state in self._keys if state.is_available(now)),
+            "keys": {
+                f"...{state.key[-4:]}": {
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "error_rate": round(state.error_rate(self.error_window), 4),
+                    "remaining_quota": state.remaining_quota,
+                    "benched_for": round(max(0.0, state.benched_until - now), 1),
+                    "times_benched": state.times_benched,
+                }
+                for state in self._keys
+            },
+        }
+
+
+_twitterapi_key_pool: Optional[ApiKeyPool] = None
+
+
+def get_twitterapi_key_pool() -> ApiKeyPool:
+    """
+    twitterapi.io 的共享 Key 池
+    TWITTERAPI_IO_KEYS (逗号分隔) 为空时退回到单个 TWITTERAPI_IO_KEY
+    """
+    global _twitterapi_key_pool
+    if _twitterapi_key_pool is None:
+        keys = [key.strip() for key in settings.TWITTERAPI_IO_KEYS.split(",") if key.strip()]
+        _twitterapi_key_pool = ApiKeyPool(
+            keys=keys or [settings.TWITTERAPI_IO_KEY],
+            strategy=settings.API_KEY_SELECTION,
+            quota_per_key=settings.API_KEY_QUOTA,
+            bench_seconds_429=settings.API_KEY_BENCH_SECONDS_429,
+            bench_seconds_401=settings.API_KEY_BENCH_SECONDS_401,
+            error_window=settings.API_KEY_ERROR_WINDOW_SECONDS,
+            bench_seconds_last_key=settings.API_KEY_BENCH_SECONDS_LAST_KEY,
+        )
+        register_metrics("twitterapi_key_pool", _twitterapi_key_pool.stats)
+        logger.info(f"twitterapi.io Key 池已加载 {len(_twitterapi_key_pool)} 个 Key ({settings.API_KEY_SELECTION})")
+    return _twitterapi_key_pool
@@ -1,80 +1,32 @@
-import subprocess
-import json
 from datetime import datetime
 from typing import List, Dict, Any
+from .http_transport import get_http_transport
 from ..core.config import settings
 from ..utils.logger import logger
 
 class CurlTwitterService:
     """
-    直接使用 curl 命令调用 twitterapi.io 的服务
-    这是为了解决 Python requests 库无法成功调用 API 的问题
+    调用 twitterapi.io 的服务
+    原先直接 fork curl 命令，现已迁移到共享的异步 HTTP 传输层
     """
     
     def __init__(self):
         self.api_key = settings.TWITTERAPI_IO_KEY
         self.base_url = "https://api.twitterapi.io"
+        self.transport = get_http_transport()
         logger.info("CurlTwitterService 已初始化")
 
-    def _execute_curl(self, url: str, params: Dict[str, str] = None) -> Dict[str, Any]:
+    async def _request_json(self, url: str, params: Dict[str, str] = None) -> Dict[str, Any]:
         """
-        执行 curl 命令并返回 JSON 响应
+        通过共享的 HTTP 传输层请求并返回 JSON 响应
         """
-        # 构建 curl 命令
-        cmd = [
-            'curl',
-            '-H', f'X-API-Key: {self.api_key}',
-            '-H', 'User-Agent: curl/8.4.0',
-            '-H', 'Accept: */*',
-            '--silent',  # 静默模式，不显示进度
-            '--show-error',  # 显示错误
-            '--fail',  # 在 HTTP 错误时失败
-        ]
-        
-        # 添加参数
-        if params:
-            for key, value in params.items():
-                cmd.extend(['--data-urlencode', f'{key}={value}'])
-            cmd.append('--get')  # 使用 GET 方法发送数据
-        
-        cmd.append(url)
-        
-        try:
-            logger.info(f"执行 curl 命令: {' '.join(cmd[:3])} ... {url}")
-            
-            # 执行命令
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
-                # 成功，解析 JSON
-                try:
-                    data = json.loads(result.stdout)
-                    logger.info("✅ curl 命令执行成功")
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON 解析失败: {e}")
-                    logger.error(f"原始响应: {result.stdout}")
-                    return {}
-            else:
-                # 失败
-                logger.error(f"❌ curl 命令失败，返回码: {result.returncode}")
-                logger.error(f"错误输出: {result.stderr}")
-                logger.error(f"标准输出: {result.stdout}")
-                return {}
-                
-        except subprocess.TimeoutExpired:
-            logger.error("curl 命令超时")
-            return {}
-        except Exception as e:
-            logger.error(f"执行 curl 命令时发生错误: {e}")
-            return {}
+        headers = {
+            'X-API-Key': self.api_key,
+            'User-Agent': 'curl/8.4.0',
+        }
+        return await self.transport.get_json(url, params=params, headers=headers)
 
-    def search_users(self, query: str, count: int = 20) -> List[Dict[str, Any]]:
+    async def search_users(self, query: str, count: int = 20) -> List[Dict[str, Any]]:
         """
         搜索与查询相关的用户
         """
@@ -83,7 +35,7 @@ class CurlTwitterService:
         url = f"{self.base_url}/twitter/user/search"
         params = {'query': query}
         
-        data = self._execute_curl(url, params)
+        data = await self._request_json(url, params)
         
         if data and 'users' in data:
             users = data['users']
@@ -93,14 +45,14 @@ class CurlTwitterService:
             logger.warning("❌ 未找到用户数据")
             return []
 
-    def get_trending_content_via_users(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_trending_content_via_users(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
         通过搜索相关用户来获取趋势内容
         """
         logger.info(f"通过用户搜索获取 '{query}' 的趋势内容")
         
         # 1. 搜索相关用户
-        users = self.search_users(query, count=10)
+        users = await self.search_users(query, count=10)
         
         if not users:
             logger.warning("未找到相关用户")
@@ -129,7 +81,7 @@ class CurlTwitterService:
         logger.info(f"✅ 生成了 {len(trending_content)} 条基于用户的趋势内容")
         return trending_content[:limit]
 
-    def test_connection(self) -> bool:
+    async def test_connection(self) -> bool:
         """
         测试与 API 的连接
         """
@@ -138,7 +90,7 @@ class CurlTwitterService:
         url = f"{self.base_url}/twitter/user/search"
         params = {'query': 'test'}
         
-        data = self._execute_curl(url, params)
+        data = await self._request_json(url, params)
         
         if data:
             logger.info("✅ curl 连接测试成功")
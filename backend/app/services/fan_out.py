@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ..utils.logger import logger
+
+SourceStream = Callable[[], AsyncIterator[List[Dict[Any, Any]]]]
+BatchCallback = Callable[[str, List[Dict[Any, Any]]], None]
+
+
+class FanOutResult:
+    """多数据源并发抓取的结果"""
+
+    def __init__(self):
+        # 数据源 -> 已收到的帖子（超时的数据源也会保留已到达的批次）
+        self.posts_by_source: Dict[str, List[Dict[Any, Any]]] = {}
+        # 未能完整返回的数据源 -> 原因 ("timeout" / "deadline" / "error")
+        self.missed_sources: Dict[str, str] = {}
+
+    @property
+    def all_posts(self) -> List[Dict[Any, Any]]:
+        return [post for posts in self.posts_by_source.values() for post in posts]
+
+
+async def fan_out(
+    sources: Dict[str, SourceStream],
+    per_source_timeout: float,
+    deadline: float,
+    on_batch: Optional[BatchCallback] = None,
+) -> FanOutResult:
+    """
+    同时查询所有数据源
+
+    - **sources**: 数据源名称 -> 按批次产出帖子的异步生成器工厂
+    - **per_source_timeout**: 单个数据源的超时时间（秒）
+    - **deadline**: 整体截止时间（秒），到期后携带已完成的部分结果继续
+    - **on_batch**: 每到达一批帖子时回调，下游可以不等全部数据源结束就开始处理
+    """
+    result = FanOutResult()
+    for name in sources:
+        result.posts_by_source[name] = []
+
+    async def drain(name: str, stream: SourceStream):
+        async with aclosing(stream()) as batches:
+            async for batch in batches:
+                result.posts_by_source[name].extend(batch)
+                if on_batch is not None:
+                    on_batch(name, batch)
+
+    tasks = {
+        asyncio.create_task(asyncio.wait_for(drain(name, stream), timeout=per_source_timeout)): name
+        for name, stream in sources.items()
+    }
+    if not tasks:
+        return result
+
+    try:
+        done, pending = await asyncio.wait(tasks.keys(), timeout=deadline)
+    except asyncio.CancelledError:
+        # 调用方被取消时，不让子任务继续占用上游配额
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # 按数据源的配置顺序汇总，保证结果顺序稳定
+    for task, name in tasks.items():
+        if task not in done:
+            result.missed_sources[name] = "deadline"
+            continue
+        try:
+            task.result()
+        except asyncio.TimeoutError:
+            result.missed_sources[name] = "timeout"
+        except Exception as e:
+            logger.error(f"数据源 '{name}' 抓取失败: {e}")
+            result.missed_sources[name] = "error"
+
+    if result.missed_sources:
+        logger.warning(f"以下数据源未在时限内完整返回，使用部分结果继续: {result.missed_sources}")
+    return result
@@ -0,0 +1,444 @@
+import asyncio
+import importlib.util
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from .api_key_pool import ApiKeyPool
+from .response_cache import ResponseCache
+from ..core.config import settings
+from ..utils.logger import logger
+from ..utils.circuit_breaker import get_circuit_breaker
+from ..utils.json_stream import JsonProjection
+from ..utils.latency import LatencyWindow
+from ..utils.metrics import register_metrics
+from ..utils.rate_limit import AdaptiveConcurrencyLimiter, TokenBucket, UpstreamLimiter
+
+
+class CallBudget:
+    """
+    一次查询可以发出的上游请求数
+    每次真正发往上游的请求 (包括换 Key 重试) 都消耗一次，命中响应缓存不消耗
+    """
+
+    def __init__(self, calls: int):
+        self.remaining = calls
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class HttpTransport:
+    """
+    共享的异步 HTTP 传输层
+    使用 keep-alive 连接池复用 TCP/TLS 连接，替代每次请求 fork 一个 curl 进程
+    """
+
+    def __init__(
+        self,
+        proxy: Optional[str] = None,
+        http2: bool = False,
+        timeout: float = 30.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_connections_per_host: int = 10,
+        response_cache: Optional[ResponseCache] = None,
+    ):
+        self.proxy = proxy
+        self.response_cache = response_cache
+        self.timeout = timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+
+        # HTTP/2 依赖可选的 h2 包，未安装时回退到 HTTP/1.1
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("已启用 HTTP/2 但未安装 h2 包 (pip install 'httpx[http2]')，回退到 HTTP/1.1")
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """懒加载连接池，确保在事件循环内创建"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                proxy=self.proxy,
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"Accept": "*/*"},
+            )
+        return self._client
+
+    def _host_semaphore(self, url: str, api_key: str = "") -> asyncio.Semaphore:
+        """
+        每个 (主机, API Key) 一个信号量，限制单个上游的并发连接数
+        与限流器一样按 Key 划分，多个 Key 的总并发随 Key 数量增长
+        """
+        slot = (urlsplit(url).netloc, api_key)
+        semaphore = self._host_semaphores.get(slot)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[slot] = semaphore
+        return semaphore
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        projection: Optional[JsonProjection] = None,
+    ) -> Optional[httpx.Response]:
+        """
+        发送 GET 请求并返回原始响应，网络错误时返回 None
+        上游熔断时直接返回 None；启用对冲请求时，主请求超过 p95 延迟仍未返回会再发一次
+        传入 projection 时 200 响应体边下载边解析，裁剪结果放在 response.extensions["projected"]，
+        响应体本身不再保留
+        """
+        host = urlsplit(url).netloc
+        breaker = get_circuit_breaker(
+            host,
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+        )
+        if not breaker.allow_request():
+            logger.warning(f"上游 {host} 熔断中，快速失败: {url}")
+            return None
+
+        settled = False
+        try:
+            hedge_delay = self._hedge_delay(host) if settings.HEDGE_REQUESTS_ENABLED else None
+            if hedge_delay is None:
+                response = await self._send(url, params, headers, timeout, projection)
+            else:
+                response = await self._send_hedged(url, params, headers, timeout, projection, hedge_delay)
+
+            if response is None or response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            settled = True
+            return response
+        finally:
+            # 请求被取消时没有可判断的结果：归还 half-open 探测名额，否则熔断器会一直卡在 half-open
+            if not settled:
+                breaker.release()
+
+    def _hedge_delay(self, host: str) -> Optional[float]:
+        """样本足够时返回该主机的 p95 延迟作为对冲等待时间"""
+        window = self._latencies.get(host)
+        if window is None or len(window) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return window.percentile(settings.HEDGE_PERCENTILE)
+
+    async def _send_hedged(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        projection: Optional[JsonProjection],
+        hedge_delay: float,
+    ) -> Optional[httpx.Response]:
+        """对冲请求：只用于幂等的 GET，先返回有效响应的一方胜出，另一方被取消"""
+        primary = asyncio.create_task(self._send(url, params, headers, timeout, projection))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            hedge = asyncio.create_task(self._send(url, params, headers, timeout, projection))
+            tasks.add(hedge)
+            _hedge_counters["hedged"] += 1
+            logger.info(f"主请求超过 p95 ({hedge_delay:.2f}s) 仍未返回，发送对冲请求: {url}")
+
+            response = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if response is not None:
+                        if task is hedge:
+                            _hedge_counters["hedge_wins"] += 1
+                        return response
+            return response
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        projection: Optional[JsonProjection] = None,
+    ) -> Optional[httpx.Response]:
+        """
+        真正发出一次请求
+        每个请求都经过对应上游 + API Key 的令牌桶和自适应并发限流
+        """
+        client = self._get_client()
+        host = urlsplit(url).netloc
+        api_key = (headers or {}).get("X-API-Key", "")
+        limiter = get_upstream_limiter(host, api_key)
+
+        try:
+            logger.info(f"HTTP GET: {url} 参数: {params}")
+            async with limiter.slot() as permit, self._host_semaphore(url, api_key):
+                started = time.monotonic()
+                request = client.build_request(
+                    "GET",
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+                try:
+                    response = await client.send(request, stream=True)
+                    try:
+                        if projection is not None and response.status_code == 200:
+                            response.extensions["projected"] = await projection.parse_stream(response.aiter_bytes())
+                        else:
+                            await response.aread()
+                    finally:
+                        await response.aclose()
+                except httpx.TimeoutException:
+                    # 超时是过载信号；被取消 (例如对冲请求中落败的一方) 则不是
+                    permit.record_timeout()
+                    raise
+                latency = time.monotonic() - started
+                permit.record(response.status_code, latency, _retry_after(response))
+                if response.status_code < 500:
+                    self._latencies.setdefault(host, LatencyWindow()).add(latency)
+                return response
+        except httpx.TimeoutException:
+            logger.error(f"请求超时: {url}")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP 请求失败: {url} - {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"响应 JSON 解析失败: {url} - {e}")
+            return None
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        key_pool: Optional[ApiKeyPool] = None,
+        projection: Optional[JsonProjection] = None,
+        budget: Optional[CallBudget] = None,
+    ) -> Dict[str, Any]:
+        """
+        发送 GET 请求并返回解析后的 JSON
+        与原先的 curl 辅助函数保持一致：任何失败都记录日志并返回空字典
+        配置了响应缓存 TTL 的端点会先查缓存，命中时不再请求上游
+        传入 key_pool 时从池中选取 X-API-Key；
+        传入 projection 时只返回 (并缓存) 其中列出的字段；
+        传入 budget 时每次发往上游的请求 (包括换 Key 重试) 都计入预算，预算用完时返回空字典
+        """
+        cache_key = None
+        if self.response_cache is not None:
+            ttl = self.response_cache.ttl_for(url)
+            if ttl > 0:
+                cache_key = self.response_cache.make_key(url, params, projection)
+                body = await self.response_cache.get(cache_key, ttl)
+                if body is not None:
+                    logger.info(f"✅ 响应缓存命中: {cache_key}")
+                    return json.loads(body)
+
+        if key_pool is None:
+            if budget is not None and not budget.take():
+                logger.info(f"上游调用预算已用完，跳过请求: {url}")
+                return {}
+            response = await self.get(url, params=params, headers=headers, projection=projection)
+        else:
+            response = await self._get_with_key_pool(url, params, headers, key_pool, projection, budget)
+        if response is None:
+            return {}
+
+        if response.status_code != 200:
+            logger.error(f"上游返回非 200 状态码: {response.status_code} - {url}")
+            logger.error(f"响应内容: {response.text[:200]}...")
+            return {}
+
+        if projection is not None:
+            data = response.extensions.get("projected", {})
+            logger.info(f"✅ HTTP 请求成功 ({response.http_version})")
+            if cache_key is not None:
+                await self.response_cache.set(cache_key, json.dumps(data).encode("utf-8"))
+            return data
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            logger.error(f"JSON 解析失败: {e}")
+            logger.error(f"原始响应: {response.text[:200]}...")
+            return {}
+
+        logger.info(f"✅ HTTP 请求成功 ({response.http_version})")
+        if cache_key is not None:
+            await self.response_cache.set(cache_key, response.content)
+        return data
+
+    async def _get_with_key_pool(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        key_pool: ApiKeyPool,
+        projection: Optional[JsonProjection] = None,
+        budget: Optional[CallBudget] = None,
+    ) -> Optional[httpx.Response]:
+        """使用池中的 Key 发送请求；某个 Key 被限流或鉴权失败时换下一个可用的 Key 重试，每次尝试都计入 budget"""
+        response = None
+        for _ in range(len(key_pool)):
+            if budget is not None and not budget.take():
+                logger.info(f"上游调用预算已用完，不再换 Key 重试: {url}")
+                break
+            state = key_pool.acquire()
+            if state is None:
+                logger.error(f"没有可用的 API Key (全部冷却中或配额用尽): {url}")
+                break
+            try:
+                response = await self.get(
+                    url,
+                    params=params,
+                    headers={**(headers or {}), "X-API-Key": state.key},
+                    projection=projection,
+                )
+            finally:
+                key_pool.release(state, response)
+            if response is None or response.status_code not in (401, 403, 429):
+                break
+        return response
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """解析 429 响应中以秒为单位的 Retry-After 头"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+# 每个 (上游主机, API Key) 一个限流器，所有收集器共享
+_limiters: Dict[Tuple[str, str], UpstreamLimiter] = {}
+
+
+def get_upstream_limiter(host: str, api_key: str = "") -> UpstreamLimiter:
+    """获取上游主机 + API Key 对应的令牌桶与自适应并发限流器"""
+    limiter = _limiters.get((host, api_key))
+    if limiter is None:
+        rate = settings.RATE_LIMIT_RPS.get(host, settings.RATE_LIMIT_DEFAULT_RPS)
+        limiter = UpstreamLimiter(
+            TokenBucket(rate=rate, capacity=max(1.0, rate * settings.RATE_LIMIT_BURST_SECONDS)),
+            AdaptiveConcurrencyLimiter(
+                initial=settings.ADAPTIVE_CONCURRENCY_INITIAL,
+                min_limit=settings.ADAPTIVE_CONCURRENCY_MIN,
+                max_limit=settings.ADAPTIVE_CONCURRENCY_MAX,
+                latency_tolerance=settings.ADAPTIVE_LATENCY_TOLERANCE,
+            ),
+        )
+        _limiters[(host, api_key)] = limiter
+    return limiter
+
+
+def _limiter_stats() -> Dict[str, Any]:
+    # API Key 只保留末尾 4 位，避免在指标中泄露
+    return {
+        f"{host}#{api_key[-4:] or '-'}": limiter.stats()
+        for (host, api_key), limiter in _limiters.items()
+    }
+
+
+register_metrics("upstream_rate_limits", _limiter_stats)
+
+# 对冲请求统计：发出的对冲次数，以及对冲请求先于主请求返回的次数
+_hedge_counters = {"hedged": 0, "hedge_wins": 0}
+
+
+def _hedge_stats() -> Dict[str, Any]:
+    hedged = _hedge_counters["hedged"]
+    return {
+        **_hedge_counters,
+        "win_rate": round(_hedge_counters["hedge_wins"] / hedged, 4) if hedged else 0.0,
+    }
+
+
+register_metrics("upstream_hedging", _hedge_stats)
+
+
+# 进程内共享的传输层实例，键为是否直连（不走代理）
+_transports: Dict[bool, HttpTransport] = {}
+
+# 所有传输层共享同一个上游响应缓存
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """获取共享的上游响应缓存，未启用时返回 None"""
+    global _response_cache
+    if _response_cache is None and settings.UPSTREAM_CACHE_ENABLED:
+        _response_cache = ResponseCache(
+            endpoint_ttls=settings.UPSTREAM_CACHE_TTLS,
+            max_bytes=settings.UPSTREAM_CACHE_MAX_BYTES,
+            disk_dir=settings.UPSTREAM_CACHE_DIR,
+            disk_max_bytes=settings.UPSTREAM_CACHE_DISK_MAX_BYTES,
+        )
+        register_metrics("upstream_response_cache", _response_cache.stats)
+    return _response_cache
+
+
+def get_http_transport(direct: bool = False) -> HttpTransport:
+    """
+    获取共享的 HTTP 传输层
+    默认使用 settings 中的 HTTPS_PROXY；direct=True 时返回不走代理的连接池
+    """
+    transport = _transports.get(direct)
+    if transport is None:
+        proxy = None
+        if not direct and settings.USE_PROXY and settings.HTTPS_PROXY:
+            proxy = settings.HTTPS_PROXY
+        transport = HttpTransport(
+            proxy=proxy,
+            http2=settings.HTTP2_ENABLED,
+            timeout=settings.HTTP_TIMEOUT,
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            response_cache=get_response_cache(),
+        )
+        _transports[direct] = transport
+        if proxy:
+            logger.info(f"HTTP 传输层已加载代理: {proxy}")
+    return transport
+
+
+async def close_http_transports():
+    """在应用关闭时释放所有连接池"""
+    for transport in _transports.values():
+        await transport.aclose()
+    _transports.clear()
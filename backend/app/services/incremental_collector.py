@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..data.models.database import SessionLocal, RawPost, RawPostEngagement, RawPostQuery, CollectionWatermark
+from ..utils.logger import logger
+
+# 接收 since_id，按批次产出比它更新的帖子
+IncrementalStream = Callable[[Optional[str]], AsyncIterator[List[Dict[Any, Any]]]]
+
+
+def _parse_datetime(value: Any) -> datetime:
+    """将帖子的 created_at 统一为不带时区的 UTC 时间，便于存入 SQLite 并比较"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except (TypeError, ValueError):
+            return datetime.utcnow()
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _is_newer(post: Dict[Any, Any], last_id: Optional[str], last_at: Optional[datetime]) -> bool:
+    """推文 ID 为递增的数字，可直接比较；否则退回到比较发布时间"""
+    if last_id is None and last_at is None:
+        return True
+    post_id = str(post.get('id', ''))
+    if last_id and post_id.isdigit() and last_id.isdigit():
+        return int(post_id) > int(last_id)
+    if last_at is not None:
+        return _parse_datetime(post.get('created_at')) > last_at
+    return True
+
+
+class IncrementalCollector:
+    """
+    基于水位线的增量收集
+    每个 (平台, 规范化查询) 记录已入库的最新帖子 ID 和时间；
+    收集器只抓取更新的帖子，新帖子写入 raw_posts 后与该查询已存储的帖子合并返回
+    """
+
+    def __init__(self, merge_limit: int = 200):
+        self.merge_limit = merge_limit
+
+    async def iter_posts(
+        self, platform: str, query: str, stream: IncrementalStream, merge_stored: bool = True
+    ) -> AsyncIterator[List[Dict[Any, Any]]]:
+        """产出比水位线更新的帖子；merge_stored 为 True 时最后再产出已存储的帖子"""
+        last_id, last_at = await run_in_threadpool(self._load_watermark, platform, query)
+        if last_id or last_at:
+            logger.info(f"[{platform}] 查询 '{query}' 从水位线 {last_id} / {last_at} 开始增量收集")
+
+        seen_urls: Set[str] = set()
+        new_count = 0
+        async for batch in stream(last_id):
+            fresh = [post for post in batch if _is_newer(post, last_id, last_at)]
+            if not fresh:
+                continue
+            await run_in_threadpool(self._store_batch, platform, query, fresh)
+            seen_urls.update(post.get('url', '') for post in fresh)
+            new_count += len(fresh)
+            yield fresh
+
+        if not merge_stored:
+            logger.info(f"[{platform}] 查询 '{query}' 新增 {new_count} 条帖子")
+            return
+        stored = await run_in_threadpool(self._load_stored_posts, platform, query, seen_urls)
+        logger.info(f"[{platform}] 查询 '{query}' 新增 {new_count} 条帖子，合并已存储的 {len(stored)} 条")
+        if stored:
+            yield stored
+
+    async def iter_stored_posts(self, platform: str, query: str) -> AsyncIterator[List[Dict[Any, Any]]]:
+        """只读取本地已存储的帖子，不访问上游"""
+        stored = await run_in_threadpool(self._load_stored_posts, platform, query, set())
+        if stored:
+            yield stored
+
+    def _load_watermark(self, platform: str, query: str) -> Tuple[Optional[str], Optional[datetime]]:
+        db = SessionLocal()
+        try:
+            watermark = db.query(CollectionWatermark).filter_by(platform=platform, query=query).first()
+            if watermark is None:
+                return None, None
+            return watermark.last_post_id, watermark.last_post_at
+        finally:
+            db.close()
+
+    def _store_batch(self, platform: str, query: str, posts: List[Dict[Any, Any]]):
+        """写入新帖子、关联查询，并推进水位线"""
+        db = SessionLocal()
+        try:
+            watermark = db.query(CollectionWatermark).filter_by(platform=platform, query=query).first()
+            if watermark is None:
+                watermark = CollectionWatermark(platform=platform, query=query, updated_at=datetime.utcnow())
+                db.add(watermark)
+
+            for post in posts:
+                url = post.get('url')
+                if not url:
+                    continue
+                created_at = _parse_datetime(post.get('created_at'))
+                likes = int(post.get('likes', post.get('upvotes', 0)) or 0)
+                raw_post = db.query(RawPost).filter(RawPost.url == url).first()
+                if raw_post is None:
+                    raw_post = RawPost(
+                        platform=post.get('platform', platform),
+                        author=post.get('author'),
+                        text=post.get('text') or post.get('title', ''),
+                        url=url,
+                        likes=likes,
+                        created_at=created_at,
+                    )
+                    db.add(raw_post)
+                    db.flush()
+                else:
+                    raw_post.likes = likes
+                # 互动数据随时间变化，每次收集到都覆盖为最新值
+                db.merge(RawPostEngagement(
+                    raw_post_id=raw_post.id,
+                    post_id=str(post.get('id', '')) or None,
+                    retweets=int(post.get('retweets', post.get('comments', 0)) or 0), # Reddit 以评论数代替转发数
+                    followers=int((post.get('user_info') or {}).get('followers', 0) or 0),
+                ))
+                db.merge(RawPostQuery(raw_post_id=raw_post.id, query=query))
+
+                if _is_newer(post, watermark.last_post_id, watermark.last_post_at):
+                    watermark.last_post_id = str(post.get('id', '')) or watermark.last_post_id
+                if watermark.last_post_at is None or created_at > watermark.last_post_at:
+                    watermark.last_post_at = created_at
+
+            watermark.updated_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"写入增量收集结果失败: {e}")
+        finally:
+            db.close()
+
+    def _load_stored_posts(self, platform: str, query: str, exclude_urls: Set[str]) -> List[Dict[Any, Any]]:
+        """读取该查询此前已入库的帖子（最新的优先）"""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(RawPost, RawPostEngagement)
+                .join(RawPostQuery, RawPostQuery.raw_post_id == RawPost.id)
+                .outerjoin(RawPostEngagement, RawPostEngagement.raw_post_id == RawPost.id)
+                .filter(RawPostQuery.query == query, RawPost.platform == platform)
+                .order_by(RawPost.created_at.desc())
+                .limit(self.merge_limit + len(exclude_urls))
+                .all()
+            )
+            return [
+                self._stored_post(row, engagement)
+                for row, engagement in rows
+                if row.url not in exclude_urls
+            ][:self.merge_limit]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _stored_post(row: RawPost, engagement: Optional[RawPostEngagement]) -> Dict[Any, Any]:
+        """与收集器输出的字段保持一致，保证新抓取的帖子和已存储的帖子排序结果相同"""
+        return {
+            "platform": row.platform,
+            "id": (engagement.post_id if engagement is not None else None) or "",
+            "author": row.author,
+            "text": row.text,
+            "url": row.url,
+            "likes": row.likes,
+            "retweets": engagement.retweets if engagement is not None else 0,
+            "created_at": row.created_at.isoformat(),
+            "user_info": {"followers": engagement.followers if engagement is not None else 0},
+        }
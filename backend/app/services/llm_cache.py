@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from ..data.models.database import SessionLocal, LLMInsightCacheEntry
+from ..utils.logger import logger
+from ..utils.query import normalize_query
+
+
+class LLMInsightCache:
+    """
+    LLM 洞察结果的持久化缓存
+    key 为 (模型, 提示词版本, 规范化后的样本文本) 的哈希：同一批帖子再次分析时直接复用上次的结果，
+    不再调用 LLM。条目超过 ttl 失效，总数超过 max_entries 时淘汰最久未命中的条目；
+    修改提示词时提升提示词版本号，旧版本的条目会在下一次写入时被清理。
+    方法均为同步调用，与 LLM 提供者一样在线程池中执行。
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_prompt_tokens": 0,
+            "saved_completion_tokens": 0,
+        }
+
+    @staticmethod
+    def fingerprint(model: str, prompt_version: str, texts: Iterable[str]) -> str:
+        """样本文本忽略大小写、多余空白和顺序"""
+        normalized = sorted(normalize_query(text) for text in texts)
+        digest = hashlib.sha256()
+        digest.update(f"{model}\x00{prompt_version}\x00".encode("utf-8"))
+        for text in normalized:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        db = SessionLocal()
+        try:
+            row = db.get(LLMInsightCacheEntry, fingerprint)
+            if row is None or now - row.stored_at >= self.ttl:
+                self._count("misses")
+                return None
+            row.last_hit_at = now
+            db.commit()
+            self._count("hits")
+            self._count("saved_prompt_tokens", row.prompt_tokens or 0)
+            self._count("saved_completion_tokens", row.completion_tokens or 0)
+            return json.loads(row.payload)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"读取 LLM 洞察缓存失败: {e}")
+            self._count("misses")
+            return None
+        finally:
+            db.close()
+
+    def set(
+        self,
+        fingerprint: str,
+        model: str,
+        prompt_version: str,
+        result: Dict[str, Any],
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ):
+        now = time.time()
+        db = SessionLocal()
+        try:
+            db.merge(LLMInsightCacheEntry(
+                fingerprint=fingerprint,
+                model=model,
+                prompt_version=prompt_version,
+                payload=json.dumps(result, ensure_ascii=False),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                stored_at=now,
+                last_hit_at=now,
+            ))
+            # 清理过期条目和旧提示词版本的条目
+            evicted = db.query(LLMInsightCacheEntry).filter(
+                (LLMInsightCacheEntry.stored_at < now - self.ttl)
+                | (LLMInsightCacheEntry.prompt_version != prompt_version)
+            ).delete(synchronize_session=False)
+            db.flush()
+            # 超出条目上限时淘汰最久未命中的条目
+            overflow = db.query(LLMInsightCacheEntry).count() - self.max_entries
+            if overflow > 0:
+                oldest = (
+                    db.query(LLMInsightCacheEntry.fingerprint)
+                    .order_by(LLMInsightCacheEntry.last_hit_at)
+                    .limit(overflow)
+                    .subquery()
+                )
+                evicted += db.query(LLMInsightCacheEntry).filter(
+                    LLMInsightCacheEntry.fingerprint.in_(db.query(oldest.c.fingerprint))
+                ).delete(synchronize_session=False)
+            db.commit()
+            self._count("stores")
+            self._count("evictions", evicted)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"写入 LLM 洞察缓存失败: {e}")
+        finally:
+            db.close()
+
+    def invalidate(self, prompt_version: Optional[str] = None) -> int:
+        """删除指定提示词版本 (未指定时为全部) 的缓存条目，返回删除的条目数"""
+        db = SessionLocal()
+        try:
+            query = db.query(LLMInsightCacheEntry)
+            if prompt_version is not None:
+                query = query.filter(LLMInsightCacheEntry.prompt_version == prompt_version)
+            deleted = query.delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -1,11 +1,46 @@
+import asyncio
+import heapq
 import json
+import math
+import re
+import time
 from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import aclosing
+import httpx
+from fastapi.concurrency import run_in_threadpool
 from zhipuai import ZhipuAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Set, Tuple
 
 # Import the central settings object
 from ..core.config import settings
 from ..data.models import database
+from ..data.processors.dedup import jaccard, shingles
+from ..data.processors.prompt_packing import PromptPacker, estimate_tokens
+from ..data.processors.ranking import MentionRanker, post_engagement
+from ..utils.circuit_breaker import get_circuit_breaker
+from ..utils.metrics import register_metrics
+from .analysis_service import get_analysis_service
+from .llm_cache import LLMInsightCache
+
+# Bump whenever the insight prompt below changes; cached insights produced by
+# other prompt versions are never served and get purged on the next write.
+PROMPT_VERSION = "insights-v1"
+
+# Concurrent GLM requests are capped per process, not per provider: the router
+# builds one provider per model, and all of them share the account's limit.
+# Created lazily inside the running event loop, like the httpx client, and
+# recreated when a new loop (e.g. another asyncio.run) starts using it.
+_llm_slots: Optional[asyncio.Semaphore] = None
+_llm_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_llm_slots() -> asyncio.Semaphore:
+    global _llm_slots, _llm_slots_loop
+    loop = asyncio.get_running_loop()
+    if _llm_slots is None or _llm_slots_loop is not loop:
+        _llm_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _llm_slots_loop = loop
+    return _llm_slots
 
 class LLMProvider(ABC):
     """Abstract base class for a generic LLM provider."""
@@ -13,39 +48,515 @@ class LLMProvider(ABC):
     def generate_insights_for_cluster(self, cluster_posts: List[database.RawPost]) -> Dict[str, Any]:
         pass
 
+    async def agenerate_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant used by the API. Providers without a native async client
+        fall back to running the blocking call in the threadpool. `tier`
+        ("fast" or "quality") only matters to the router; single-model
+        providers ignore it.
+        """
+        return await run_in_threadpool(self.generate_insights_for_cluster, cluster_posts)
+
+    async def astream_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the analysis as events: {"type": "token", "content": ...} for each
+        piece of generated text, then {"type": "result", "data": ...} with the
+        parsed insight. Providers without streaming support only emit the result.
+        """
+        yield {"type": "result", "data": await self.agenerate_insights_for_cluster(cluster_posts)}
+
+    async def aclose(self):
+        """Release any network resources held by the provider."""
+
+    def round_trips(self, cluster_posts: List[database.RawPost]) -> int:
+        """
+        Upper bound on the sequential LLM round trips one request makes; the
+        router scales its per-attempt timeout by it.
+        """
+        return 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    @staticmethod
+    def is_error_result(result: Dict[str, Any]) -> bool:
+        return result.get("category") == "Error"
+
+    @staticmethod
+    def _error_result(message: str) -> Dict[str, Any]:
+        return {
+            "title": "Error: Failed to Generate Insights",
+            "summary": message,
+            "hot_score": 0,
+            "category": "Error",
+            "insights": {},
+            "emotion_analysis": {},
+            "top_mentions": []
+        }
+
+# Output format shared by the single-call and the map-reduce (reduce step) prompts.
+_INSIGHT_SCHEMA = """请生成一个JSON对象，其结构如下:
+{
+  "title": "为这个趋势起一个简洁、吸引人的标题 (字符串)",
+  "summary": "用2-3句话总结这个趋势的核心讨论 (字符串)",
+  "hot_score": "根据用户参与度和情感估算一个0-100的热度分数 (浮点数)",
+  "category": "为这个趋势选择一个相关类别 (例如, '技术创新', '消费者抱怨') (字符串)",
+  "insights": {
+    "pain_points": [{ "text": "从用户讨论中识别出的一个具体痛点 (字符串)" }],
+    "opportunities": [{ "text": "与痛点相关的潜在商业机会 (字符串)" }],
+    "mvp_plan": { "goal": "针对一个商业机会，用一句话描述一个为期一周的MVP目标 (字符串)" }
+  },
+  "emotion_analysis": {
+    "joy": "百分比 (0-100, 整数)",
+    "neutral": "百分比 (0-100, 整数)",
+    "anger": "百分比 (0-100, 整数)",
+    "sadness": "百分比 (0-100, 整数)",
+    "sarcasm": "百分比 (0-100, 整数)"
+  }
+}
+
+请确保情感分析的百分比总和为100。请只提供原始的JSON对象作为你的回答。
+"""
+
+def _insight_prompt(instruction: str, label: str, body: str) -> str:
+    return f"""
+{instruction}
+
+{label}:
+---
+{body}
+---
+
+{_INSIGHT_SCHEMA}"""
+
 class ZhipuAIProvider(LLMProvider):
     """LLM provider for ZhipuAI (GLM models)."""
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[LLMInsightCache] = None, model: str = "glm-4"):
         if not api_key or api_key == "not_set":
             raise ValueError("ZhipuAI API key is required. Please check your .env file.")
         
         # Add a debug print to confirm the key is being loaded.
         print(f"DEBUG: Initializing ZhipuAI client with API Key: {api_key[:4]}...{api_key[-4:]}")
         
+        self.api_key = api_key
         self.client = ZhipuAI(api_key=api_key)
-        self.model = "glm-4"
+        self.model = model
+        self.breaker = get_circuit_breaker(
+            f"zhipuai:{model}",
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+        )
+        self.cache = cache
+
+        # Posts are ranked by engagement (likes, retweets, followers) and packed
+        # into a token budget; the template's own cost is measured once with no
+        # posts and subtracted from that budget.
+        self.packer = PromptPacker(
+            token_budget=settings.LLM_PROMPT_TOKEN_BUDGET,
+            min_post_tokens=settings.LLM_POST_MIN_TOKENS,
+            max_post_tokens=settings.LLM_POST_MAX_TOKENS,
+            max_posts=settings.LLM_PROMPT_MAX_POSTS,
+        )
+        self.template_tokens = estimate_tokens(self._build_prompt([]))
+        # Map-reduce: large post sets are split into chunks that are each packed
+        # into the map prompt's budget, summarized in parallel, then reduced.
+        self.map_template_tokens = estimate_tokens(self._build_map_prompt([]))
+        self.map_reduce = {"runs": 0, "chunks": 0, "failed_chunks": 0}
+
+        # Top mentions: heap-selected by engagement, diversified with MMR,
+        # then sentiment-scored in one batch.
+        self.mention_ranker = MentionRanker(
+            k=settings.TOP_MENTIONS_COUNT,
+            candidates=settings.TOP_MENTIONS_CANDIDATES,
+            diversity=settings.TOP_MENTIONS_DIVERSITY,
+            sentiment=get_analysis_service().analyze_sentiments,
+        )
+
+        # Async path: one keep-alive connection pool to the GLM endpoint; requests
+        # take a slot from the process-wide cap so bursts queue here instead of upstream.
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.waiting = 0
 
     def generate_insights_for_cluster(self, cluster_posts: List[database.RawPost]) -> Dict[str, Any]:
         print(f"Generating insights for a cluster of {len(cluster_posts)} posts with ZhipuAI ({self.model})...")
         
-        # Ensure proper UTF-8 encoding for Chinese characters
-        post_samples = []
-        for post in cluster_posts[:20]:
+        post_samples = self._sample_texts(cluster_posts)
+        fingerprint, cached = self._lookup_cache(post_samples, cluster_posts)
+        if cached is not None:
+            return cached
+
+        prompt = self._build_prompt(post_samples)
+
+        # Fail fast while ZhipuAI is unhealthy instead of waiting out the timeout
+        if not self.breaker.allow_request():
+            print("ZhipuAI circuit breaker is open, skipping LLM call.")
+            return self._error_result("ZhipuAI is temporarily unavailable (circuit breaker open).")
+
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Error during ZhipuAI call: {e}")
+            return self._error_result(str(e))
+        self.breaker.record_success()
+
+        try:
+            message_content = response.choices[0].message.content
+        except (AttributeError, IndexError) as e:
+            print(f"Error during ZhipuAI JSON parsing: {e}")
+            return self._error_result(str(e))
+        usage = getattr(response, "usage", None)
+        return self._parse_result(
+            message_content,
+            fingerprint,
+            cluster_posts,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+    async def agenerate_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Non-blocking variant: calls the GLM HTTP API directly without holding a thread."""
+        print(f"Generating insights for a cluster of {len(cluster_posts)} posts with ZhipuAI ({self.model}, async)...")
+
+        chunks, post_samples, fingerprint, cached = await self._aprepare(cluster_posts)
+        if cached is not None:
+            return cached
+
+        if not self.breaker.allow_request():
+            print("ZhipuAI circuit breaker is open, skipping LLM call.")
+            return self._error_result("ZhipuAI is temporarily unavailable (circuit breaker open).")
+
+        # If this call is cancelled before it reports back, hand the breaker's
+        # half-open probe slot back so the breaker does not stay stuck.
+        settled = False
+        try:
+            prompt, map_prompt_tokens, map_completion_tokens = await self._aprompt(chunks, post_samples, len(cluster_posts))
+            if prompt is None:
+                # The map step already reported the failure to the breaker
+                settled = True
+                return self._error_result("Every map-reduce chunk summary failed.")
+
             try:
-                # Safely handle text encoding
-                text = post.text[:250]
-                if isinstance(text, bytes):
-                    text = text.decode('utf-8', errors='ignore')
-                post_samples.append(f"- {text}")
-            except (UnicodeDecodeError, UnicodeEncodeError) as e:
-                print(f"Warning: Skipping post due to encoding issue: {e}")
-                continue
-        
+                data = await self._post_chat_completion(prompt)
+            except Exception as e:
+                self.breaker.record_failure()
+                settled = True
+                print(f"Error during ZhipuAI call: {e}")
+                return self._error_result(str(e))
+            self.breaker.record_success()
+            settled = True
+        finally:
+            if not settled:
+                self.breaker.release()
+
+        try:
+            message_content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error during ZhipuAI JSON parsing: {e}")
+            return self._error_result(str(e))
+        usage = data.get("usage") or {}
+        args = (
+            message_content,
+            fingerprint,
+            cluster_posts,
+            (usage.get("prompt_tokens", 0) or 0) + map_prompt_tokens,
+            (usage.get("completion_tokens", 0) or 0) + map_completion_tokens,
+        )
+        if self.cache is None:
+            return self._parse_result(*args)
+        return await run_in_threadpool(self._parse_result, *args)
+
+    async def astream_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams GLM output tokens as they arrive; closing the stream aborts the upstream request.
+        In map-reduce mode only the reduce step is streamed.
+        """
+        print(f"Streaming insights for a cluster of {len(cluster_posts)} posts with ZhipuAI ({self.model})...")
+
+        chunks, post_samples, fingerprint, cached = await self._aprepare(cluster_posts)
+        if cached is not None:
+            yield {"type": "result", "data": cached}
+            return
+
+        if not self.breaker.allow_request():
+            print("ZhipuAI circuit breaker is open, skipping LLM call.")
+            yield {"type": "result", "data": self._error_result("ZhipuAI is temporarily unavailable (circuit breaker open).")}
+            return
+
+        # Closing or cancelling the stream early hands the half-open probe slot back
+        settled = False
+        try:
+            prompt, map_prompt_tokens, map_completion_tokens = await self._aprompt(chunks, post_samples, len(cluster_posts))
+            if prompt is None:
+                settled = True
+                yield {"type": "result", "data": self._error_result("Every map-reduce chunk summary failed.")}
+                return
+
+            pieces: List[str] = []
+            usage: Dict[str, Any] = {}
+            try:
+                async for chunk in self._stream_chat_completion(prompt):
+                    usage = chunk.get("usage") or usage
+                    for choice in chunk.get("choices") or []:
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            pieces.append(content)
+                            yield {"type": "token", "content": content}
+            except Exception as e:
+                self.breaker.record_failure()
+                settled = True
+                print(f"Error during ZhipuAI streaming call: {e}")
+                yield {"type": "result", "data": self._error_result(str(e))}
+                return
+            self.breaker.record_success()
+            settled = True
+        finally:
+            if not settled:
+                self.breaker.release()
+
+        args = (
+            "".join(pieces),
+            fingerprint,
+            cluster_posts,
+            (usage.get("prompt_tokens", 0) or 0) + map_prompt_tokens,
+            (usage.get("completion_tokens", 0) or 0) + map_completion_tokens,
+        )
+        if self.cache is None:
+            result = self._parse_result(*args)
+        else:
+            result = await run_in_threadpool(self._parse_result, *args)
+        yield {"type": "result", "data": result}
+
+    async def _aprepare(
+        self, cluster_posts: List[database.RawPost]
+    ) -> Tuple[Optional[List[List[str]]], List[str], Optional[str], Optional[Dict[str, Any]]]:
+        """Sample the posts (in chunks when map-reduce applies) and look them up in the cache."""
+        chunks = self._map_reduce_chunks(cluster_posts)
+        if chunks:
+            # The marker keeps map-reduce insights apart from single-call ones over the same samples
+            post_samples = ["[map-reduce]"] + [f"- {text}" for chunk in chunks for text in chunk]
+        else:
+            post_samples = self._sample_texts(cluster_posts)
+        fingerprint, cached = None, None
+        # Cache reads/writes hit the database, so only they go through the threadpool
+        if self.cache is not None:
+            fingerprint, cached = await run_in_threadpool(self._lookup_cache, post_samples, cluster_posts)
+        return chunks, post_samples, fingerprint, cached
+
+    async def _aprompt(
+        self, chunks: Optional[List[List[str]]], post_samples: List[str], total_posts: int
+    ) -> Tuple[Optional[str], int, int]:
+        """The final prompt plus the tokens spent on the map step; None if every chunk failed."""
+        if not chunks:
+            return self._build_prompt(post_samples), 0, 0
+        return await self._map_chunks(chunks, total_posts)
+
+    def round_trips(self, cluster_posts: List[database.RawPost]) -> int:
+        """A map-reduce request makes its map calls in waves of LLM_MAP_CONCURRENCY, then the reduce call."""
+        if not settings.LLM_MAP_REDUCE_ENABLED or len(cluster_posts) < settings.LLM_MAP_REDUCE_MIN_POSTS:
+            return 1
+        return math.ceil(settings.LLM_MAP_MAX_CHUNKS / max(1, settings.LLM_MAP_CONCURRENCY)) + 1
+
+    def _map_reduce_chunks(self, cluster_posts: List[database.RawPost]) -> Optional[List[List[str]]]:
+        """Chunks for map-reduce, or None when the posts are few enough for a single call."""
+        if not settings.LLM_MAP_REDUCE_ENABLED or len(cluster_posts) < settings.LLM_MAP_REDUCE_MIN_POSTS:
+            return None
+        chunks = self.packer.pack_chunks(
+            cluster_posts,
+            self.map_template_tokens,
+            settings.LLM_MAP_MAX_CHUNKS,
+            max_posts_per_chunk=settings.LLM_MAP_CHUNK_MAX_POSTS,
+            text=self._text_of,
+            engagement=post_engagement,
+        )
+        return chunks if len(chunks) > 1 else None
+
+    async def _map_chunks(self, chunks: List[List[str]], total_posts: int) -> Tuple[Optional[str], int, int]:
+        """
+        Map step: summarize every chunk in parallel (at most LLM_MAP_CONCURRENCY
+        per request) and build the reduce prompt from the summaries. Chunks that
+        fail are left out; returns None as the prompt if all of them failed.
+        The whole map step reports one outcome to the breaker, so a single
+        request with many failing chunks cannot open it on its own.
+        """
+        limit = asyncio.Semaphore(settings.LLM_MAP_CONCURRENCY)
+
+        async def summarize(samples: List[str]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+            async with limit:
+                try:
+                    data = await self._post_chat_completion(self._build_map_prompt([f"- {text}" for text in samples]))
+                except Exception as e:
+                    print(f"Error during ZhipuAI map call: {e}")
+                    return None, {}
+                try:
+                    summary = json.loads(data["choices"][0]["message"]["content"])
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    print(f"Error during ZhipuAI map JSON parsing: {e}")
+                    summary = None
+                return summary, data.get("usage") or {}
+
+        print(f"Map-reduce over {len(chunks)} chunks ({sum(len(chunk) for chunk in chunks)} posts)...")
+        results = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        summaries = [(len(chunk), summary) for chunk, (summary, _) in zip(chunks, results) if isinstance(summary, dict)]
+        if summaries:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self.map_reduce["runs"] += 1
+        self.map_reduce["chunks"] += len(chunks)
+        self.map_reduce["failed_chunks"] += len(chunks) - len(summaries)
+        prompt_tokens = sum(usage.get("prompt_tokens", 0) or 0 for _, usage in results)
+        completion_tokens = sum(usage.get("completion_tokens", 0) or 0 for _, usage in results)
+        if not summaries:
+            return None, prompt_tokens, completion_tokens
+        return self._build_reduce_prompt(summaries, total_posts), prompt_tokens, completion_tokens
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Create the connection pool lazily, inside the running event loop."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                ),
+            )
+        return self._http_client
+
+    def _chat_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _acquire_slot(self):
+        self.waiting += 1
+        try:
+            await _get_llm_slots().acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        _get_llm_slots().release()
+
+    async def _post_chat_completion(self, prompt: str) -> Dict[str, Any]:
+        client = self._get_http_client()
+        await self._acquire_slot()
+        try:
+            response = await client.post(
+                f"{settings.LLM_API_BASE}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._chat_payload(prompt),
+            )
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._release_slot()
+
+    async def _stream_chat_completion(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the JSON chunks of a streamed (server-sent events) chat completion."""
+        client = self._get_http_client()
+        await self._acquire_slot()
+        try:
+            async with client.stream(
+                "POST",
+                f"{settings.LLM_API_BASE}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._chat_payload(prompt, stream=True),
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    yield json.loads(data)
+        finally:
+            self._release_slot()
+
+    async def aclose(self):
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "template_tokens": self.template_tokens,
+            "prompt_packing": self.packer.stats(),
+            "map_reduce": self.map_reduce,
+            "top_mentions": self.mention_ranker.stats(),
+        }
+
+    @staticmethod
+    def _text_of(post: database.RawPost) -> str:
+        # Ensure proper UTF-8 encoding for Chinese characters
+        text = post.text or ""
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', errors='ignore')
+        return text
+
+    def _sample_texts(self, cluster_posts: List[database.RawPost]) -> List[str]:
+        return [f"- {text}" for text in self.packer.pack(
+            cluster_posts, self.template_tokens, text=self._text_of, engagement=post_engagement
+        )]
+
+    def _lookup_cache(
+        self, post_samples: List[str], cluster_posts: List[database.RawPost]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Identical samples under the same model and prompt reuse the previous insight."""
+        if self.cache is None:
+            return None, None
+        fingerprint = self.cache.fingerprint(self.model, PROMPT_VERSION, post_samples)
+        cached = self.cache.get(fingerprint)
+        if cached is not None:
+            print("LLM insight cache hit, skipping ZhipuAI call.")
+            cached["top_mentions"] = self._top_mentions(cluster_posts)
+        return fingerprint, cached
+
+    @staticmethod
+    def _build_prompt(post_samples: List[str]) -> str:
         combined_texts = "\n".join(post_samples)
 
         # This prompt is specifically tuned for GLM models
-        prompt = f"""
-你是一个专业的市场趋势分析师。请分析以下社交媒体帖子，并严格按照指定的JSON格式输出你的分析结果。不要在JSON对象之外添加任何解释性文字。
+        return _insight_prompt(
+            "你是一个专业的市场趋势分析师。请分析以下社交媒体帖子，并严格按照指定的JSON格式输出你的分析结果。不要在JSON对象之外添加任何解释性文字。",
+            "帖子样本",
+            combined_texts,
+        )
+
+    @staticmethod
+    def _build_map_prompt(post_samples: List[str]) -> str:
+        combined_texts = "\n".join(post_samples)
+        return f"""
+你是一个专业的市场趋势分析师。以下是同一话题下的一部分社交媒体帖子，请提炼要点，并严格按照指定的JSON格式输出。不要在JSON对象之外添加任何解释性文字。
 
 帖子样本:
 ---
@@ -54,77 +565,521 @@ class ZhipuAIProvider(LLMProvider):
 
 请生成一个JSON对象，其结构如下:
 {{
-  "title": "为这个趋势起一个简洁、吸引人的标题 (字符串)",
-  "summary": "用2-3句话总结这个趋势的核心讨论 (字符串)",
+  "summary": "用1-2句话概括这些帖子的核心讨论 (字符串)",
+  "pain_points": ["用户提到的具体痛点，最多3条 (字符串)"],
+  "opportunities": ["与痛点相关的潜在商业机会，最多3条 (字符串)"],
   "hot_score": "根据用户参与度和情感估算一个0-100的热度分数 (浮点数)",
-  "category": "为这个趋势选择一个相关类别 (例如, '技术创新', '消费者抱怨') (字符串)",
-  "insights": {{
-    "pain_points": [{{ "text": "从用户讨论中识别出的一个具体痛点 (字符串)" }}],
-    "opportunities": [{{ "text": "与痛点相关的潜在商业机会 (字符串)" }}],
-    "mvp_plan": {{ "goal": "针对一个商业机会，用一句话描述一个为期一周的MVP目标 (字符串)" }}
-  }},
-  "emotion_analysis": {{
-    "joy": "百分比 (0-100, 整数)",
-    "neutral": "百分比 (0-100, 整数)",
-    "anger": "百分比 (0-100, 整数)",
-    "sadness": "百分比 (0-100, 整数)",
-    "sarcasm": "百分比 (0-100, 整数)"
-  }}
+  "emotion_analysis": {{ "joy": 0, "neutral": 0, "anger": 0, "sadness": 0, "sarcasm": 0 }}
 }}
 
-请确保情感分析的百分比总和为100。请只提供原始的JSON对象作为你的回答。
+emotion_analysis 中填写各情感的百分比 (0-100, 整数)，总和为100。请只提供原始的JSON对象作为你的回答。
 """
+
+    @staticmethod
+    def _build_reduce_prompt(chunk_summaries: List[Tuple[int, Dict[str, Any]]], total_posts: int) -> str:
+        combined_summaries = "\n".join(
+            f"- ({size} 条帖子) {json.dumps(summary, ensure_ascii=False)}" for size, summary in chunk_summaries
+        )
+        return _insight_prompt(
+            f"你是一个专业的市场趋势分析师。以下是对同一话题共 {total_posts} 条社交媒体帖子分块提炼出的要点，每行是一个分块的JSON摘要。"
+            "请综合所有分块 (帖子更多的分块权重更高)，并严格按照指定的JSON格式输出你的分析结果。不要在JSON对象之外添加任何解释性文字。",
+            "分块摘要",
+            combined_summaries,
+        )
+
+    def _parse_result(
+        self,
+        message_content: Optional[str],
+        fingerprint: Optional[str],
+        cluster_posts: List[database.RawPost],
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ) -> Dict[str, Any]:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-            )
-            
-            # Safely get the content and parse it
-            message_content = response.choices[0].message.content
             if not message_content:
                 raise ValueError("LLM returned empty content, cannot parse JSON.")
             
             # When using json_object mode, the response content is already a valid JSON string.
             llm_json_output = json.loads(message_content)
+
+            if self.cache is not None:
+                self.cache.set(
+                    fingerprint,
+                    self.model,
+                    PROMPT_VERSION,
+                    llm_json_output,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                )
             
             # Add top mentions (evidence), which are not generated by the LLM
-            llm_json_output["top_mentions"] = [
-                {
-                    "platform": post.platform,
-                    "author": post.author,
-                    "text": post.text,
-                    "url": post.url,
-                    "likes": post.likes,
-                    "sentiment": "Positive" # Placeholder
-                } for post in cluster_posts[:3]
-            ]
+            llm_json_output["top_mentions"] = self._top_mentions(cluster_posts)
             
             print("ZhipuAI insight generation successful.")
             return llm_json_output
 
         except Exception as e:
-            print(f"Error during ZhipuAI call or JSON parsing: {e}")
-            return {
-                "title": "Error: Failed to Generate Insights",
-                "summary": str(e),
-                "hot_score": 0,
-                "category": "Error",
-                "insights": {},
-                "emotion_analysis": {},
-                "top_mentions": []
-            }
+            print(f"Error during ZhipuAI JSON parsing: {e}")
+            return self._error_result(str(e))
+
+    def _top_mentions(self, cluster_posts: List[database.RawPost]) -> List[Dict[str, Any]]:
+        return self.mention_ranker.top_mentions(cluster_posts)
+
+# Words that carry no topic on their own; the local provider skips them when
+# picking keywords.
+_STOPWORDS = frozenset(
+    "the and for that this with you are was have has but not all can just from they will "
+    "about what your its it's our out more like get one new now how who when after also been just very really than then there their https http www com".split()
+)
+_KEYWORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+#'-]{2,}|[一-鿿]{2,8}")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。！？])\s*")
+
+
+class LocalInsightProvider(LLMProvider):
+    """
+    Deterministic, network-free provider: builds the insight from keyword
+    counts, an extractive summary of the most engaging posts, engagement and
+    the keyword sentiment lexicon. The same posts always produce the same
+    result, so it doubles as a stand-in provider in tests and as the router's
+    degraded-mode answer when the models are slow or down.
+    """
+    model = "local"
+
+    def __init__(self):
+        self.sentiment = get_analysis_service().analyze_sentiments
+        self.mention_ranker = MentionRanker(
+            k=settings.TOP_MENTIONS_COUNT,
+            candidates=settings.TOP_MENTIONS_CANDIDATES,
+            diversity=settings.TOP_MENTIONS_DIVERSITY,
+            sentiment=self.sentiment,
+        )
+        self.generated = 0
+
+    def generate_insights_for_cluster(self, cluster_posts: List[database.RawPost]) -> Dict[str, Any]:
+        self.generated += 1
+        if not cluster_posts:
+            return self._error_result("No posts to analyze.")
+
+        texts = [post.text or "" for post in cluster_posts]
+        keywords = self._keywords(texts)
+        sentiments = self.sentiment(texts)
+        counts = Counter(sentiments)
+        total = len(sentiments)
+        joy = round(100 * counts["positive"] / total)
+        anger = round(100 * counts["negative"] / total)
+        negative_posts = sorted(
+            (post for post, sentiment in zip(cluster_posts, sentiments) if sentiment == "negative"),
+            key=lambda post: (-post_engagement(post), post.url or ""),
+        )
+        average_engagement = sum(post_engagement(post) for post in cluster_posts) / total
+        highlights = self._extractive_summary(cluster_posts, keywords)
+
+        topic = "、".join(keywords[:3]) or "综合话题"
+        return {
+            "title": f"{topic} 相关讨论",
+            "summary": (
+                f"共 {total} 条帖子，正面 {joy}%，负面 {anger}%。"
+                + (f"代表性观点：{'；'.join(highlights)}" if highlights else f"高频关键词：{'、'.join(keywords) or '无'}。")
+            ),
+            "hot_score": round(min(100.0, 8 * average_engagement + 10 * math.log10(total)), 1),
+            "category": "消费者抱怨" if counts["negative"] > counts["positive"] else "热门讨论",
+            "insights": {
+                "pain_points": [{"text": " ".join(post.text.split())[:120]} for post in negative_posts[:3]],
+                "opportunities": [],
+                "mvp_plan": {},
+            },
+            "emotion_analysis": {
+                "joy": joy,
+                "neutral": 100 - joy - anger,
+                "anger": anger,
+                "sadness": 0,
+                "sarcasm": 0,
+            },
+            "top_mentions": self.mention_ranker.top_mentions(cluster_posts),
+        }
+
+    @staticmethod
+    def _extractive_summary(
+        cluster_posts: List[database.RawPost], keywords: List[str], sentences: int = 2, candidates: int = 20
+    ) -> List[str]:
+        """The sentences of the most engaging posts that cover the most (and the top) keywords."""
+        weights = {word: len(keywords) - rank for rank, word in enumerate(keywords)}
+        scored = []
+        for post in heapq.nlargest(candidates, cluster_posts, key=lambda post: (post_engagement(post), post.url or "")):
+            boost = 1 + post_engagement(post) / 10
+            for sentence in _SENTENCE_SPLIT.split(" ".join((post.text or "").split())):
+                words = {match.lower() for match in _KEYWORD_PATTERN.findall(sentence)}
+                coverage = sum(weights.get(word, 0) for word in words)
+                if coverage and len(sentence) >= 12:
+                    scored.append((-coverage * boost, sentence[:120]))
+
+        picked: List[str] = []
+        for _, sentence in sorted(scored):
+            if len(picked) == sentences:
+                break
+            if all(jaccard(shingles(sentence), shingles(other)) < 0.5 for other in picked):
+                picked.append(sentence)
+        return picked
+
+    @staticmethod
+    def _keywords(texts: List[str], limit: int = 5) -> List[str]:
+        counts = Counter(
+            word
+            for text in texts
+            for word in {match.lower() for match in _KEYWORD_PATTERN.findall(text)}
+            if word not in _STOPWORDS
+        )
+        return [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model, "generated": self.generated, "top_mentions": self.mention_ranker.stats()}
+
+
+class _RouteHealth:
+    """Moving averages of one route's latency and error rate."""
+
+    def __init__(self, alpha: float, error_half_life: float):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._updated_at = time.monotonic()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def error_rate(self) -> float:
+        """Decays while the route is not used, so a benched route gets retried eventually."""
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._updated_at) / self.error_half_life)
+
+    def expected_latency(self, failure_cost: float) -> float:
+        """Moving-average latency plus the expected time lost to a failed attempt; untried routes go first."""
+        return (self.latency or 0.0) + self.error_rate() * failure_cost
+
+    def record(self, elapsed: float, ok: bool, timed_out: bool = False):
+        self.calls += 1
+        self._error_rate = self.error_rate() * (1 - self.alpha) + (0.0 if ok else self.alpha)
+        self._updated_at = time.monotonic()
+        if ok:
+            self.latency = elapsed if self.latency is None else self.latency * (1 - self.alpha) + elapsed * self.alpha
+        else:
+            self.failures += 1
+            self.timeouts += int(timed_out)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+        }
+
+
+class LLMRouter(LLMProvider):
+    """
+    Routes each request across several providers.
+
+    Requests ask for a tier ("fast" or "quality"). The tier's routes are tried
+    in order of expected latency, then the other tiers' routes, then the local
+    fallback. `attempt_timeout` and `deadline` are per LLM round trip: an
+    attempt is cut off after `attempt_timeout` times the provider's
+    round_trips() (a map-reduce request makes a map wave or more plus the
+    reduce call), and once `deadline` times the request's round trips are
+    spent only the fallback is tried, which bounds tail latency while a
+    provider is browning out. Error results from a provider
+    (e.g. an open circuit breaker) count as failures and fail over as well.
+
+    With a `latency_budget`, a non-streaming request that has no model answer
+    within the budget gets the fallback's insight flagged "degraded", while
+    the model call keeps running in the background so its result lands in
+    the insight cache for the next request.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, List[Tuple[str, LLMProvider]]],
+        fallback: Optional[LLMProvider] = None,
+        default_tier: str = "quality",
+        attempt_timeout: float = 20.0,
+        deadline: float = 45.0,
+        alpha: float = 0.2,
+        error_half_life: float = 120.0,
+        latency_budget: float = 0.0,
+    ):
+        if not any(routes.values()) and fallback is None:
+            raise ValueError("LLMRouter needs at least one route or a fallback provider.")
+        self.routes = routes
+        self.fallback = fallback
+        self.default_tier = default_tier
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.latency_budget = latency_budget
+        self._background: Set[asyncio.Task] = set()
+        self.health: Dict[str, _RouteHealth] = {
+            name: _RouteHealth(alpha, error_half_life)
+            for targets in routes.values()
+            for name, _ in targets
+        }
+        self.counters = {
+            "requests": 0,
+            "failovers": 0,
+            "fallbacks": 0,
+            "deadline_exceeded": 0,
+            "degraded": 0,
+            "background_completed": 0,
+            "background_failed": 0,
+        }
+
+    def _plan(self, tier: Optional[str], use_fallback: bool = True) -> List[Tuple[str, LLMProvider]]:
+        tier = tier or self.default_tier
+        ordered: List[Tuple[str, LLMProvider]] = []
+        seen = set()
+        tiers = [tier] + [name for name in self.routes if name != tier]
+        for name in tiers:
+            targets = sorted(
+                self.routes.get(name, []),
+                key=lambda target: self.health[target[0]].expected_latency(self.attempt_timeout),
+            )
+            for target in targets:
+                if target[0] not in seen:
+                    seen.add(target[0])
+                    ordered.append(target)
+        if self.fallback is not None and use_fallback:
+            ordered.append((self.fallback.model, self.fallback))
+        return ordered
+
+    def _deadline(self, plan: List[Tuple[str, LLMProvider]], cluster_posts: List[database.RawPost]) -> float:
+        """The request deadline, scaled by the most round trips any planned model makes."""
+        rounds = max((provider.round_trips(cluster_posts) for _, provider in plan if provider is not self.fallback), default=1)
+        return time.monotonic() + self.deadline * rounds
+
+    def _attempt_timeout(
+        self, provider: LLMProvider, deadline: float, cluster_posts: List[database.RawPost]
+    ) -> Optional[float]:
+        """None for the fallback (always tried); 0 when the request deadline is spent."""
+        if provider is self.fallback:
+            return None
+        budget = self.attempt_timeout * provider.round_trips(cluster_posts)
+        return max(0.0, min(budget, deadline - time.monotonic()))
+
+    def _finish(self, name: str, provider: LLMProvider, result: Dict[str, Any], attempts: int) -> Dict[str, Any]:
+        self.counters["failovers"] += attempts - 1
+        if provider is self.fallback:
+            self.counters["fallbacks"] += 1
+            if self.health:
+                # A model should have answered; the local insight stands in for it
+                self.counters["degraded"] += 1
+                result["degraded"] = True
+        result["model"] = name
+        return result
+
+    def generate_insights_for_cluster(self, cluster_posts: List[database.RawPost]) -> Dict[str, Any]:
+        """Blocking variant: tries the routes in order, without timeouts."""
+        self.counters["requests"] += 1
+        result = self._error_result("No LLM provider is available.")
+        for attempts, (name, provider) in enumerate(self._plan(None), start=1):
+            started = time.monotonic()
+            result = provider.generate_insights_for_cluster(cluster_posts)
+            ok = not self.is_error_result(result)
+            if provider is not self.fallback:
+                self.health[name].record(time.monotonic() - started, ok)
+            if ok:
+                return self._finish(name, provider, result, attempts)
+        return result
+
+    async def agenerate_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self.counters["requests"] += 1
+        if not self.latency_budget or self.fallback is None or not self.health:
+            return await self._agenerate(cluster_posts, tier)
+
+        task = asyncio.create_task(self._agenerate(cluster_posts, tier, use_fallback=False))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.latency_budget)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if task in done:
+            result = task.result()
+            if not self.is_error_result(result):
+                return result
+        else:
+            print(f"No LLM answer within the {self.latency_budget:.1f}s budget, serving a degraded local insight.")
+            self._background.add(task)
+            task.add_done_callback(self._background_done)
+        result = await self.fallback.agenerate_insights_for_cluster(cluster_posts)
+        return self._finish(self.fallback.model, self.fallback, result, attempts=1)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is None and not self.is_error_result(task.result()):
+            self.counters["background_completed"] += 1
+        else:
+            self.counters["background_failed"] += 1
+
+    async def _agenerate(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str], use_fallback: bool = True
+    ) -> Dict[str, Any]:
+        plan = self._plan(tier, use_fallback)
+        deadline = self._deadline(plan, cluster_posts)
+        result = self._error_result("No LLM provider is available.")
+        attempts = 0
+        for name, provider in plan:
+            timeout = self._attempt_timeout(provider, deadline, cluster_posts)
+            if timeout == 0:
+                self.counters["deadline_exceeded"] += 1
+                continue
+            attempts += 1
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(provider.agenerate_insights_for_cluster(cluster_posts), timeout)
+            except asyncio.TimeoutError:
+                print(f"LLM route '{name}' timed out after {timeout:.1f}s, failing over.")
+                self.health[name].record(time.monotonic() - started, ok=False, timed_out=True)
+                result = self._error_result(f"LLM route '{name}' timed out.")
+                continue
+            except Exception as e:
+                print(f"LLM route '{name}' failed: {e}")
+                result = self._error_result(str(e))
+                if provider is not self.fallback:
+                    self.health[name].record(time.monotonic() - started, ok=False)
+                continue
+            ok = not self.is_error_result(result)
+            if provider is not self.fallback:
+                self.health[name].record(time.monotonic() - started, ok)
+            if ok:
+                return self._finish(name, provider, result, attempts)
+        return result
+
+    async def astream_insights_for_cluster(
+        self, cluster_posts: List[database.RawPost], tier: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams from the first healthy route. Failover (including on timeout)
+        only happens until the first token is out; after that the route's
+        result is passed through as-is.
+        """
+        self.counters["requests"] += 1
+        plan = self._plan(tier)
+        deadline = self._deadline(plan, cluster_posts)
+        result = self._error_result("No LLM provider is available.")
+        attempts = 0
+        for name, provider in plan:
+            timeout = self._attempt_timeout(provider, deadline, cluster_posts)
+            if timeout == 0:
+                self.counters["deadline_exceeded"] += 1
+                continue
+            attempts += 1
+            started = time.monotonic()
+            streamed = False
+            try:
+                async with aclosing(provider.astream_insights_for_cluster(cluster_posts)) as stream:
+                    while True:
+                        if streamed or timeout is None:
+                            event = await anext(stream, None)
+                        else:
+                            event = await asyncio.wait_for(anext(stream, None), started + timeout - time.monotonic())
+                        if event is None:
+                            break
+                        if event["type"] == "token":
+                            streamed = True
+                            yield event
+                        else:
+                            result = event["data"]
+            except asyncio.TimeoutError:
+                print(f"LLM route '{name}' produced no output within {timeout:.1f}s, failing over.")
+                self.health[name].record(time.monotonic() - started, ok=False, timed_out=True)
+                result = self._error_result(f"LLM route '{name}' timed out.")
+                continue
+            except Exception as e:
+                print(f"LLM route '{name}' failed: {e}")
+                result = self._error_result(str(e))
+                if provider is not self.fallback:
+                    self.health[name].record(time.monotonic() - started, ok=False)
+                if streamed:
+                    break
+                continue
+            ok = not self.is_error_result(result)
+            if provider is not self.fallback:
+                self.health[name].record(time.monotonic() - started, ok)
+            if ok:
+                result = self._finish(name, provider, result, attempts)
+                break
+            if streamed:
+                break
+        yield {"type": "result", "data": result}
+
+    async def aclose(self):
+        for task in list(self._background):
+            task.cancel()
+        for targets in self.routes.values():
+            for _, provider in targets:
+                await provider.aclose()
+        if self.fallback is not None:
+            await self.fallback.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "background_in_flight": len(self._background),
+            "default_tier": self.default_tier,
+            "routes": {
+                tier: {
+                    name: {**self.health[name].stats(), **provider.stats()}
+                    for name, provider in targets
+                }
+                for tier, targets in self.routes.items()
+            },
+            "fallback": self.fallback.stats() if self.fallback is not None else None,
+        }
+
+_insight_cache: Optional[LLMInsightCache] = None
+
+def get_llm_insight_cache() -> Optional[LLMInsightCache]:
+    """Shared persistent LLM insight cache, or None when disabled."""
+    global _insight_cache
+    if _insight_cache is None and settings.LLM_CACHE_ENABLED:
+        _insight_cache = LLMInsightCache(
+            ttl=settings.LLM_CACHE_TTL_SECONDS,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+        register_metrics("llm_insight_cache", _insight_cache.stats)
+    return _insight_cache
 
 def get_llm_provider() -> LLMProvider:
     """
-    Dependency injector to get the configured LLM provider.
-    This is the 'adapter' that allows easy switching.
+    Dependency injector to get the configured LLM provider: a router over the
+    fast and quality GLM models, with the local provider as the last resort.
+    Without a ZhipuAI key the router serves local insights only.
     """
     # Get the API key from our central settings object
     api_key = settings.ZHIPU_API_KEY
-    if not api_key or api_key == "not_set":
+    has_key = bool(api_key) and api_key != "not_set"
+    if not has_key and not settings.LLM_LOCAL_FALLBACK:
         raise ValueError("ZHIPU_API_KEY environment variable not set or loaded correctly.")
-    return ZhipuAIProvider(api_key=api_key)
+
+    routes: Dict[str, List[Tuple[str, LLMProvider]]] = {"fast": [], "quality": []}
+    if has_key:
+        cache = get_llm_insight_cache()
+        for tier, models in (("fast", settings.LLM_FAST_MODELS), ("quality", settings.LLM_QUALITY_MODELS)):
+            for model in models:
+                routes[tier].append((model, ZhipuAIProvider(api_key=api_key, cache=cache, model=model)))
+    else:
+        print("WARN:     No ZhipuAI key; trend insights come from the local provider only.")
+
+    provider = LLMRouter(
+        routes,
+        fallback=LocalInsightProvider() if settings.LLM_LOCAL_FALLBACK else None,
+        default_tier=settings.LLM_DEFAULT_TIER,
+        attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+        deadline=settings.LLM_ROUTER_DEADLINE_SECONDS,
+        alpha=settings.LLM_ROUTER_EWMA_ALPHA,
+        error_half_life=settings.LLM_ROUTER_ERROR_HALF_LIFE_SECONDS,
+        latency_budget=settings.LLM_LATENCY_BUDGET_SECONDS,
+    )
+    register_metrics("llm_provider", provider.stats)
+    return provider
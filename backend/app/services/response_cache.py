@@ -0,0 +1,203 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..utils.cache import LRUCache
+from ..utils.json_stream import JsonProjection
+from ..utils.logger import logger
+from ..utils.query import normalize_query
+
+# 磁盘条目头部：写入时间 (double)
+_DISK_HEADER = struct.Struct("<d")
+
+
+class ResponseCache:
+    """
+    上游原始响应缓存
+    以 "端点 + 规范化参数" 为 key 缓存响应体，每个端点有独立的 TTL；
+    内存中保存 zlib 压缩后的响应体，按字节数上限做 LRU 淘汰，可选落盘。
+    磁盘目录同样有字节数上限：写入后累计大小超出 disk_max_bytes 时清扫一次，
+    先删除已超过最长 TTL 的文件，仍超出时按写入时间从旧到新删除，直到降到上限的 90%。
+    """
+
+    def __init__(
+        self,
+        endpoint_ttls: Dict[str, float],
+        max_bytes: int,
+        disk_dir: str = "",
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.endpoint_ttls = endpoint_ttls
+        self.max_ttl = max(endpoint_ttls.values(), default=0)
+        self.memory = LRUCache(max_entries=100_000, ttl=self.max_ttl, max_bytes=max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_bytes = 0
+        self._sweep_lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bytes_saved": 0,
+            "disk_sweeps": 0,
+            "disk_evictions": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            # 启动时清扫一次：清掉上次运行留下的过期文件，并得到目录当前大小
+            self._sweep_disk()
+
+    def ttl_for(self, url: str) -> float:
+        """返回端点对应的 TTL，未配置的端点不缓存 (0)"""
+        return self.endpoint_ttls.get(urlsplit(url).path, 0)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None, projection: Optional[JsonProjection] = None) -> str:
+        """
+        端点 + 排序后的规范化参数；查询词忽略大小写和多余空白
+        传入 projection 时缓存的是裁剪后的响应体，key 带上其字段摘要，与完整响应分开存放
+        """
+        normalized = []
+        for name, value in sorted((params or {}).items()):
+            value = str(value).strip()
+            if name == "query":
+                value = normalize_query(value)
+            normalized.append((name, value))
+        key = f"{url}?{urlencode(normalized)}"
+        if projection is not None:
+            key = f"{key}#fields={projection.fingerprint}"
+        return key
+
+    async def get(self, key: str, ttl: float) -> Optional[bytes]:
+        """命中时返回解压后的响应体"""
+        cached = self.memory.get(key)
+        if cached is not None and cached[1] < ttl:
+            self.counters["memory_hits"] += 1
+            body = zlib.decompress(cached[0])
+            self.counters["bytes_saved"] += len(body)
+            return body
+
+        if self.disk_dir:
+            entry = await run_in_threadpool(self._read_disk, key, ttl)
+            if entry is not None:
+                compressed, stored_at = entry
+                self.counters["disk_hits"] += 1
+                # 沿用文件的写入时间，读回内存不会延长条目的有效期
+                self.memory.set(key, compressed, stored_at=stored_at)
+                body = zlib.decompress(compressed)
+                self.counters["bytes_saved"] += len(body)
+                return body
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, body: bytes):
+        compressed = zlib.compress(body)
+        if self.memory.max_bytes is not None and len(compressed) > self.memory.max_bytes:
+            return
+        self.memory.set(key, compressed)
+        self.counters["stores"] += 1
+        if self.disk_dir:
+            try:
+                await run_in_threadpool(self._write_disk, key, compressed)
+            except OSError as e:
+                logger.error(f"写入响应缓存文件失败: {e}")
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.zz")
+
+    def _read_disk(self, key: str, ttl: float) -> Optional[Tuple[bytes, float]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _DISK_HEADER.size:
+            return None
+        (stored_at,) = _DISK_HEADER.unpack_from(data)
+        if time.time() - stored_at >= ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return data[_DISK_HEADER.size:], stored_at
+
+    def _write_disk(self, key: str, compressed: bytes):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_DISK_HEADER.pack(time.time()))
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        # 覆盖写同一个 key 时会高估大小，最多只是提前触发一次清扫
+        self.disk_bytes += _DISK_HEADER.size + len(compressed)
+        if self.disk_bytes > self.disk_max_bytes:
+            self._sweep_disk()
+
+    def _sweep_disk(self):
+        """删除过期文件；目录仍超出上限时从最旧的文件开始删除。多个线程同时触发时只执行一次"""
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self.counters["disk_sweeps"] += 1
+            now = time.time()
+            files = []
+            with os.scandir(self.disk_dir) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        # 写入中途崩溃留下的临时文件
+                        if now - stat.st_mtime >= 3600:
+                            self._remove(entry.path)
+                        continue
+                    if now - stat.st_mtime >= self.max_ttl:
+                        self._remove(entry.path)
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            target = int(self.disk_max_bytes * 0.9)
+            if total > self.disk_max_bytes:
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    if self._remove(path):
+                        total -= size
+                        self.counters["disk_evictions"] += 1
+            self.disk_bytes = total
+        except OSError as e:
+            logger.error(f"清扫响应缓存目录失败: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+            **({"disk_bytes": self.disk_bytes, "disk_max_bytes": self.disk_max_bytes} if self.disk_dir else {}),
+        }
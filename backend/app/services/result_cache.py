@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..data.models.database import SessionLocal, ResultCacheEntry
+from ..utils.cache import LRUCache
+from ..utils.logger import logger
+
+
+class SQLiteCacheTier:
+    """
+    结果缓存的持久化层
+    存放在应用数据库 (默认 SQLite) 的 result_cache 表中，重启后仍然有效，并在多个 uvicorn worker 之间共享
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """返回 (value, age)，条目不存在或已超过可读窗口时返回 None"""
+        db = SessionLocal()
+        try:
+            row = db.get(ResultCacheEntry, key)
+            if row is None:
+                return None
+            age = time.time() - row.stored_at
+            if age >= self.ttl + self.stale_ttl:
+                return None
+            return json.loads(row.payload), age
+        finally:
+            db.close()
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        db = SessionLocal()
+        try:
+            db.merge(ResultCacheEntry(
+                cache_key=key,
+                payload=json.dumps(value, ensure_ascii=False, default=str),
+                stored_at=now,
+            ))
+            # 顺带清理已经超过可读窗口的旧条目
+            db.query(ResultCacheEntry).filter(
+                ResultCacheEntry.stored_at < now - self.ttl - self.stale_ttl
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class TieredResultCache:
+    """
+    两级结果缓存：进程内 LRU + 持久化 SQLite
+
+    - 新鲜命中直接返回；
+    - 过期但仍在 stale 窗口内的条目会被立即返回，同时在后台刷新 (stale-while-revalidate)；
+    - 未命中时同步计算并写入两级缓存。
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        memory_ttl: float,
+        persistent_ttl: float,
+        stale_ttl: float,
+        persistent: bool = True,
+        cacheable: Callable[[Any], bool] = bool,
+    ):
+        self.memory = LRUCache(max_entries, memory_ttl, stale_ttl)
+        self.persistent = SQLiteCacheTier(persistent_ttl, stale_ttl) if persistent else None
+        self.cacheable = cacheable
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        stale_value = None
+        has_stale = False
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            value, age = cached
+            if age < self.memory.ttl:
+                self.counters["memory_hits"] += 1
+                return value
+            stale_value, has_stale = value, True
+
+        if self.persistent is not None:
+            try:
+                cached = await run_in_threadpool(self.persistent.get, key)
+            except Exception as e:
+                logger.error(f"读取持久化结果缓存失败: {e}")
+                cached = None
+            if cached is not None:
+                value, age = cached
+                if age < self.persistent.ttl:
+                    self.counters["persistent_hits"] += 1
+                    # 沿用持久化条目的写入时间，内存层不会把它当作刚写入的新条目
+                    self.memory.set(key, value, stored_at=time.time() - age)
+                    return value
+                if not has_stale:
+                    stale_value, has_stale = value, True
+
+        if has_stale:
+            self.counters["stale_hits"] += 1
+            self._schedule_refresh(key, compute)
+            return stale_value
+
+        self.counters["misses"] += 1
+        value = await compute()
+        await self._store(key, value)
+        return value
+
+    async def _store(self, key: str, value: Any):
+        if not self.cacheable(value):
+            return
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                await run_in_threadpool(self.persistent.set, key, value)
+            except Exception as e:
+                logger.error(f"写入持久化结果缓存失败: {e}")
+
+    def _schedule_refresh(self, key: str, compute: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, compute))
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[Any]]):
+        self.counters["refreshes"] += 1
+        try:
+            value = await compute()
+            await self._store(key, value)
+            logger.info(f"已在后台刷新缓存条目: '{key}'")
+        except Exception as e:
+            self.counters["refresh_errors"] += 1
+            logger.error(f"后台刷新缓存条目 '{key}' 失败: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self.counters[k] for k in ("memory_hits", "persistent_hits", "stale_hits", "misses"))
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "refreshing": len(self._refreshing),
+            "memory": self.memory.stats(),
+        }
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 
 class SocialMediaService(ABC):
     """社交媒体数据服务的抽象基类"""
@@ -12,4 +12,20 @@ class SocialMediaService(ABC):
     @abstractmethod
     async def get_reddit_posts(self, subreddit: str, limit: int = 100) -> List[Dict[Any, Any]]:
         """获取Reddit帖子"""
-        pass
\ No newline at end of file
+        pass
+
+    async def iter_twitter_posts(
+        self, query: str, limit: int = 100, max_seconds: Optional[float] = None, since_id: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[Any, Any]]]:
+        """按批次流式获取Twitter帖子；默认实现一次性返回全部结果，忽略 since_id"""
+        posts = await self.get_twitter_posts(query, limit)
+        if posts:
+            yield posts
+
+    async def iter_reddit_posts(
+        self, subreddit: str, limit: int = 100, max_seconds: Optional[float] = None, since_id: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[Any, Any]]]:
+        """按批次流式获取Reddit帖子；默认实现一次性返回全部结果，忽略 since_id"""
+        posts = await self.get_reddit_posts(subreddit, limit)
+        if posts:
+            yield posts
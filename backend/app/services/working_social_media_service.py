@@ -1,160 +1,231 @@
-import subprocess
-import json
 import asyncio
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from .social_media_service import SocialMediaService
+from .http_transport import CallBudget, get_http_transport
+from .api_key_pool import get_twitterapi_key_pool
 from ..core.config import settings
+from ..utils.json_stream import JsonProjection
 from ..utils.logger import logger
 
+# 收集器实际用到的字段；上游响应边下载边解析，其余字段直接丢弃
+USER_SEARCH_FIELDS = JsonProjection(
+    arrays={"users": ("id", "name", "screen_name", "username", "description", "followers_count", "verified", "isBlueVerified")},
+    scalars=("next_cursor", "has_next_page", "status", "msg"),
+)
+LAST_TWEETS_FIELDS = JsonProjection(
+    arrays={
+        field: ("id", "text", "url", "createdAt", "likeCount", "retweetCount", "replyCount", "author.userName")
+        for field in ("tweets", "data.tweets")
+    },
+    scalars=("status", "msg"),
+)
+
 class WorkingSocialMediaService(SocialMediaService):
     """
     可工作的社交媒体服务
-    使用 PowerShell curl 解决 Python requests 在 VPN 环境下的连接问题
+    通过共享的异步 HTTP 传输层（支持代理）调用 twitterapi.io
     """
     
     def __init__(self):
-        self.twitter_api_key = settings.TWITTERAPI_IO_KEY
+        self.key_pool = get_twitterapi_key_pool()
         self.twitter_base_url = "https://api.twitterapi.io"
-        self.proxy = settings.HTTPS_PROXY if settings.USE_PROXY and settings.HTTPS_PROXY else None
+        self.transport = get_http_transport()
         logger.info("WorkingSocialMediaService 已初始化")
-        if self.proxy:
-            logger.info(f"已加载代理: {self.proxy}")
+        if self.transport.proxy:
+            logger.info(f"已加载代理: {self.transport.proxy}")
 
-    def _execute_powershell_curl(self, url: str) -> Dict[str, Any]:
+    async def _request_json(
+        self,
+        path: str,
+        params: Dict[str, Any] = None,
+        projection: Optional[JsonProjection] = None,
+        budget: Optional[CallBudget] = None,
+    ) -> Dict[str, Any]:
         """
-        通过 PowerShell 执行 curl 命令
-        这是目前唯一能在 VPN 环境下成功调用 twitterapi.io 的方法
+        通过共享的 HTTP 传输层调用 twitterapi.io
+        连接池复用 keep-alive 连接，避免每次请求 fork 一个 curl 进程；
+        X-API-Key 由 Key 池按负载选取，传入 projection 时只解析其中的字段；
+        换 Key 重试同样计入 budget
         """
-        try:
-            # 构建代理参数
-            proxy_cmd = f"--proxy {self.proxy}" if self.proxy else ""
-            
-            # 使用 cmd 来执行真正的 curl，而不是 PowerShell 的别名
-            cmd = f'curl {proxy_cmd} -H "X-API-Key: {self.twitter_api_key}" "{url}"'
-            
-            logger.info(f"执行 cmd curl (带代理): {url}")
-            
-            # 使用 cmd 执行命令，指定 UTF-8 编码
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore',
-                timeout=30
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                try:
-                    data = json.loads(result.stdout.strip())
-                    logger.info("✅ cmd curl 执行成功")
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON 解析失败: {e}")
-                    logger.error(f"原始响应: {result.stdout[:200]}...")
-                    return {}
-            else:
-                logger.error(f"cmd curl 失败: {result.stderr}")
-                logger.error(f"返回码: {result.returncode}")
-                return {}
-                
-        except Exception as e:
-            logger.error(f"执行 cmd curl 时发生错误: {e}")
-            return {}
+        url = f"{self.twitter_base_url}{path}"
+        return await self.transport.get_json(
+            url, params=params, key_pool=self.key_pool, projection=projection, budget=budget
+        )
 
     async def get_twitter_posts(self, query: str, limit: int = 100) -> List[Dict[Any, Any]]:
         """
         获取 Twitter 帖子
-        通过搜索用户然后基于用户信息生成趋势内容
+        汇总 iter_twitter_posts 产出的所有批次
         """
         logger.info(f"获取 Twitter 帖子，查询: {query}, 限制: {limit}")
         
-        # 在异步函数中运行同步的 curl 操作
-        loop = asyncio.get_event_loop()
-        
+        posts = []
         try:
-            # 1. 搜索相关用户
-            url = f"{self.twitter_base_url}/twitter/user/search?query={query}"
-            data = await loop.run_in_executor(None, self._execute_powershell_curl, url)
-            
-            if not data or 'users' not in data or not data['users']:
-                logger.warning(f"未找到与 '{query}' 相关的用户")
-                return []
-            
-            users = data['users']
-            logger.info(f"✅ 找到 {len(users)} 个用户，正在筛选与 '{query}' 相关的用户")
-            
-            # 筛选真正相关的用户
-            relevant_users = []
-            for user in users:
-                user_text = f"{user.get('name', '')} {user.get('screen_name', '')} {user.get('description', '')}".lower()
-                if query.lower() in user_text:
-                    relevant_users.append(user)
-            
-            if not relevant_users:
-                logger.warning(f"在 {len(users)} 个用户中未找到与 '{query}' 真正相关的用户")
-                # 如果没有找到相关用户，我们仍然使用前几个用户来生成内容
-                relevant_users = users[:5]
-                logger.info(f"使用前 {len(relevant_users)} 个用户生成相关内容")
-            else:
-                logger.info(f"✅ 筛选出 {len(relevant_users)} 个与 '{query}' 相关的用户")
+            async for batch in self.iter_twitter_posts(query, limit):
+                posts.extend(batch)
+        except Exception as e:
+            logger.error(f"获取 Twitter 帖子时发生错误: {e}")
+        
+        logger.info(f"✅ 成功获取 {len(posts)} 条 Twitter 推文")
+        return posts[:limit]
+
+    async def iter_twitter_posts(
+        self, query: str, limit: int = 100, max_seconds: Optional[float] = None, since_id: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[Any, Any]]]:
+        """
+        按批次流式获取 Twitter 帖子
+        沿着用户搜索的 next_cursor 翻页，对每页中最相关、粉丝最多的用户并发拉取最近推文，
+        每个用户的推文到达后立即产出一批；达到 limit 条、超过 max_seconds 秒、
+        COLLECTOR_MAX_PAGES 页或用完本次查询的上游调用预算后停止；
+        指定 since_id 时只产出 ID 更大（更新）的推文。twitterapi.io 的用户推文接口不支持 since_id，
+        因此增量刷新时一旦某页用户的推文全部不新于水位线就停止翻页，后面的页只会是粉丝更少的用户
+        """
+        if max_seconds is None:
+            max_seconds = settings.COLLECTOR_MAX_SECONDS
+        deadline = time.monotonic() + max_seconds
+        budget = CallBudget(settings.TWITTER_CALL_BUDGET)
+        users_left = settings.TWITTER_TIMELINE_MAX_USERS
+        produced = 0
+        cursor = None
+        
+        for page in range(settings.COLLECTOR_MAX_PAGES):
+            if budget.remaining <= 0:
+                logger.info(f"查询 '{query}' 的上游调用预算已用完")
+                return
+            params = {"query": query}
+            if cursor:
+                params["cursor"] = cursor
+            data = await self._request_json("/twitter/user/search", params, USER_SEARCH_FIELDS, budget)
             
-            users = relevant_users
+            users = data.get('users') if data else None
+            if not users:
+                if page == 0:
+                    logger.warning(f"未找到与 '{query}' 相关的用户")
+                return
             
-            # 2. 基于用户信息生成趋势内容
-            posts = []
-            for user in users[:min(limit//5, 20)]:  # 限制用户数量
-                # 为每个用户生成多条内容
-                for i in range(min(5, limit//len(users) + 1)):
-                    post = {
-                        "platform": "twitter",
-                        "id": f"{user.get('id', 'unknown')}_{i}",
-                        "author": user.get("screen_name", user.get("username", "unknown")),
-                        "text": self._generate_post_content(user, query, i),
-                        "url": f"https://twitter.com/{user.get('screen_name', 'unknown')}",
-                        "likes": max(1, user.get("followers_count", 0) // 1000 + i * 10),
-                        "retweets": max(0, user.get("followers_count", 0) // 5000 + i * 5),
-                        "created_at": datetime.now().isoformat(),
-                        "user_info": {
-                            "followers": user.get("followers_count", 0),
-                            "verified": user.get("verified", False),
-                            "blue_verified": user.get("isBlueVerified", False)
-                        }
-                    }
-                    posts.append(post)
-                    
-                    if len(posts) >= limit:
-                        break
-                
-                if len(posts) >= limit:
-                    break
+            logger.info(f"✅ 第 {page + 1} 页找到 {len(users)} 个用户，正在筛选与 '{query}' 相关的用户")
+            top_users = self._rank_users(users, query)[:min(budget.remaining, users_left)]
+            users_left -= len(top_users)
             
-            logger.info(f"✅ 成功生成 {len(posts)} 条 Twitter 内容")
-            return posts[:limit]
+            produced_before = produced
+            async for batch in self._iter_user_timelines(top_users, limit - produced, deadline, since_id, budget):
+                produced += len(batch)
+                yield batch
             
-        except Exception as e:
-            logger.error(f"获取 Twitter 帖子时发生错误: {e}")
-            return []
+            if produced >= limit or users_left <= 0:
+                return
+            if since_id and produced == produced_before:
+                logger.info(f"第 {page + 1} 页用户没有比 {since_id} 更新的推文，停止翻页")
+                return
+            if time.monotonic() >= deadline:
+                logger.info(f"已达到 {max_seconds}s 的收集时限，停止翻页")
+                return
+            cursor = data.get('next_cursor')
+            if not data.get('has_next_page') or not cursor:
+                return
+
+    def _rank_users(self, users: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        """
+        筛选与查询真正相关的用户，并按粉丝数从高到低排序
+        """
+        relevant_users = []
+        for user in users:
+            user_text = f"{user.get('name', '')} {user.get('screen_name', '')} {user.get('description', '')}".lower()
+            if query.lower() in user_text:
+                relevant_users.append(user)
+        
+        if not relevant_users:
+            logger.warning(f"在 {len(users)} 个用户中未找到与 '{query}' 真正相关的用户")
+            # 如果没有找到相关用户，我们仍然使用前几个用户的推文
+            relevant_users = users[:5]
+        else:
+            logger.info(f"✅ 筛选出 {len(relevant_users)} 个与 '{query}' 相关的用户")
+        
+        return sorted(relevant_users, key=lambda u: u.get('followers_count', 0), reverse=True)
 
-    def _generate_post_content(self, user: Dict[str, Any], query: str, index: int) -> str:
+    async def _iter_user_timelines(
+        self,
+        users: List[Dict[str, Any]],
+        limit: int,
+        deadline: float,
+        since_id: Optional[str] = None,
+        budget: Optional[CallBudget] = None,
+    ) -> AsyncIterator[List[Dict[Any, Any]]]:
         """
-        基于用户信息和查询生成帖子内容
+        并发拉取多个用户的最近推文，并发数由信号量限制
+        每个用户的结果到达后立即产出；凑够 limit 条后取消其余请求；
+        前面的请求换 Key 重试用完 budget 后，其余用户不再请求上游
         """
-        screen_name = user.get('screen_name', 'unknown')
-        description = user.get('description', '')
+        if not users or limit <= 0:
+            return
         
-        # 生成不同类型的内容
-        content_templates = [
-            f"来自 @{screen_name} 关于 {query} 的见解: {description[:100]}...",
-            f"@{screen_name} 分享了关于 {query} 的最新动态。{description[:80]}...",
-            f"热门话题 #{query} - @{screen_name}: {description[:90]}...",
-            f"@{screen_name} 对 {query} 的专业观点: {description[:85]}...",
-            f"关注 @{screen_name} 了解更多 {query} 相关内容。{description[:75]}..."
-        ]
+        semaphore = asyncio.Semaphore(settings.TWITTER_TIMELINE_CONCURRENCY)
         
-        return content_templates[index % len(content_templates)]
+        async def fetch(user: Dict[str, Any]):
+            async with semaphore:
+                screen_name = user.get('screen_name', user.get('username', ''))
+                data = await self._request_json("/twitter/user/last_tweets", {"userName": screen_name}, LAST_TWEETS_FIELDS, budget)
+                return user, data
+        
+        tasks = [asyncio.create_task(fetch(user)) for user in users]
+        produced = 0
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=max(0.0, deadline - time.monotonic())):
+                user, data = await next_done
+                tweets = self._extract_tweets(data)[:settings.TWITTER_TWEETS_PER_USER]
+                if since_id and since_id.isdigit():
+                    tweets = [t for t in tweets if str(t.get('id', '')).isdigit() and int(t['id']) > int(since_id)]
+                batch = [self._tweet_to_post(tweet, user) for tweet in tweets][:limit - produced]
+                if batch:
+                    produced += len(batch)
+                    yield batch
+                if produced >= limit:
+                    return
+        except asyncio.TimeoutError:
+            logger.info("拉取用户推文超过收集时限，使用已到达的结果")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _extract_tweets(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """兼容 last_tweets 新旧两种响应结构: {"tweets": [...]} 或 {"data": {"tweets": [...]}}"""
+        if not data:
+            return []
+        if isinstance(data.get('data'), dict):
+            return data['data'].get('tweets') or []
+        return data.get('tweets') or []
+
+    @staticmethod
+    def _tweet_to_post(tweet: Dict[str, Any], user: Dict[str, Any]) -> Dict[Any, Any]:
+        """
+        将 twitterapi.io 的推文转换为统一的帖子格式
+        """
+        author = (tweet.get('author') or {}).get('userName') or user.get('screen_name', 'unknown')
+        tweet_id = str(tweet.get('id', ''))
+        try:
+            created_at = datetime.strptime(tweet.get('createdAt', ''), "%a %b %d %H:%M:%S %z %Y").isoformat()
+        except ValueError:
+            created_at = datetime.now().isoformat()
+        
+        return {
+            "platform": "twitter",
+            "id": tweet_id,
+            "author": author,
+            "text": tweet.get('text', ''),
+            "url": tweet.get('url') or f"https://twitter.com/{author}/status/{tweet_id}",
+            "likes": tweet.get('likeCount', 0),
+            "retweets": tweet.get('retweetCount', 0),
+            "replies": tweet.get('replyCount', 0),
+            "created_at": created_at,
+            "user_info": {
+                "followers": user.get("followers_count", 0),
+                "verified": user.get("verified", False),
+                "blue_verified": user.get("isBlueVerified", False)
+            }
+        }
 
     async def get_reddit_posts(self, subreddit: str, limit: int = 100) -> List[Dict[Any, Any]]:
         """
@@ -190,8 +261,7 @@ class WorkingSocialMediaService(SocialMediaService):
         logger.info("测试 WorkingSocialMediaService 连接...")
         
         try:
-            url = f"{self.twitter_base_url}/twitter/user/search?query=test"
-            data = self._execute_powershell_curl(url)
+            data = await self._request_json("/twitter/user/search", {"query": "test"})
             
             if data and isinstance(data, dict):
                 logger.info("✅ 连接测试成功")
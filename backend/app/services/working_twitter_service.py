@@ -1,7 +1,6 @@
-import requests
-import json
 from datetime import datetime
 from typing import List, Dict, Any
+from .http_transport import get_http_transport
 from ..core.config import settings
 from ..utils.logger import logger
 
@@ -13,41 +12,39 @@ class WorkingTwitterService:
     def __init__(self):
         self.api_key = settings.TWITTERAPI_IO_KEY
         self.base_url = "https://api.twitterapi.io"
+        self.transport = get_http_transport()
         logger.info("WorkingTwitterService 已初始化")
 
-    def search_users(self, query: str, count: int = 20) -> List[Dict[str, Any]]:
+    async def search_users(self, query: str, count: int = 20) -> List[Dict[str, Any]]:
         """
         搜索与查询相关的用户
         这个端点我们已经验证是可用的
         """
         logger.info(f"搜索用户: {query}")
         
-        # 完全模拟 curl 的请求头
+        # 完全模拟 curl 的请求头，连接复用由共享传输层负责
         headers = {
             'X-API-Key': self.api_key,
             'User-Agent': 'curl/8.4.0',  # 使用与成功的 curl 相同的 User-Agent
             'Accept': '*/*',  # curl 默认的 Accept 头
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive'
         }
         
         params = {
             'query': query
         }
         
+        response = await self.transport.get(
+            f"{self.base_url}/twitter/user/search",
+            headers=headers,
+            params=params,
+        )
+        if response is None:
+            return []
+        
+        logger.info(f"请求状态码: {response.status_code}")
+        logger.info(f"响应头: {dict(response.headers)}")
+        
         try:
-            # 使用与 curl 相同的方式发送请求
-            response = requests.get(
-                f"{self.base_url}/twitter/user/search",
-                headers=headers,
-                params=params,
-                timeout=30,
-                verify=True  # 确保 SSL 验证
-            )
-            
-            logger.info(f"请求状态码: {response.status_code}")
-            logger.info(f"响应头: {dict(response.headers)}")
-            
             if response.status_code == 200:
                 data = response.json()
                 users = data.get('users', [])
@@ -62,7 +59,7 @@ class WorkingTwitterService:
             logger.error(f"搜索用户时发生错误: {e}")
             return []
 
-    def get_user_tweets_alternative_method(self, user_id: str, count: int = 10) -> List[Dict[str, Any]]:
+    async def get_user_tweets_alternative_method(self, user_id: str, count: int = 10) -> List[Dict[str, Any]]:
         """
         尝试多种方法获取用户推文
         """
@@ -81,14 +78,13 @@ class WorkingTwitterService:
         for method in methods:
             try:
                 logger.info(f"尝试端点: {method}")
-                response = requests.get(
+                response = await self.transport.get(
                     f"{self.base_url}{method}",
                     headers=headers,
                     params={'count': count},
-                    timeout=30
                 )
                 
-                if response.status_code == 200:
+                if response is not None and response.status_code == 200:
                     data = response.json()
                     if 'tweets' in data or 'data' in data:
                         logger.info(f"✅ 端点 {method} 成功!")
@@ -101,7 +97,7 @@ class WorkingTwitterService:
         logger.warning(f"所有方法都无法获取用户 {user_id} 的推文")
         return []
 
-    def get_trending_content_via_users(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_trending_content_via_users(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
         通过搜索相关用户来获取趋势内容
         这是我们的主要策略
@@ -109,7 +105,7 @@ class WorkingTwitterService:
         logger.info(f"通过用户搜索获取 '{query}' 的趋势内容")
         
         # 1. 搜索相关用户
-        users = self.search_users(query, count=10)
+        users = await self.search_users(query, count=10)
         
         if not users:
             logger.warning("未找到相关用户")
@@ -139,7 +135,7 @@ class WorkingTwitterService:
         logger.info(f"生成了 {len(trending_content)} 条基于用户的趋势内容")
         return trending_content[:limit]
 
-    def test_all_available_endpoints(self) -> Dict[str, bool]:
+    async def test_all_available_endpoints(self) -> Dict[str, bool]:
         """
         测试所有可能的端点，找出哪些是可用的
         """
@@ -163,26 +159,24 @@ class WorkingTwitterService:
         results = {}
         
         for endpoint in endpoints_to_test:
-            try:
-                response = requests.get(
-                    f"{self.base_url}{endpoint}",
-                    headers=headers,
-                    params={'query': 'test'} if 'search' in endpoint else {},
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    results[endpoint] = True
-                    logger.info(f"✅ {endpoint} - 可用")
-                elif response.status_code == 404:
-                    results[endpoint] = False
-                    logger.info(f"❌ {endpoint} - 不存在")
-                else:
-                    results[endpoint] = False
-                    logger.info(f"⚠️ {endpoint} - 状态码: {response.status_code}")
-                    
-            except Exception as e:
+            response = await self.transport.get(
+                f"{self.base_url}{endpoint}",
+                headers=headers,
+                params={'query': 'test'} if 'search' in endpoint else {},
+                timeout=10
+            )
+            
+            if response is None:
+                results[endpoint] = False
+                logger.info(f"❌ {endpoint} - 请求失败")
+            elif response.status_code == 200:
+                results[endpoint] = True
+                logger.info(f"✅ {endpoint} - 可用")
+            elif response.status_code == 404:
+                results[endpoint] = False
+                logger.info(f"❌ {endpoint} - 不存在")
+            else:
                 results[endpoint] = False
-                logger.info(f"❌ {endpoint} - 错误: {e}")
+                logger.info(f"⚠️ {endpoint} - 状态码: {response.status_code}")
         
         return results
\ No newline at end of file
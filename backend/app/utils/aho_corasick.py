@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    """拉丁字母、数字等需要词边界的字符；中日韩文字之间没有空格，不做边界检查"""
+    return char.isascii() and (char.isalnum() or char == "_")
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+    构建一次后，一趟扫描即可找出文本中所有模式的出现位置，耗时与文本长度和命中数有关，与模式数量无关。
+    whole_words=True 时，以字母/数字开头或结尾的模式两侧必须是词边界 ("error" 不匹配 "errors")。
+    模式按原样匹配，调用方需自行统一大小写。
+    """
+
+    def __init__(self, patterns: Iterable[str], whole_words: bool = True):
+        self.patterns: List[str] = []
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        seen = set()
+        for pattern in patterns:
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append(len(self.patterns))
+            self.patterns.append(pattern)
+
+        # 按层 (BFS) 计算失配指针 (第一层指向根)，并把失配链上的输出合并到当前节点
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """产出 (起始下标, 模式编号)，按结束位置排序"""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                pattern = patterns[index]
+                start = end - len(pattern) + 1
+                if self.whole_words and not self._at_boundary(text, start, end, pattern):
+                    continue
+                yield start, index
+
+    @staticmethod
+    def _at_boundary(text: str, start: int, end: int, pattern: str) -> bool:
+        if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(pattern[-1]) and end + 1 < len(text) and _is_word_char(text[end + 1]):
+            return False
+        return True
+
+    def find_all(self, text: str) -> List[str]:
+        """返回命中的模式 (按出现顺序，可重复)"""
+        return [self.patterns[index] for _, index in self.iter_matches(text)]
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    带 TTL 的进程内 LRU 缓存
+
+    条目在写入 ttl 秒后过期；若设置了 stale_ttl，过期后的 stale_ttl 秒内
+    仍可被读取（由调用方根据返回的 age 判断是否需要后台刷新）。
+    设置 max_bytes 时，按 sizeof(value) 统计总大小，超出后按 LRU 顺序淘汰。
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        stale_ttl: float = 0,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """返回 (value, age)，条目不存在或已超过可读窗口时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age >= self.ttl + self.stale_ttl:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value, age
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        """stored_at 为条目最初的写入时间 (从下一级缓存读回时沿用原值，不延长有效期)，默认为当前时间"""
+        self.delete(key)
+        self._entries[key] = (value, time.time() if stored_at is None else stored_at)
+        if self.max_bytes is not None:
+            self.total_bytes += self.sizeof(value)
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._entries) > 1
+        ):
+            oldest_key = next(iter(self._entries))
+            self.delete(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.max_bytes is not None:
+            self.total_bytes -= self.sizeof(entry[0])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
+        if self.max_bytes is not None:
+            stats["bytes"] = self.total_bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats
@@ -0,0 +1,115 @@
+import time
+from typing import Any, Dict, Optional
+
+from .metrics import register_metrics
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被快速拒绝"""
+
+
+class CircuitBreaker:
+    """
+    上游熔断器 (closed -> open -> half-open)
+
+    - closed: 正常放行，连续失败达到 failure_threshold 次后打开；
+    - open: 直接拒绝请求，recovery_timeout 秒后进入 half-open；
+    - half-open: 只放行少量探测请求，成功则关闭，失败则重新打开。
+
+    探测请求被取消时调用方应调用 release() 归还名额；未归还的探测名额 probe_timeout 秒后自动过期，
+    避免熔断器永远卡在 half-open。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        probe_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.probe_timeout = probe_timeout if probe_timeout is not None else recovery_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._probe_started_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+        self.expired_probes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        elif (
+            self._state == self.HALF_OPEN
+            and self._half_open_calls >= self.half_open_max_calls
+            and time.monotonic() - self._probe_started_at >= self.probe_timeout
+        ):
+            # 探测请求迟迟没有回报结果 (例如被取消且未归还名额)，视为丢失，重新放行探测
+            self._half_open_calls = 0
+            self.expired_probes += 1
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            self._probe_started_at = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self):
+        """放行的请求没有结果 (被取消) 时调用：归还 half-open 探测名额，不计入成功或失败"""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self):
+        self._consecutive_failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "expired_probes": self.expired_probes,
+        }
+
+
+# 上游名称 -> 熔断器，进程内共享
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0) -> CircuitBreaker:
+    """获取指定上游的熔断器，首次调用时按给定参数创建"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name, failure_threshold, recovery_timeout)
+        _breakers[name] = breaker
+    return breaker
+
+
+register_metrics("circuit_breakers", lambda: {name: b.stats() for name, b in _breakers.items()})
@@ -0,0 +1,31 @@
+import importlib.util
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+# orjson 为可选依赖：未安装时退回到标准库 json
+_HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+if _HAS_ORJSON:
+    import orjson
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON 字节串；无法直接序列化的对象转为字符串"""
+    if _HAS_ORJSON:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    使用 orjson 序列化的 JSON 响应
+    content 为 bytes 时视为已经序列化好的 JSON，原样输出
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,120 @@
+import hashlib
+import importlib.util
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+# ijson 为可选依赖：安装后边下载边解析，未安装时整体解析一次字节串再裁剪
+_HAS_IJSON = importlib.util.find_spec("ijson") is not None
+if _HAS_IJSON:
+    import ijson
+
+_SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+
+
+def _get_path(data: Any, path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _set_path(target: Dict[str, Any], path: str, value: Any):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        target = target.setdefault(part, {})
+    target[leaf] = value
+
+
+class JsonProjection:
+    """
+    只保留 JSON 响应中需要的字段
+    - arrays: 数组路径 (如 "users"、"data.tweets") -> 每个元素要保留的标量字段 (可用 "author.userName" 表示嵌套字段)；
+    - scalars: 顶层要保留的标量路径 (如 "next_cursor")。
+    输出保持原有的嵌套结构，只是去掉了其余字段，因此下游代码无需修改。
+    """
+
+    def __init__(self, arrays: Dict[str, Sequence[str]], scalars: Sequence[str] = ()):
+        self.arrays = {path: tuple(fields) for path, fields in arrays.items()}
+        self.scalars = tuple(scalars)
+        # ijson 事件前缀 -> (数组路径, 元素内字段)
+        self._field_prefixes: Dict[str, Tuple[str, str]] = {
+            f"{path}.item.{field}": (path, field)
+            for path, fields in self.arrays.items()
+            for field in fields
+        }
+        self._item_prefixes = {f"{path}.item": path for path in self.arrays}
+        # 字段集合的短摘要，用于区分同一请求在不同投影下的缓存条目
+        spec = json.dumps([sorted(self.arrays.items()), sorted(self.scalars)])
+        self.fingerprint = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+
+    def project(self, data: Any) -> Dict[str, Any]:
+        """裁剪一个已解析的 JSON 对象"""
+        if not isinstance(data, dict):
+            return {}
+        result: Dict[str, Any] = {}
+        for path in self.scalars:
+            value = _get_path(data, path)
+            if value is not None:
+                _set_path(result, path, value)
+        for path, fields in self.arrays.items():
+            items = _get_path(data, path)
+            if not isinstance(items, list):
+                continue
+            records: List[Dict[str, Any]] = []
+            _set_path(result, path, records)
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                record: Dict[str, Any] = {}
+                for field in fields:
+                    value = _get_path(item, field)
+                    if value is not None:
+                        _set_path(record, field, value)
+                records.append(record)
+        return result
+
+    async def parse_stream(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """从字节流增量解析，只为需要的字段分配对象；响应体不是合法 JSON 时抛出 ValueError"""
+        if not _HAS_IJSON:
+            body = bytearray()
+            async for chunk in chunks:
+                body.extend(chunk)
+            return self.project(json.loads(bytes(body))) if body else {}
+
+        result: Dict[str, Any] = {}
+        events = ijson.sendable_list()
+        parser = ijson.parse_coro(events, use_float=True)
+        current: Dict[str, Optional[Dict[str, Any]]] = {path: None for path in self.arrays}
+
+        def consume():
+            for prefix, event, value in events:
+                if event in _SCALAR_EVENTS:
+                    target = self._field_prefixes.get(prefix)
+                    if target is not None:
+                        record = current[target[0]]
+                        if record is not None and value is not None:
+                            _set_path(record, target[1], value)
+                    elif prefix in self.scalars and value is not None:
+                        _set_path(result, prefix, value)
+                elif event == "start_array" and prefix in self.arrays:
+                    _set_path(result, prefix, [])
+                elif prefix in self._item_prefixes:
+                    path = self._item_prefixes[prefix]
+                    if event == "start_map":
+                        current[path] = {}
+                    elif event == "end_map" and current[path] is not None:
+                        _get_path(result, path).append(current[path])
+                        current[path] = None
+            del events[:]
+
+        try:
+            async for chunk in chunks:
+                parser.send(chunk)
+                consume()
+            parser.close()
+        except ijson.JSONError as e:
+            # 与 json.loads 保持一致，解析失败统一抛出 ValueError
+            raise ValueError(f"JSON 解析失败: {e}") from e
+        consume()
+        return result
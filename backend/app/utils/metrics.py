@@ -0,0 +1,14 @@
+from typing import Any, Callable, Dict
+
+# 组件名称 -> 返回该组件当前统计数据的函数
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    """注册一个组件的统计数据来源，由 /metrics 端点统一输出"""
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """收集所有已注册组件的当前统计数据"""
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,6 @@
+def normalize_query(query: str) -> str:
+    """
+    规范化查询关键词，用作合并、缓存等场景的 key
+    忽略大小写和多余空白，例如 "  Tesla   Model Y " -> "tesla model y"
+    """
+    return " ".join(query.lower().split())
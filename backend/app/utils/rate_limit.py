@@ -0,0 +1,167 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+    以 rate 个/秒的速度补充令牌，最多累积 capacity 个；令牌不足时等待补充。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # 加锁保证等待者按先来后到的顺序拿到令牌
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def block_for(self, seconds: float):
+        """上游明确要求等待 (例如 429 的 Retry-After) 时暂停发放令牌"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    @property
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 自适应并发限制
+
+    - 请求成功且延迟正常时加性增长：每个窗口约 +1；
+    - 遇到 429/5xx/超时，或延迟明显高于基线时乘性减小。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.backoffs = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, overloaded: Optional[bool], latency: Optional[float] = None):
+        """overloaded 为 None 表示请求没有结果 (被取消、连接失败)：只归还名额，不调整并发限制"""
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded is None:
+                pass
+            elif overloaded or self._latency_degraded(latency):
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self.backoffs += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def _latency_degraded(self, latency: Optional[float]) -> bool:
+        if latency is None:
+            return False
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+            return False
+        degraded = latency > self.baseline_latency * self.latency_tolerance
+        # 基线缓慢跟随最近的正常延迟，避免一次异常就永久抬高或压低基线
+        if not degraded:
+            self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+        return degraded
+
+
+class Permit:
+    """一次被放行的请求，用于回报结果给限流器"""
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self.retry_after: Optional[float] = None
+        self.timed_out = False
+
+    def record(self, status_code: int, latency: float, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.latency = latency
+        self.retry_after = retry_after
+
+    def record_timeout(self):
+        self.timed_out = True
+
+    @property
+    def overloaded(self) -> Optional[bool]:
+        """429/5xx 或超时为 True，其他响应为 False；没有响应也没有超时 (被取消、连接失败) 时为 None"""
+        if self.timed_out:
+            return True
+        if self.status_code is None:
+            return None
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class UpstreamLimiter:
+    """单个上游 (以及单个 API Key) 的限流器：令牌桶控制速率，AIMD 控制并发"""
+
+    def __init__(self, bucket: TokenBucket, concurrency: AdaptiveConcurrencyLimiter):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.requests = 0
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Permit]:
+        await self.concurrency.acquire()
+        permit = Permit()
+        try:
+            await self.bucket.acquire()
+            self.requests += 1
+            yield permit
+        finally:
+            if permit.status_code == 429:
+                self.throttled += 1
+                if permit.retry_after:
+                    self.bucket.block_for(permit.retry_after)
+            # 只有 429/5xx 和超时才是过载信号；被取消 (包括还在等令牌时) 或连接失败的请求不调整并发限制
+            await self.concurrency.release(permit.overloaded, permit.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "backoffs": self.concurrency.backoffs,
+            "tokens_available": round(self.bucket.available, 2),
+        }
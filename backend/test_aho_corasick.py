@@ -0,0 +1,83 @@
+import sys
+import os
+import random
+import re
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.analysis_service import AnalysisService
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.logger import logger
+
+
+def _brute_force(patterns, text):
+    """逐个模式用正则查找整词出现位置，作为对照"""
+    found = []
+    for index, pattern in enumerate(patterns):
+        left = r"(?<![A-Za-z0-9_])" if re.match(r"[A-Za-z0-9_]", pattern[0]) else ""
+        right = r"(?![A-Za-z0-9_])" if re.match(r"[A-Za-z0-9_]", pattern[-1]) else ""
+        for match in re.finditer(f"(?={left}{re.escape(pattern)}{right})", text):
+            found.append((match.start(), index))
+    return sorted(found)
+
+
+def test_matches_whole_words_only():
+    """以字母数字开头或结尾的模式两侧必须是词边界"""
+    logger.info("--- 测试整词匹配 ---")
+    matcher = AhoCorasick(["error", "long way", "can't handle", "人工智能"])
+    assert matcher.find_all("errors everywhere") == []
+    assert matcher.find_all("an error, a long way to go") == ["error", "long way"]
+    assert matcher.find_all("i can't handle 人工智能很强") == ["can't handle", "人工智能"]
+
+
+def test_matches_agree_with_brute_force():
+    """重叠、嵌套的模式与暴力查找结果一致"""
+    logger.info("--- 测试与暴力查找一致 ---")
+    rng = random.Random(7)
+    alphabet = "ab c"
+    patterns = sorted({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))).strip() or "a" for _ in range(40)})
+    matcher = AhoCorasick(patterns)
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        got = sorted(matcher.iter_matches(text))
+        assert got == _brute_force(matcher.patterns, text), f"文本 {text!r} 的匹配结果不一致"
+
+
+def test_duplicate_patterns_are_dropped():
+    """重复和空模式只保留一次，保持首次出现的顺序"""
+    logger.info("--- 测试重复模式去重 ---")
+    matcher = AhoCorasick(["bad", "", "good", "bad", "good", "ok"])
+    assert matcher.patterns == ["bad", "good", "ok"]
+    assert len(matcher) == 3
+
+
+def test_large_lexicon_builds_quickly():
+    """构建耗时与词典大小成线性关系 (10 万个词在数秒内完成)"""
+    logger.info("--- 测试大词典构建耗时 ---")
+    words = [f"word{i}" for i in range(100_000)]
+    started = time.monotonic()
+    matcher = AhoCorasick(words + words[:1000])
+    elapsed = time.monotonic() - started
+    assert len(matcher) == 100_000
+    assert elapsed < 5.0, f"构建耗时过长: {elapsed:.2f}s"
+    assert matcher.find_all("word42 and word99999") == ["word42", "word99999"]
+
+
+def test_sentiment_counts_each_term_once():
+    """情感分析：每个命中词只计一次，多词短语按整体匹配"""
+    logger.info("--- 测试情感打分 ---")
+    service = AnalysisService()
+    assert service.score("love love love") == 1.0
+    assert service.analyze_sentiment("Great product, would recommend") == "positive"
+    assert service.analyze_sentiment("still a long way to go, bugs everywhere") == "negative"
+    assert service.analyze_sentiment("Errors are not the same word") == "neutral"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 Aho-Corasick 测试 =====")
+    test_matches_whole_words_only()
+    test_matches_agree_with_brute_force()
+    test_duplicate_patterns_are_dropped()
+    test_large_lexicon_builds_quickly()
+    test_sentiment_counts_each_term_once()
+    logger.info("===== 所有 Aho-Corasick 测试完成 =====")
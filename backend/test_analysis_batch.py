@@ -0,0 +1,129 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import analysis
+from app.core.config import settings
+from app.services.analysis_service import get_analysis_service
+from app.utils.logger import logger
+
+app = FastAPI()
+app.include_router(analysis.router, prefix="/api/v1/analysis")
+client = TestClient(app)
+
+
+def _records(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_json_batch_with_mixed_items():
+    """JSON 模式下单项格式错误只影响该项，其余文本正常打分"""
+    logger.info("--- 测试 JSON 批量 (混合有效与无效项) ---")
+    response = client.post("/api/v1/analysis/batch", json={"texts": [
+        "I love this, it is amazing",
+        5,
+        {"id": "a1", "text": "terrible bugs everywhere"},
+        {"id": "a2"},
+        None,
+        "just a plain sentence",
+    ]})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = _records(response)
+    assert [record["index"] for record in records] == [0, 1, 2, 3, 4, 5]
+    assert records[0]["sentiment"] == "positive"
+    assert "error" in records[1]
+    assert records[2]["sentiment"] == "negative" and records[2]["id"] == "a1"
+    assert "error" in records[3]
+    assert "error" in records[4]
+    assert records[5]["sentiment"] == "neutral"
+
+
+def test_json_batch_rejects_malformed_envelope():
+    """请求体本身不合法 (没有 texts 或为空列表) 时返回 422"""
+    logger.info("--- 测试非法请求体 ---")
+    assert client.post("/api/v1/analysis/batch", json={"texts": []}).status_code == 422
+    assert client.post("/api/v1/analysis/batch", json={"items": ["x"]}).status_code == 422
+
+
+def test_ndjson_batch():
+    """NDJSON 模式：每行一项，无法解析的行返回错误，空行忽略"""
+    logger.info("--- 测试 NDJSON 批量 ---")
+    body = b'"great success"\n\n{"id": 7, "text": "I hate this problem"}\nnot json\n'
+    response = client.post(
+        "/api/v1/analysis/batch", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200, response.text
+    records = _records(response)
+    assert records[0]["sentiment"] == "positive"
+    assert records[1]["sentiment"] == "negative" and records[1]["id"] == 7
+    assert records[2]["index"] == 2 and "error" in records[2]
+
+
+def test_vectorized_scores_match_single_scores():
+    """大批量走向量化路径时，结果与逐条打分一致"""
+    logger.info("--- 测试向量化打分与逐条打分一致 ---")
+    service = get_analysis_service()
+    texts = [
+        "great product, would recommend",
+        "this has a long way to go",
+        "Errors everywhere, error in the logs",
+        "I can't handle these bugs",
+        "the future looks amazing!",
+        "nothing interesting here",
+        "人工智能 is awesome but failed",
+        "end of the road for this terrible idea",
+    ] * 10
+    assert service.score_batch(texts) == [service.score(text) for text in texts]
+
+    response = client.post("/api/v1/analysis/batch", json={"texts": texts})
+    scores = [record["score"] for record in _records(response)]
+    assert scores == [service.score(text) for text in texts]
+
+
+def test_oversized_batches_are_rejected_before_scoring():
+    """文本条数或请求体大小超限时整批返回 413，不截断也不打分"""
+    logger.info("--- 测试超限请求 ---")
+    original = settings.ANALYSIS_BATCH_MAX_TEXTS, settings.ANALYSIS_BATCH_MAX_BYTES
+    service = get_analysis_service()
+    score_batch = service.score_batch
+    scored = []
+    service.score_batch = lambda texts: scored.append(texts) or score_batch(texts)
+    settings.ANALYSIS_BATCH_MAX_TEXTS = 3
+    settings.ANALYSIS_BATCH_MAX_BYTES = 200
+    try:
+        ok = client.post("/api/v1/analysis/batch", json={"texts": ["a", "b", "c"]})
+        assert ok.status_code == 200 and len(_records(ok)) == 3
+
+        response = client.post("/api/v1/analysis/batch", json={"texts": ["a", "b", "c", "d"]})
+        assert response.status_code == 413, response.text
+        response = client.post(
+            "/api/v1/analysis/batch", content=b'"a"\n"b"\n\n"c"\n"d"\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413, response.text
+
+        big = json.dumps({"texts": ["x" * 300]}).encode()
+        assert client.post("/api/v1/analysis/batch", content=big).status_code == 413
+        # 没有 Content-Length 的分块请求体同样在读取时计数
+        chunked = client.post("/api/v1/analysis/batch", content=iter([big[:100], big[100:]]))
+        assert chunked.status_code == 413
+        assert client.post("/api/v1/analysis/batch", content=b"{not json").status_code == 422
+    finally:
+        settings.ANALYSIS_BATCH_MAX_TEXTS, settings.ANALYSIS_BATCH_MAX_BYTES = original
+        service.score_batch = score_batch
+    assert len(scored) == 1, "超限请求不应进入打分。"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行批量情感分析测试 =====")
+    test_json_batch_with_mixed_items()
+    test_json_batch_rejects_malformed_envelope()
+    test_ndjson_batch()
+    test_vectorized_scores_match_single_scores()
+    test_oversized_batches_are_rejected_before_scoring()
+    logger.info("===== 所有批量情感分析测试完成 =====")
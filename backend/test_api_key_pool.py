@@ -0,0 +1,145 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.services.api_key_pool import ApiKeyPool
+from app.services.http_transport import CallBudget, HttpTransport
+from app.utils.logger import logger
+
+
+def _transport(handler, **kwargs) -> HttpTransport:
+    transport = HttpTransport(**kwargs)
+    transport._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return transport
+
+
+def test_least_loaded_and_bench():
+    """优先选择进行中请求最少的 Key；429 的 Key 进入冷却，不再被选中"""
+    logger.info("--- 测试 Key 选择与冷却 ---")
+    pool = ApiKeyPool(["key-a", "key-b", "key-a", ""])
+    assert len(pool) == 2
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.key, second.key} == {"key-a", "key-b"}
+
+    pool.release(first, httpx.Response(429))
+    pool.release(second, httpx.Response(200, headers={"X-RateLimit-Remaining": "0"}))
+    assert first.times_benched == 1
+    assert pool.acquire() is None, "一个 Key 冷却、另一个配额用尽时应没有可用的 Key。"
+
+
+def test_rotates_to_next_key_on_429():
+    """某个 Key 被限流时换下一个可用的 Key 重试"""
+    logger.info("--- 测试换 Key 重试 ---")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["X-API-Key"])
+        if request.headers["X-API-Key"] == "key-a":
+            return httpx.Response(429)
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        transport = _transport(handler)
+        try:
+            return await transport.get_json(
+                "https://key-pool-rotate.test/twitter/user/search",
+                key_pool=ApiKeyPool(["key-a", "key-b"], strategy="round_robin"),
+            )
+        finally:
+            await transport.aclose()
+
+    assert asyncio.run(run()) == {"ok": True}
+    assert seen == ["key-a", "key-b"]
+
+
+def test_retries_count_against_call_budget():
+    """换 Key 重试同样消耗调用预算，预算用完后不再请求上游"""
+    logger.info("--- 测试重试计入调用预算 ---")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["X-API-Key"])
+        return httpx.Response(429)
+
+    async def run():
+        transport = _transport(handler)
+        budget = CallBudget(2)
+        pool = ApiKeyPool(["key-a", "key-b", "key-c"], strategy="round_robin")
+        url = "https://key-pool-budget.test/twitter/user/search"
+        try:
+            first = await transport.get_json(url, key_pool=pool, budget=budget)
+            second = await transport.get_json(url, key_pool=ApiKeyPool(["key-d"]), budget=budget)
+        finally:
+            await transport.aclose()
+        return first, second, budget
+
+    first, second, budget = asyncio.run(run())
+    assert first == {} and second == {}
+    assert len(seen) == 2, f"预算为 2 时最多请求上游 2 次: {seen}"
+    assert budget.remaining == 0 and not budget.take()
+
+
+def test_host_semaphore_is_per_key():
+    """每个 API Key 各自占用单个主机的连接上限，多个 Key 的总并发随 Key 数量增长"""
+    logger.info("--- 测试按 Key 划分的主机信号量 ---")
+    in_flight = {}
+    peak = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        key = request.headers["X-API-Key"]
+        in_flight[key] = in_flight.get(key, 0) + 1
+        peak[key] = max(peak.get(key, 0), in_flight[key])
+        peak["total"] = max(peak.get("total", 0), sum(in_flight.values()))
+        await asyncio.sleep(0.02)
+        in_flight[key] -= 1
+        return httpx.Response(200, json={})
+
+    async def run():
+        transport = _transport(handler, max_connections_per_host=1)
+        url = "https://key-pool-semaphore.test/twitter/user/search"
+        try:
+            await asyncio.gather(*(
+                transport.get(url, headers={"X-API-Key": key}) for key in ("key-a", "key-b") for _ in range(3)
+            ))
+        finally:
+            await transport.aclose()
+
+    asyncio.run(run())
+    assert peak["key-a"] == 1 and peak["key-b"] == 1
+    assert peak["total"] == 2, f"两个 Key 应能同时各占一个连接: {peak}"
+
+
+def test_last_key_gets_a_short_auth_bench():
+    """只剩一个可用的 Key 时 401/403 只短暂冷却，其他 Key 可用时才按完整时长冷却"""
+    logger.info("--- 测试最后一个 Key 的鉴权冷却 ---")
+    single = ApiKeyPool(["only-key"], bench_seconds_401=3600, bench_seconds_last_key=0.05)
+    state = single.acquire()
+    single.release(state, httpx.Response(401))
+    assert single.acquire() is None
+    assert state.benched_until - time.monotonic() < 1
+    time.sleep(0.06)
+    assert single.acquire() is state
+
+    pool = ApiKeyPool(["key-a", "key-b"], strategy="round_robin", bench_seconds_401=3600, bench_seconds_last_key=0.05)
+    first = pool.acquire()
+    pool.release(first, httpx.Response(403))
+    assert first.benched_until - time.monotonic() > 3000, "还有其他可用的 Key 时按完整时长冷却。"
+    second = pool.acquire()
+    pool.release(second, httpx.Response(403))
+    assert second.benched_until - time.monotonic() < 1
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 API Key 池测试 =====")
+    test_least_loaded_and_bench()
+    test_rotates_to_next_key_on_429()
+    test_retries_count_against_call_budget()
+    test_host_semaphore_is_per_key()
+    test_last_key_gets_a_short_auth_bench()
+    logger.info("===== 所有 API Key 池测试完成 =====")
@@ -0,0 +1,121 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.services.http_transport import HttpTransport
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.logger import logger
+
+
+def _open_breaker(name: str, probe_timeout: float = 60.0) -> CircuitBreaker:
+    """创建一个已经打开、且立即可以进入 half-open 的熔断器"""
+    breaker = CircuitBreaker(name, failure_threshold=2, recovery_timeout=0.0, probe_timeout=probe_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    """连续失败达到阈值后打开，open 期间拒绝请求"""
+    logger.info("--- 测试熔断器打开 ---")
+    breaker = CircuitBreaker("test-open", failure_threshold=3, recovery_timeout=60.0)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow_request(), "未达到阈值前应放行。"
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request(), "open 状态应快速拒绝。"
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_closes_on_success():
+    """half-open 只放行一个探测请求，探测成功后关闭"""
+    logger.info("--- 测试 half-open 探测成功 ---")
+    breaker = _open_breaker("test-probe-success")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request(), "half-open 应放行一个探测请求。"
+    assert not breaker.allow_request(), "探测进行中时不应再放行。"
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_reopens_on_failure():
+    """探测失败后重新打开"""
+    logger.info("--- 测试 half-open 探测失败 ---")
+    breaker = CircuitBreaker("test-probe-failure", failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.recovery_timeout = 60.0
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_release_returns_probe_slot():
+    """release() 归还探测名额，不计入成功或失败"""
+    logger.info("--- 测试归还探测名额 ---")
+    breaker = _open_breaker("test-release")
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request(), "归还名额后应能再次探测。"
+
+
+def test_stuck_probe_expires():
+    """探测请求一直不回报结果时，probe_timeout 后重新放行探测"""
+    logger.info("--- 测试探测名额过期 ---")
+    breaker = _open_breaker("test-expire", probe_timeout=0.05)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request(), "过期的探测名额应被回收。"
+    assert breaker.expired_probes == 1
+
+
+def test_cancelled_probe_is_released():
+    """HttpTransport.get 的探测请求被取消后，熔断器不会卡在 half-open"""
+    logger.info("--- 测试被取消的探测请求 ---")
+
+    async def hang(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(60)
+        return httpx.Response(200, json={})
+
+    async def run():
+        host = "breaker-cancel.test"
+        breaker = _open_breaker(host)
+        circuit_breaker._breakers[host] = breaker
+        transport = HttpTransport()
+        transport._client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+        try:
+            task = asyncio.create_task(transport.get(f"https://{host}/ping"))
+            await asyncio.sleep(0.05)
+            assert breaker._half_open_calls == 1, "探测请求应占用 half-open 名额。"
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            assert breaker.allow_request(), "被取消的探测应归还名额。"
+        finally:
+            circuit_breaker._breakers.pop(host, None)
+            await transport.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行熔断器测试 =====")
+    test_opens_after_consecutive_failures()
+    test_half_open_probe_closes_on_success()
+    test_half_open_probe_reopens_on_failure()
+    test_release_returns_probe_slot()
+    test_stuck_probe_expires()
+    test_cancelled_probe_is_released()
+    logger.info("===== 所有熔断器测试完成 =====")
@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.data.models.database import RawPost
+from app.data.processors.dedup import NearDuplicateFilter, jaccard, shingles
+from app.data.processors.ranking import post_engagement
+from app.utils.logger import logger
+
+
+def _post(text: str, likes: int = 0, retweets: int = 0, followers: int = 0) -> RawPost:
+    return RawPost(
+        platform="twitter", author="someone", text=text, url=f"https://x.com/{hash(text)}",
+        likes=likes, retweets=retweets, followers=followers,
+    )
+
+
+def test_shingles_and_jaccard():
+    """URL 不参与比较，大小写和空白被归一化"""
+    logger.info("--- 测试 shingle 与 Jaccard ---")
+    a = shingles("Tesla delivers record numbers this quarter https://t.co/abc")
+    b = shingles("tesla  delivers record numbers this QUARTER https://t.co/xyz")
+    assert a == b
+    assert jaccard(a, shingles("completely different words about cooking pasta")) == 0.0
+    assert jaccard(frozenset(), frozenset()) == 1.0
+
+
+def test_removes_near_duplicates_and_keeps_distinct_posts():
+    """近似重复的转发只保留一条，不相关的帖子原样保留且保持顺序"""
+    logger.info("--- 测试近似重复过滤 ---")
+    base = "the new model release is amazing and everyone should try it today for real"
+    posts = [
+        _post(base),
+        _post("a completely unrelated post about the weather in london this weekend"),
+        _post(base + " !!!"),
+        _post("RT " + base),
+        _post("yet another distinct post about football results from last night game"),
+    ]
+    kept = NearDuplicateFilter(threshold=0.7).filter(posts)
+    texts = [post.text for post in kept]
+    assert len(kept) == 3, f"应保留 3 条: {texts}"
+    assert texts[1].startswith("a completely unrelated")
+    assert texts[2].startswith("yet another distinct")
+
+
+def test_keeps_the_most_engaging_duplicate():
+    """重复组中按 post_engagement (点赞、转发、粉丝) 保留得分最高的一条"""
+    logger.info("--- 测试保留互动量最高的重复帖 ---")
+    text = "breaking: the central bank raises interest rates by fifty basis points today"
+    posts = [
+        _post(text, likes=50),
+        _post(text + " #economy", likes=10, retweets=400, followers=100000),
+        _post(text + " wow", likes=60),
+    ]
+    kept = NearDuplicateFilter(threshold=0.7).filter(posts, engagement=post_engagement)
+    assert len(kept) == 1
+    assert kept[0].retweets == 400, "应保留转发最多的一条，而不是只看点赞。"
+
+
+def test_large_bucket_is_linear():
+    """大量相同的转发落入同一个桶时，候选对数与帖子数成线性关系"""
+    logger.info("--- 测试大桶的候选对数量 ---")
+    text = "giveaway retweet and follow to win a brand new phone before friday night"
+    posts = [_post(text, likes=i) for i in range(3000)]
+    dedup = NearDuplicateFilter(threshold=0.7)
+    kept = dedup.filter(posts)
+    assert len(kept) == 1 and kept[0].likes == 2999
+    assert dedup.counters["candidate_pairs"] < len(posts), f"候选对过多: {dedup.counters['candidate_pairs']}"
+    assert dedup.stats()["duplicates_removed"] == 2999
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行近似重复过滤测试 =====")
+    test_shingles_and_jaccard()
+    test_removes_near_duplicates_and_keeps_distinct_posts()
+    test_keeps_the_most_engaging_duplicate()
+    test_large_bucket_is_linear()
+    logger.info("===== 所有近似重复过滤测试完成 =====")
@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.fan_out import fan_out
+from app.utils.logger import logger
+
+
+def _source(batches, delay: float = 0.0, fail: bool = False):
+    """按给定间隔依次产出批次的数据源；fail=True 时在产出完批次后抛出异常"""
+    async def stream():
+        for batch in batches:
+            await asyncio.sleep(delay)
+            yield batch
+        if fail:
+            raise RuntimeError("upstream down")
+    return stream
+
+
+def test_sources_run_concurrently():
+    """所有数据源同时查询，总耗时约等于最慢的一个而不是总和"""
+    logger.info("--- 测试并发抓取 ---")
+    sources = {
+        "twitter": _source([[{"id": 1}], [{"id": 2}]], delay=0.1),
+        "reddit": _source([[{"id": 3}]], delay=0.2),
+    }
+    started = time.monotonic()
+    result = asyncio.run(fan_out(sources, per_source_timeout=1.0, deadline=2.0))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.35, f"应并发执行: {elapsed:.2f}s"
+    assert list(result.posts_by_source) == ["twitter", "reddit"]
+    assert [post["id"] for post in result.all_posts] == [1, 2, 3]
+    assert result.missed_sources == {}
+
+
+def test_per_source_timeout_keeps_partial_batches():
+    """超时的数据源记为 timeout，已到达的批次保留"""
+    logger.info("--- 测试单个数据源超时 ---")
+    sources = {
+        "twitter": _source([[{"id": 1}], [{"id": 2}]], delay=0.05),
+        "reddit": _source([[{"id": 3}], [{"id": 4}]], delay=0.15),
+    }
+    result = asyncio.run(fan_out(sources, per_source_timeout=0.2, deadline=1.0))
+    assert result.missed_sources == {"reddit": "timeout"}
+    assert result.posts_by_source["reddit"] == [{"id": 3}]
+    assert len(result.posts_by_source["twitter"]) == 2
+
+
+def test_global_deadline_and_errors():
+    """整体截止时间到期后携带部分结果继续；抛出异常的数据源记为 error"""
+    logger.info("--- 测试整体截止时间与错误 ---")
+    sources = {
+        "twitter": _source([[{"id": 1}]], fail=True),
+        "reddit": _source([[{"id": 2}], [{"id": 3}]], delay=0.1),
+    }
+    seen = []
+    started = time.monotonic()
+    result = asyncio.run(fan_out(
+        sources, per_source_timeout=5.0, deadline=0.15, on_batch=lambda name, batch: seen.append(name),
+    ))
+    assert time.monotonic() - started < 0.5
+    assert result.missed_sources == {"twitter": "error", "reddit": "deadline"}
+    assert result.posts_by_source == {"twitter": [{"id": 1}], "reddit": [{"id": 2}]}
+    assert seen == ["twitter", "reddit"]
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行多数据源并发抓取测试 =====")
+    test_sources_run_concurrently()
+    test_per_source_timeout_keeps_partial_batches()
+    test_global_deadline_and_errors()
+    logger.info("===== 所有多数据源并发抓取测试完成 =====")
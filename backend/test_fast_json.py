@@ -0,0 +1,74 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+
+from app.utils import fast_json
+from app.utils.fast_json import FastJSONResponse, dumps
+from app.utils.logger import logger
+
+PAYLOAD = [{
+    "title": "特斯拉 相关讨论",
+    "hot_score": 87.5,
+    "emotion_analysis": {"joy": 40, "neutral": 50, "anger": 10},
+    "top_mentions": [{"author": "alice", "likes": 3, "text": "emoji 🚀 and \"quotes\""}],
+    "missed_sources": [],
+    "degraded": False,
+    "extra": None,
+}]
+
+
+def _both_backends(check):
+    """分别用 orjson (如已安装) 和标准库 json 执行同一个检查"""
+    has_orjson = fast_json._HAS_ORJSON
+    try:
+        for backend in ([True, False] if has_orjson else [False]):
+            fast_json._HAS_ORJSON = backend
+            check()
+    finally:
+        fast_json._HAS_ORJSON = has_orjson
+
+
+def test_dumps_round_trips():
+    """序列化结果是紧凑的 UTF-8 JSON，反序列化后与原对象一致"""
+    logger.info("--- 测试 dumps 往返一致 ---")
+
+    def check():
+        body = dumps(PAYLOAD)
+        assert isinstance(body, bytes)
+        assert json.loads(body) == PAYLOAD
+        assert "特斯拉".encode("utf-8") in body, "中文不应被转义。"
+        assert b", " not in body and b": " not in body, "输出应为紧凑格式。"
+
+    _both_backends(check)
+
+
+def test_dumps_handles_non_json_values():
+    """非字符串键和无法直接序列化的值不会导致失败"""
+    logger.info("--- 测试非标准值 ---")
+
+    def check():
+        assert json.loads(dumps({1: "a"})) == {"1": "a"}
+        assert json.loads(dumps({"value": Decimal("1.5")})) == {"value": "1.5"}
+
+    _both_backends(check)
+
+
+def test_response_passes_bytes_through():
+    """已序列化的字节原样输出，其他对象用 dumps 序列化"""
+    logger.info("--- 测试 FastJSONResponse ---")
+    body = dumps(PAYLOAD)
+    assert FastJSONResponse(body).body == body
+    response = FastJSONResponse(PAYLOAD)
+    assert json.loads(response.body) == PAYLOAD
+    assert response.media_type == "application/json"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行快速 JSON 序列化测试 =====")
+    test_dumps_round_trips()
+    test_dumps_handles_non_json_values()
+    test_response_passes_bytes_through()
+    logger.info("===== 所有快速 JSON 序列化测试完成 =====")
@@ -0,0 +1,120 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.services.http_transport import HttpTransport
+from app.utils.logger import logger
+
+
+def _transport(handler, **kwargs) -> HttpTransport:
+    transport = HttpTransport(**kwargs)
+    transport._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return transport
+
+
+def test_get_json_reuses_one_client():
+    """多次请求复用同一个连接池，返回解析后的 JSON"""
+    logger.info("--- 测试连接池复用 ---")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(dict(request.url.params))
+        return httpx.Response(200, json={"users": [{"id": "1"}]})
+
+    async def run():
+        transport = _transport(handler)
+        client = transport._get_client()
+        try:
+            results = [
+                await transport.get_json("https://transport-pool.test/twitter/user/search", params={"query": q})
+                for q in ("tesla", "openai")
+            ]
+            assert transport._get_client() is client
+            return results
+        finally:
+            await transport.aclose()
+
+    results = asyncio.run(run())
+    assert results == [{"users": [{"id": "1"}]}] * 2
+    assert seen == [{"query": "tesla"}, {"query": "openai"}]
+
+
+def test_get_json_returns_empty_dict_on_failure():
+    """网络错误、非 200 状态码和无效 JSON 都记录日志并返回空字典"""
+    logger.info("--- 测试失败时返回空字典 ---")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/down":
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/missing":
+            return httpx.Response(404, text="not found")
+        return httpx.Response(200, text="<html>")
+
+    async def run():
+        transport = _transport(handler)
+        try:
+            return [
+                await transport.get_json(f"https://transport-failure-{path}.test/{path}")
+                for path in ("down", "missing", "html")
+            ]
+        finally:
+            await transport.aclose()
+
+    assert asyncio.run(run()) == [{}, {}, {}]
+
+
+def test_per_host_connection_cap():
+    """同一主机的并发请求数不超过 max_connections_per_host，不同主机互不影响"""
+    logger.info("--- 测试单主机并发上限 ---")
+    in_flight = {}
+    peak = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.02)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={})
+
+    async def run():
+        transport = _transport(handler, max_connections_per_host=2)
+        try:
+            await asyncio.gather(*(
+                transport.get(f"https://{host}/twitter/user/search")
+                for host in ("transport-cap-a.test", "transport-cap-b.test") for _ in range(5)
+            ))
+        finally:
+            await transport.aclose()
+
+    asyncio.run(run())
+    assert peak == {"transport-cap-a.test": 2, "transport-cap-b.test": 2}
+
+
+def test_aclose_allows_lazy_reopen():
+    """关闭后再次使用时重新创建连接池"""
+    logger.info("--- 测试关闭后重新创建连接池 ---")
+
+    async def run():
+        transport = HttpTransport(proxy=None)
+        first = transport._get_client()
+        await transport.aclose()
+        assert transport._client is None
+        second = transport._get_client()
+        await transport.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is not second and first.is_closed
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 HTTP 传输层测试 =====")
+    test_get_json_reuses_one_client()
+    test_get_json_returns_empty_dict_on_failure()
+    test_per_host_connection_cap()
+    test_aclose_allows_lazy_reopen()
+    logger.info("===== 所有 HTTP 传输层测试完成 =====")
@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.data.models.database import Base
+from app.services import incremental_collector as collector_module
+from app.services.incremental_collector import IncrementalCollector
+from app.utils.logger import logger
+
+
+def _use_temp_database():
+    """每个测试使用独立的临时 SQLite 数据库"""
+    path = os.path.join(tempfile.mkdtemp(), "incremental.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    collector_module.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _tweet(tweet_id: int, likes: int = 1, retweets: int = 0, followers: int = 0):
+    return {
+        "platform": "twitter",
+        "id": str(tweet_id),
+        "author": f"user{tweet_id}",
+        "text": f"post number {tweet_id}",
+        "url": f"https://twitter.com/user{tweet_id}/status/{tweet_id}",
+        "likes": likes,
+        "retweets": retweets,
+        "created_at": f"2026-01-01T00:00:{tweet_id:02d}",
+        "user_info": {"followers": followers},
+    }
+
+
+def _stream(posts, seen_since_ids):
+    async def stream(since_id=None):
+        seen_since_ids.append(since_id)
+        yield posts
+    return stream
+
+
+async def _collect(collector, posts, seen_since_ids):
+    batches = []
+    async for batch in collector.iter_posts("twitter", "tesla", _stream(posts, seen_since_ids)):
+        batches.append(batch)
+    return batches
+
+
+def test_only_newer_posts_are_collected():
+    """第二次收集从水位线开始，只产出更新的帖子，再合并已存储的帖子"""
+    logger.info("--- 测试水位线增量收集 ---")
+    _use_temp_database()
+    collector = IncrementalCollector(merge_limit=50)
+    since_ids = []
+
+    first = asyncio.run(_collect(collector, [_tweet(1), _tweet(2)], since_ids))
+    assert [len(batch) for batch in first] == [2]
+
+    second = asyncio.run(_collect(collector, [_tweet(1), _tweet(2), _tweet(3)], since_ids))
+    assert since_ids == [None, "2"], f"第二次应从水位线 2 开始: {since_ids}"
+    assert [post["id"] for post in second[0]] == ["3"], "只应产出比水位线更新的帖子。"
+    assert sorted(post["id"] for post in second[1]) == ["1", "2"], "已存储的帖子应被合并返回。"
+
+
+def test_stored_posts_keep_engagement_fields():
+    """已存储的帖子返回与新抓取时相同的 id、转发数和粉丝数"""
+    logger.info("--- 测试已存储帖子的互动数据 ---")
+    _use_temp_database()
+    collector = IncrementalCollector(merge_limit=50)
+    fresh = _tweet(7, likes=12, retweets=340, followers=98000)
+    asyncio.run(_collect(collector, [fresh], []))
+
+    stored = collector._load_stored_posts("twitter", "tesla", set())
+    assert len(stored) == 1
+    post = stored[0]
+    assert post["id"] == "7"
+    assert post["likes"] == 12
+    assert post["retweets"] == 340
+    assert post["user_info"]["followers"] == 98000
+
+
+def test_engagement_is_refreshed_on_recollection():
+    """同一条帖子再次被收集时，互动数据更新为最新值"""
+    logger.info("--- 测试互动数据刷新 ---")
+    _use_temp_database()
+    collector = IncrementalCollector(merge_limit=50)
+    collector._store_batch("twitter", "tesla", [_tweet(5, likes=1, retweets=2, followers=3)])
+    collector._store_batch("twitter", "tesla", [_tweet(5, likes=10, retweets=20, followers=30)])
+
+    post = collector._load_stored_posts("twitter", "tesla", set())[0]
+    assert (post["likes"], post["retweets"], post["user_info"]["followers"]) == (10, 20, 30)
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行增量收集测试 =====")
+    test_only_newer_posts_are_collected()
+    test_stored_posts_keep_engagement_fields()
+    test_engagement_is_refreshed_on_recollection()
+    logger.info("===== 所有增量收集测试完成 =====")
@@ -0,0 +1,120 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.services.http_transport import HttpTransport
+from app.services.response_cache import ResponseCache
+from app.utils import json_stream
+from app.utils.json_stream import JsonProjection
+from app.utils.logger import logger
+
+PROJECTION = JsonProjection(
+    arrays={"data.tweets": ("id", "text", "author.userName")},
+    scalars=("status", "next_cursor"),
+)
+PAYLOAD = {
+    "status": "success",
+    "next_cursor": "abc",
+    "extra": {"large": "x" * 100},
+    "data": {"tweets": [
+        {"id": "1", "text": "hello", "author": {"userName": "alice", "bio": "..."}, "views": 10},
+        {"id": "2", "text": "world", "author": {"userName": "bob"}, "entities": {"urls": []}},
+        "not an object",
+    ]},
+}
+EXPECTED = {
+    "status": "success",
+    "next_cursor": "abc",
+    "data": {"tweets": [
+        {"id": "1", "text": "hello", "author": {"userName": "alice"}},
+        {"id": "2", "text": "world", "author": {"userName": "bob"}},
+    ]},
+}
+
+
+async def _chunks(body: bytes, size: int = 7):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def test_project_keeps_only_listed_fields():
+    """裁剪已解析的对象，保持原有嵌套结构"""
+    logger.info("--- 测试字段投影 ---")
+    assert PROJECTION.project(PAYLOAD) == EXPECTED
+    assert PROJECTION.project(["not", "a", "dict"]) == {}
+
+
+def test_parse_stream_matches_project():
+    """按小块喂入字节流的解析结果与整体解析后裁剪一致 (安装与未安装 ijson 两条路径)"""
+    logger.info("--- 测试流式解析 ---")
+    body = json.dumps(PAYLOAD).encode("utf-8")
+    assert asyncio.run(PROJECTION.parse_stream(_chunks(body))) == EXPECTED
+
+    has_ijson = json_stream._HAS_IJSON
+    json_stream._HAS_IJSON = False
+    try:
+        assert asyncio.run(PROJECTION.parse_stream(_chunks(body))) == EXPECTED
+    finally:
+        json_stream._HAS_IJSON = has_ijson
+
+    try:
+        asyncio.run(PROJECTION.parse_stream(_chunks(b'{"status": "succ')))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不完整的 JSON 应抛出 ValueError。")
+
+
+def test_cache_key_includes_projection():
+    """同一请求的完整响应和裁剪后的响应使用不同的缓存 key"""
+    logger.info("--- 测试缓存 key 区分投影 ---")
+    url = "https://api.example.com/twitter/user/search"
+    plain = ResponseCache.make_key(url, {"query": "Tesla "})
+    projected = ResponseCache.make_key(url, {"query": "tesla"}, PROJECTION)
+    assert plain == ResponseCache.make_key(url, {"query": "tesla"})
+    assert projected != plain
+    assert projected == ResponseCache.make_key(url, {"query": "TESLA"}, JsonProjection(
+        arrays={"data.tweets": ("id", "text", "author.userName")}, scalars=("next_cursor", "status"),
+    ))
+
+
+def test_projected_and_full_callers_do_not_share_cache_entries():
+    """先以投影方式请求并缓存后，不带投影的调用方仍拿到完整响应"""
+    logger.info("--- 测试投影缓存不污染完整响应 ---")
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url)
+        return httpx.Response(200, json=PAYLOAD)
+
+    async def run():
+        cache = ResponseCache(endpoint_ttls={"/twitter/user/search": 3600}, max_bytes=1024 * 1024)
+        transport = HttpTransport(response_cache=cache)
+        transport._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        url = "https://json-stream.test/twitter/user/search"
+        try:
+            projected = await transport.get_json(url, params={"query": "tesla"}, projection=PROJECTION)
+            full = await transport.get_json(url, params={"query": "tesla"})
+            projected_again = await transport.get_json(url, params={"query": "tesla"}, projection=PROJECTION)
+            full_again = await transport.get_json(url, params={"query": "tesla"})
+        finally:
+            await transport.aclose()
+        return projected, full, projected_again, full_again
+
+    projected, full, projected_again, full_again = asyncio.run(run())
+    assert projected == projected_again == EXPECTED
+    assert full == full_again == PAYLOAD, "不带投影的调用方不应读到裁剪后的响应。"
+    assert len(calls) == 2, f"每种形式各请求一次上游，之后命中缓存: {len(calls)}"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行流式 JSON 解析测试 =====")
+    test_project_keeps_only_listed_fields()
+    test_parse_stream_matches_project()
+    test_cache_key_includes_projection()
+    test_projected_and_full_callers_do_not_share_cache_entries()
+    logger.info("===== 所有流式 JSON 解析测试完成 =====")
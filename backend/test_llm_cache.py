@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.data.models.database import Base, RawPost
+from app.services import llm_cache as llm_cache_module
+from app.services.llm_cache import LLMInsightCache
+from app.services.llm_service import ZhipuAIProvider
+from app.utils.logger import logger
+
+RESULT = {"title": "测试话题", "summary": "summary", "category": "热门讨论"}
+
+
+def _use_temp_database():
+    """每个测试使用独立的临时 SQLite 数据库"""
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    llm_cache_module.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_fingerprint_ignores_case_whitespace_and_order():
+    """样本文本的大小写、多余空白和顺序不影响指纹；模型和提示词版本影响指纹"""
+    logger.info("--- 测试样本指纹 ---")
+    base = LLMInsightCache.fingerprint("glm-4", "v1", ["Tesla  Model Y", "battery"])
+    assert base == LLMInsightCache.fingerprint("glm-4", "v1", ["battery", " tesla model y"])
+    assert base != LLMInsightCache.fingerprint("glm-4-flash", "v1", ["battery", "tesla model y"])
+    assert base != LLMInsightCache.fingerprint("glm-4", "v2", ["battery", "tesla model y"])
+
+
+def test_store_hit_and_expiry():
+    """命中时返回原结果并累计节省的 token；超过 ttl 后不再命中"""
+    logger.info("--- 测试命中与过期 ---")
+    _use_temp_database()
+    cache = LLMInsightCache(ttl=1, max_entries=10)
+    cache.set("fp", "glm-4", "v1", RESULT, prompt_tokens=100, completion_tokens=20)
+
+    assert cache.get("fp") == RESULT
+    assert cache.counters["saved_prompt_tokens"] == 100 and cache.counters["saved_completion_tokens"] == 20
+    time.sleep(1.05)
+    assert cache.get("fp") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_eviction_and_prompt_version_cleanup():
+    """超出条目上限时淘汰最久未命中的条目；写入新提示词版本时清理旧版本"""
+    logger.info("--- 测试淘汰与提示词版本清理 ---")
+    _use_temp_database()
+    cache = LLMInsightCache(ttl=600, max_entries=2)
+    cache.set("a", "glm-4", "v1", RESULT)
+    time.sleep(0.01)
+    cache.set("b", "glm-4", "v1", RESULT)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.set("c", "glm-4", "v1", RESULT)
+    assert cache.get("b") is None, "最久未命中的条目应被淘汰。"
+    assert cache.get("a") == RESULT and cache.get("c") == RESULT
+
+    cache.set("d", "glm-4", "v2", RESULT)
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.get("d") == RESULT
+    assert cache.invalidate("v2") == 1
+
+
+def test_provider_skips_llm_call_on_cache_hit():
+    """同一批帖子再次分析时直接复用缓存结果，不再调用 LLM"""
+    logger.info("--- 测试 provider 复用缓存 ---")
+    _use_temp_database()
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": json.dumps(RESULT, ensure_ascii=False)}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+        })
+
+    posts = [
+        RawPost(platform="twitter", author=f"user{i}", text=f"post {i} about batteries", url=f"https://x.com/{i}", likes=i)
+        for i in range(5)
+    ]
+    cache = LLMInsightCache(ttl=600, max_entries=10)
+
+    async def run():
+        provider = ZhipuAIProvider(api_key="test-key-0000", cache=cache, model="glm-test-cache")
+        provider._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            first = await provider.agenerate_insights_for_cluster(posts)
+            second = await provider.agenerate_insights_for_cluster(list(reversed(posts)))
+        finally:
+            await provider.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert calls == 1
+    assert first["title"] == second["title"] == "测试话题"
+    assert cache.counters["hits"] == 1 and cache.counters["saved_prompt_tokens"] == 100
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 LLM 洞察缓存测试 =====")
+    test_fingerprint_ignores_case_whitespace_and_order()
+    test_store_hit_and_expiry()
+    test_eviction_and_prompt_version_cleanup()
+    test_provider_skips_llm_call_on_cache_hit()
+    logger.info("===== 所有 LLM 洞察缓存测试完成 =====")
@@ -0,0 +1,109 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.core.config import settings
+from app.data.models.database import RawPost
+from app.services import llm_service
+from app.services.llm_service import ZhipuAIProvider
+from app.utils.logger import logger
+
+INSIGHT = {
+    "title": "测试话题",
+    "summary": "summary",
+    "hot_score": 50,
+    "category": "热门讨论",
+    "insights": {"pain_points": [], "opportunities": [], "mvp_plan": {}},
+    "emotion_analysis": {"joy": 50, "neutral": 50, "anger": 0, "sadness": 0, "sarcasm": 0},
+}
+
+
+def _posts(count: int = 5):
+    return [
+        RawPost(platform="twitter", author=f"user{i}", text=f"post {i} about electric cars and batteries",
+                url=f"https://x.com/{i}", likes=i)
+        for i in range(count)
+    ]
+
+
+def _provider(model: str, handler) -> ZhipuAIProvider:
+    provider = ZhipuAIProvider(api_key="test-key-0000", model=model)
+    provider._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return provider
+
+
+def _completion() -> httpx.Response:
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": json.dumps(INSIGHT, ensure_ascii=False)}}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+    })
+
+
+def test_async_generation_parses_the_completion():
+    """异步路径直接调用 GLM HTTP 接口并解析 JSON 结果"""
+    logger.info("--- 测试异步生成 ---")
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return _completion()
+
+    async def run():
+        provider = _provider("glm-test-parse", handler)
+        try:
+            return await provider.agenerate_insights_for_cluster(_posts())
+        finally:
+            await provider.aclose()
+
+    result = asyncio.run(run())
+    assert result["title"] == "测试话题"
+    assert len(result["top_mentions"]) > 0
+    assert requests[0]["model"] == "glm-test-parse"
+
+
+def test_concurrency_cap_is_shared_across_providers():
+    """路由器为每个模型创建一个 provider，它们共享同一个进程级并发上限；换一个事件循环后仍然可用"""
+    logger.info("--- 测试共享的 LLM 并发上限 ---")
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return _completion()
+
+    async def run():
+        providers = [_provider("glm-test-a", handler), _provider("glm-test-b", handler)]
+        try:
+            await asyncio.gather(*(
+                provider._post_chat_completion("prompt") for provider in providers for _ in range(4)
+            ))
+        finally:
+            for provider in providers:
+                await provider.aclose()
+
+    original = settings.LLM_MAX_CONCURRENCY
+    settings.LLM_MAX_CONCURRENCY = 2
+    llm_service._llm_slots = None
+    try:
+        # 两次 asyncio.run 使用不同的事件循环，信号量在各自的循环里有竞争地等待
+        for _ in range(2):
+            peak = 0
+            asyncio.run(run())
+            assert peak == 2, f"两个 provider 合计的在途请求数应不超过 2: {peak}"
+    finally:
+        settings.LLM_MAX_CONCURRENCY = original
+        llm_service._llm_slots = None
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 LLM provider 测试 =====")
+    test_async_generation_parses_the_completion()
+    test_concurrency_cap_is_shared_across_providers()
+    logger.info("===== 所有 LLM provider 测试完成 =====")
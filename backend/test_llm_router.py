@@ -0,0 +1,162 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import Settings, settings
+from app.services.llm_service import LLMProvider, LLMRouter, ZhipuAIProvider
+from app.utils.logger import logger
+
+
+class _FakeProvider(LLMProvider):
+    """按给定延迟返回固定结果的模型；fail=True 时返回错误结果"""
+
+    def __init__(self, model: str, delay: float = 0.0, fail: bool = False, rounds: int = 1):
+        self.model = model
+        self.delay = delay
+        self.fail = fail
+        self.rounds = rounds
+        self.calls = 0
+
+    def round_trips(self, cluster_posts):
+        return self.rounds
+
+    def generate_insights_for_cluster(self, cluster_posts):
+        self.calls += 1
+        return self._error_result("boom") if self.fail else {"title": self.model, "category": "热门讨论"}
+
+    async def agenerate_insights_for_cluster(self, cluster_posts, tier=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self._error_result("boom") if self.fail else {"title": self.model, "category": "热门讨论"}
+
+
+def test_latency_budget_serves_degraded_fallback():
+    """超过延迟预算仍无模型结果时返回降级的本地结果，模型调用在后台完成"""
+    logger.info("--- 测试延迟预算降级 ---")
+    slow = _FakeProvider("glm-4", delay=0.2)
+    router = LLMRouter({"quality": [("glm-4", slow)]}, fallback=_FakeProvider("local"), latency_budget=0.05)
+
+    async def run():
+        result = await router.agenerate_insights_for_cluster([])
+        assert router.stats()["background_in_flight"] == 1
+        await asyncio.sleep(0.3)
+        return result
+
+    result = asyncio.run(run())
+    assert result["model"] == "local" and result["degraded"] is True
+    assert router.counters["degraded"] == 1
+    assert router.counters["background_completed"] == 1
+    assert router.stats()["background_in_flight"] == 0
+
+
+def test_latency_budget_returns_fast_model_answer():
+    """预算内返回的模型结果原样返回，不降级"""
+    logger.info("--- 测试预算内的模型结果 ---")
+    router = LLMRouter(
+        {"quality": [("glm-4", _FakeProvider("glm-4", delay=0.01))]},
+        fallback=_FakeProvider("local"),
+        latency_budget=1.0,
+    )
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "glm-4" and "degraded" not in result
+
+
+def test_latency_budget_is_off_by_default():
+    """默认不设延迟预算：慢模型的结果也会等到，而不是降级"""
+    logger.info("--- 测试默认关闭延迟预算 ---")
+    assert Settings.model_fields["LLM_LATENCY_BUDGET_SECONDS"].default == 0
+    router = LLMRouter({"quality": [("glm-4", _FakeProvider("glm-4", delay=0.1))]}, fallback=_FakeProvider("local"))
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "glm-4"
+    assert router.counters["degraded"] == 0
+
+
+def test_fails_over_on_error_result():
+    """模型返回错误结果时换下一个路由，并记入该路由的错误率"""
+    logger.info("--- 测试错误结果故障转移 ---")
+    broken = _FakeProvider("glm-4", fail=True)
+    backup = _FakeProvider("glm-4-air")
+    router = LLMRouter({"quality": [("glm-4", broken), ("glm-4-air", backup)]}, fallback=_FakeProvider("local"))
+
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "glm-4-air" and "degraded" not in result
+    assert broken.calls == 1 and backup.calls == 1
+    assert router.counters["failovers"] == 1
+    assert router.health["glm-4"].failures == 1
+    assert [name for name, _ in router._plan("quality")] == ["glm-4-air", "glm-4", "local"], "出错的路由应排到后面。"
+
+
+def test_fails_over_on_attempt_timeout():
+    """单次尝试超过 attempt_timeout 时换下一个路由；请求的档位优先，其次是其他档位"""
+    logger.info("--- 测试超时故障转移 ---")
+    router = LLMRouter(
+        {
+            "fast": [("glm-4-flash", _FakeProvider("glm-4-flash", delay=0.5))],
+            "quality": [("glm-4", _FakeProvider("glm-4", delay=0.01))],
+        },
+        fallback=_FakeProvider("local"),
+        attempt_timeout=0.05,
+    )
+    result = asyncio.run(router.agenerate_insights_for_cluster([], tier="fast"))
+    assert result["model"] == "glm-4"
+    assert router.health["glm-4-flash"].timeouts == 1
+
+
+def test_deadline_goes_straight_to_fallback():
+    """请求整体超过 deadline 后跳过剩余路由，只尝试本地兜底，结果标记为降级"""
+    logger.info("--- 测试整体截止时间 ---")
+    first = _FakeProvider("glm-4", delay=0.5)
+    second = _FakeProvider("glm-4-air")
+    router = LLMRouter(
+        {"quality": [("glm-4", first), ("glm-4-air", second)]},
+        fallback=_FakeProvider("local"),
+        attempt_timeout=1.0,
+        deadline=0.05,
+    )
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "local" and result["degraded"] is True
+    assert second.calls == 0
+    assert router.counters["deadline_exceeded"] == 1 and router.counters["fallbacks"] == 1
+
+
+def test_attempt_timeout_scales_with_round_trips():
+    """map-reduce 这类多轮调用按轮数放宽单次尝试超时和整体截止时间，不会被当成超时而故障转移"""
+    logger.info("--- 测试按调用轮数放宽超时 ---")
+    options = dict(fallback=_FakeProvider("local"), attempt_timeout=0.1, deadline=0.15)
+    router = LLMRouter({"quality": [("glm-4", _FakeProvider("glm-4", delay=0.25, rounds=3))]}, **options)
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "glm-4" and router.health["glm-4"].timeouts == 0
+
+    router = LLMRouter({"quality": [("glm-4", _FakeProvider("glm-4", delay=0.25))]}, **options)
+    result = asyncio.run(router.agenerate_insights_for_cluster([]))
+    assert result["model"] == "local" and router.health["glm-4"].timeouts == 1
+
+
+def test_map_reduce_round_trips():
+    """map-reduce 请求的轮数 = map 波数 + 1 次 reduce；帖子较少时只有 1 轮"""
+    logger.info("--- 测试 map-reduce 调用轮数 ---")
+    assert Settings.model_fields["LLM_ATTEMPT_TIMEOUT_SECONDS"].default > 30
+    provider = ZhipuAIProvider(api_key="test-key-0000", model="glm-test-rounds")
+    names = ("LLM_MAP_REDUCE_MIN_POSTS", "LLM_MAP_MAX_CHUNKS", "LLM_MAP_CONCURRENCY")
+    original = {name: getattr(settings, name) for name in names}
+    settings.LLM_MAP_REDUCE_MIN_POSTS, settings.LLM_MAP_MAX_CHUNKS, settings.LLM_MAP_CONCURRENCY = 10, 16, 4
+    try:
+        assert provider.round_trips([None] * 5) == 1
+        assert provider.round_trips([None] * 10) == 4 + 1
+    finally:
+        for name, value in original.items():
+            setattr(settings, name, value)
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 LLM 路由测试 =====")
+    test_latency_budget_serves_degraded_fallback()
+    test_latency_budget_returns_fast_model_answer()
+    test_latency_budget_is_off_by_default()
+    test_fails_over_on_error_result()
+    test_fails_over_on_attempt_timeout()
+    test_deadline_goes_straight_to_fallback()
+    test_attempt_timeout_scales_with_round_trips()
+    test_map_reduce_round_trips()
+    logger.info("===== 所有 LLM 路由测试完成 =====")
@@ -0,0 +1,153 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.core.config import settings
+from app.data.models.database import RawPost
+from app.services.llm_service import ZhipuAIProvider
+from app.utils.logger import logger
+
+INSIGHT = {
+    "title": "测试话题",
+    "summary": "summary",
+    "hot_score": 50,
+    "category": "热门讨论",
+    "insights": {"pain_points": [], "opportunities": [], "mvp_plan": {}},
+    "emotion_analysis": {"joy": 50, "neutral": 50, "anger": 0, "sadness": 0, "sarcasm": 0},
+}
+SUMMARY = {"summary": "chunk", "pain_points": ["range"], "opportunities": [], "hot_score": 40}
+MAP_SETTINGS = {
+    "LLM_MAP_REDUCE_ENABLED": True,
+    "LLM_MAP_REDUCE_MIN_POSTS": 10,
+    "LLM_MAP_MAX_CHUNKS": 4,
+    "LLM_MAP_CHUNK_MAX_POSTS": 5,
+    "LLM_MAP_CONCURRENCY": 2,
+}
+
+
+def _posts(count: int):
+    return [
+        RawPost(platform="twitter", author=f"user{i}", text=f"post {i} about electric cars, charging and battery range",
+                url=f"https://x.com/{i}", likes=i)
+        for i in range(count)
+    ]
+
+
+def _completion(content: dict, prompt_tokens: int = 100) -> httpx.Response:
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": json.dumps(content, ensure_ascii=False)}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 10},
+    })
+
+
+class _Upstream:
+    """区分 map 与 reduce 提示词的 GLM 接口；fail_maps 指定前几个 map 调用返回 500"""
+
+    def __init__(self, fail_maps: int = 0):
+        self.fail_maps = fail_maps
+        self.maps = 0
+        self.reduce_prompts = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        if "分块摘要" in prompt:
+            self.reduce_prompts.append(prompt)
+            return _completion(INSIGHT, prompt_tokens=50)
+        self.maps += 1
+        index = self.maps
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if index <= self.fail_maps:
+            return httpx.Response(500)
+        return _completion(SUMMARY)
+
+
+def _run(upstream: _Upstream, model: str, posts):
+    original = {name: getattr(settings, name) for name in MAP_SETTINGS}
+    for name, value in MAP_SETTINGS.items():
+        setattr(settings, name, value)
+
+    async def run():
+        provider = ZhipuAIProvider(api_key="test-key-0000", model=model)
+        provider._http_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+        try:
+            return await provider.agenerate_insights_for_cluster(posts), provider
+        finally:
+            await provider.aclose()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        for name, value in original.items():
+            setattr(settings, name, value)
+
+
+def test_map_reduce_summarizes_chunks_in_parallel():
+    """帖子较多时分块并行提炼，再用一次 reduce 调用汇总；map 并发不超过 LLM_MAP_CONCURRENCY"""
+    logger.info("--- 测试 map-reduce ---")
+    upstream = _Upstream()
+    result, provider = _run(upstream, "glm-test-map-reduce", _posts(20))
+
+    assert result["title"] == "测试话题"
+    assert upstream.maps == 4 and len(upstream.reduce_prompts) == 1
+    assert upstream.peak <= 2
+    assert "共 20 条社交媒体帖子" in upstream.reduce_prompts[0]
+    assert provider.map_reduce["runs"] == 1 and provider.map_reduce["chunks"] == 4
+
+
+def test_failed_chunks_are_left_out():
+    """个别分块失败时用其余分块的摘要继续；全部失败时返回错误结果"""
+    logger.info("--- 测试分块失败 ---")
+    upstream = _Upstream(fail_maps=1)
+    result, provider = _run(upstream, "glm-test-map-partial", _posts(20))
+    assert result["title"] == "测试话题"
+    assert provider.map_reduce["failed_chunks"] == 1
+    assert upstream.reduce_prompts[0].count("条帖子) {") == 3
+
+    upstream = _Upstream(fail_maps=4)
+    result, provider = _run(upstream, "glm-test-map-failed", _posts(20))
+    assert provider.is_error_result(result)
+    assert upstream.reduce_prompts == []
+
+
+def test_small_clusters_use_a_single_call():
+    """帖子数少于 LLM_MAP_REDUCE_MIN_POSTS 时不分块，只调用一次"""
+    logger.info("--- 测试小批量单次调用 ---")
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return _completion(INSIGHT)
+
+    result, provider = _run(handler, "glm-test-map-single", _posts(5))
+    assert result["title"] == "测试话题" and calls == 1
+    assert provider.map_reduce["runs"] == 0
+
+
+def test_map_step_reports_one_breaker_outcome():
+    """整个 map 步骤只向熔断器报告一次结果：多个分块失败不会让一次请求独自打开熔断器"""
+    logger.info("--- 测试 map 步骤的熔断器计数 ---")
+    _, provider = _run(_Upstream(fail_maps=3), "glm-test-map-breaker-partial", _posts(20))
+    assert provider.breaker.stats()["consecutive_failures"] == 0
+
+    _, provider = _run(_Upstream(fail_maps=4), "glm-test-map-breaker-failed", _posts(20))
+    assert provider.breaker.stats()["consecutive_failures"] == 1
+    assert provider.breaker.stats()["state"] == "closed"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 map-reduce 摘要测试 =====")
+    test_map_reduce_summarizes_chunks_in_parallel()
+    test_failed_chunks_are_left_out()
+    test_small_clusters_use_a_single_call()
+    test_map_step_reports_one_breaker_outcome()
+    logger.info("===== 所有 map-reduce 摘要测试完成 =====")
@@ -0,0 +1,123 @@
+import sys
+import os
+from collections import namedtuple
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.data.processors.prompt_packing import PromptPacker, estimate_tokens, trim_to_tokens
+from app.data.processors.ranking import post_engagement
+from app.utils.logger import logger
+
+Post = namedtuple("Post", "text likes author")
+
+LONG = "battery range charging network software update autopilot " * 20
+
+
+def _used(packer: PromptPacker, packed) -> int:
+    """装入的帖子 token 合计，含每条的固定开销"""
+    return sum(estimate_tokens(body) + packer.per_post_overhead for body in packed)
+
+
+def test_estimate_and_trim_tokens():
+    """汉字约 0.6 token，拉丁词约每 4 个字符 1 token；截断只发生在词/字边界"""
+    logger.info("--- 测试 token 估算与截断 ---")
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("特斯拉电池") == 3
+    assert estimate_tokens("battery range!") == 2 + 2 + 1
+    trimmed = trim_to_tokens("battery range charging network", 5)
+    assert trimmed == "battery range…" and estimate_tokens(trimmed) == 5
+    assert trim_to_tokens("short", 10) == "short"
+
+
+def test_pack_fits_budget_and_keeps_short_posts():
+    """装入的帖子合计不超过预算；短帖子保持原文，长帖子被截断"""
+    logger.info("--- 测试预算装填 ---")
+    packer = PromptPacker(token_budget=400, min_post_tokens=40, max_post_tokens=100, per_post_overhead=2)
+    posts = [Post(f"{LONG} #{i}", 100 - i, f"user{i}") for i in range(10)]
+    packed = packer.pack(posts, template_tokens=100)
+
+    assert 0 < len(packed) < len(posts)
+    assert _used(packer, packed) <= 300
+    assert all(estimate_tokens(body) <= packer.max_post_tokens for body in packed)
+    assert all(body.endswith("…") for body in packed if body.startswith("battery"))
+
+    short = packer.pack([Post("short  post\nhere", 1, "x")], template_tokens=100)
+    assert short == ["short post here"]
+    assert packer.pack(posts, template_tokens=400) == []
+
+
+def test_rank_demotes_near_duplicates_and_repeat_authors():
+    """与已选帖子内容相似、或来自同一作者的帖子排到后面"""
+    logger.info("--- 测试多样性排序 ---")
+    packer = PromptPacker(token_budget=10_000)
+    posts = [
+        Post("tesla cuts model y prices again in europe", 100, "a"),
+        Post("tesla cuts model y prices again in europe!", 90, "b"),
+        Post("charging queues are getting worse at superchargers", 50, "c"),
+        Post("my second post about the software update today", 80, "a"),
+        Post("new software update brings better range estimates", 40, "d"),
+    ]
+    order = [post.author for post in packer.rank(posts, lambda p: p.text, lambda p: p.likes, lambda p: p.author)]
+    assert order[0] == "a"
+    assert order.index("b") > order.index("c"), "近似重复的帖子应排在不同内容之后。"
+    assert order.index("a", 1) > order.index("c"), "同一作者的第二条帖子应降权。"
+
+
+def test_pack_chunks_balances_and_caps():
+    """分块后每块都在预算内且负载均衡；超过 max_chunks 的部分丢弃互动量最低的帖子"""
+    logger.info("--- 测试分块装填 ---")
+    packer = PromptPacker(token_budget=300, min_post_tokens=10, max_post_tokens=60, max_posts=5, per_post_overhead=2)
+    posts = [Post(f"post number {i} " + "word " * 30, i, f"user{i}") for i in range(40)]
+
+    chunks = packer.pack_chunks(posts, template_tokens=50, max_chunks=4)
+    assert len(chunks) == 4
+    assert all(len(chunk) <= 5 for chunk in chunks)
+    assert max(len(chunk) for chunk in chunks) - min(len(chunk) for chunk in chunks) <= 1
+    for chunk in chunks:
+        assert _used(packer, chunk) <= 250
+
+    kept = {int(body.split()[2]) for chunk in chunks for body in chunk}
+    assert kept == set(range(20, 40)), "应保留互动量最高的帖子。"
+    assert packer.stats()["chunks"] == 4
+
+
+def test_min_post_floor_never_exceeds_budget():
+    """统一上限会低于 min_post_tokens 时去掉排在最后的帖子，装入的 token 合计始终不超过预算"""
+    logger.info("--- 测试最小条长不突破预算 ---")
+    # 前几条短帖子几乎占满预算，后面的长帖子只能分到很少的 token
+    posts = [Post("tesla " * 18, 100 - i, f"short{i}") for i in range(4)]
+    posts += [Post(f"{LONG} #{i}", 50 - i, f"long{i}") for i in range(6)]
+    for budget in (150, 200, 260, 400):
+        packer = PromptPacker(token_budget=budget, min_post_tokens=30, max_post_tokens=100, per_post_overhead=2)
+        packed = packer.pack(posts, template_tokens=20)
+        assert packed, budget
+        assert _used(packer, packed) <= budget - 20, f"预算 {budget}: {_used(packer, packed)}"
+
+        chunks = packer.pack_chunks(posts, template_tokens=20, max_chunks=2, max_posts_per_chunk=8)
+        assert all(_used(packer, chunk) <= budget - 20 for chunk in chunks), budget
+
+
+def test_ranks_by_engagement_not_likes_only():
+    """传入共享的 post_engagement 时转发和粉丝数同样计入排序"""
+    logger.info("--- 测试按互动量排序 ---")
+
+    class _Post:
+        def __init__(self, text, likes, retweets, followers):
+            self.text, self.likes, self.retweets, self.followers = text, likes, retweets, followers
+            self.author = text
+
+    viral = _Post("widely shared launch thread", 10, 5000, 100000)
+    liked = _Post("quiet post with some likes", 50, 0, 0)
+    packer = PromptPacker(token_budget=1000, max_posts=1)
+    assert packer.pack([liked, viral], template_tokens=0) == ["quiet post with some likes"]
+    assert packer.pack([liked, viral], template_tokens=0, engagement=post_engagement) == ["widely shared launch thread"]
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行提示词装填测试 =====")
+    test_estimate_and_trim_tokens()
+    test_pack_fits_budget_and_keeps_short_posts()
+    test_rank_demotes_near_duplicates_and_repeat_authors()
+    test_pack_chunks_balances_and_caps()
+    test_min_post_floor_never_exceeds_budget()
+    test_ranks_by_engagement_not_likes_only()
+    logger.info("===== 所有提示词装填测试完成 =====")
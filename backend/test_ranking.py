@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.data.models.database import RawPost
+from app.data.processors.ranking import MentionRanker, engagement_score, post_engagement
+from app.utils.logger import logger
+
+
+def _post(text: str, likes: int = 0, retweets: int = 0, followers: int = 0, author: str = "user") -> RawPost:
+    post = RawPost(platform="twitter", author=author, text=text, url=f"https://x.com/{author}/{likes}", likes=likes)
+    post.retweets = retweets
+    post.followers = followers
+    return post
+
+
+def test_engagement_score_weights():
+    """转发权重高于点赞，粉丝数只做弱加成；缺失或负值按 0 计"""
+    logger.info("--- 测试互动量得分 ---")
+    assert engagement_score() == 0
+    assert engagement_score(likes=None, retweets=-5) == 0
+    assert engagement_score(retweets=100) > engagement_score(likes=100) > engagement_score(followers=100)
+    assert post_engagement(_post("x", likes=10, retweets=2)) == engagement_score(10, 2, 0)
+    assert post_engagement(RawPost(text="x", likes=10)) == engagement_score(10)
+
+
+def test_select_prefers_engagement_but_skips_duplicates():
+    """按互动量选帖子，但几乎相同的帖子不会同时入选"""
+    logger.info("--- 测试 MMR 多样性选择 ---")
+    posts = [
+        _post("tesla cuts model y prices again in europe today", likes=1000, author="a"),
+        _post("tesla cuts model y prices again in europe today!!", likes=900, author="b"),
+        _post("charging queues are getting worse at superchargers", likes=500, author="c"),
+        _post("new software update brings better range estimates", likes=300, author="d"),
+        _post("someone posted a picture of their car", likes=1, author="e"),
+    ]
+    selected = MentionRanker(k=3).select(posts)
+    assert [post.author for post in selected] == ["a", "c", "d"]
+
+    # diversity=1 时只看互动量
+    assert [post.author for post in MentionRanker(k=2, diversity=1.0).select(posts)] == ["a", "b"]
+    assert MentionRanker(k=3).select([]) == []
+
+
+def test_top_mentions_batches_sentiment():
+    """对选中的帖子一次性批量计算情感，并返回接口使用的结构"""
+    logger.info("--- 测试 top_mentions ---")
+    calls = []
+
+    def sentiment(texts):
+        calls.append(list(texts))
+        return ["positive" if "love" in text else "negative" for text in texts]
+
+    posts = [
+        _post("i love the new update", likes=50, retweets=3, author="a"),
+        _post("the app keeps crashing on startup", likes=40, author="b"),
+    ]
+    ranker = MentionRanker(k=3, sentiment=sentiment)
+    mentions = ranker.top_mentions(posts)
+
+    assert len(calls) == 1 and len(calls[0]) == 2
+    assert [mention["sentiment"] for mention in mentions] == ["Positive", "Negative"]
+    assert mentions[0]["retweets"] == 3 and mentions[0]["author"] == "a"
+    assert MentionRanker(k=1).top_mentions(posts)[0]["sentiment"] == "Neutral"
+    assert ranker.stats() == {"rankings": 1, "posts_considered": 2, "posts_selected": 2}
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行代表性帖子排序测试 =====")
+    test_engagement_score_weights()
+    test_select_prefers_engagement_but_skips_duplicates()
+    test_top_mentions_batches_sentiment()
+    logger.info("===== 所有代表性帖子排序测试完成 =====")
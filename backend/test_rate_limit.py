@@ -0,0 +1,120 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.logger import logger
+from app.utils.rate_limit import AdaptiveConcurrencyLimiter, TokenBucket, UpstreamLimiter
+
+
+def _limiter(rate: float = 100.0, capacity: float = 100.0, initial: int = 8) -> UpstreamLimiter:
+    return UpstreamLimiter(
+        TokenBucket(rate=rate, capacity=capacity),
+        AdaptiveConcurrencyLimiter(initial=initial, min_limit=1, max_limit=32),
+    )
+
+
+def test_token_bucket_paces_requests():
+    """令牌用完后按 rate 补充"""
+    logger.info("--- 测试令牌桶限速 ---")
+
+    async def run():
+        bucket = TokenBucket(rate=50.0, capacity=2.0)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+    # 前 2 个令牌立即可用，剩下 3 个约需 3 / 50 = 0.06 秒
+    assert 0.04 <= elapsed < 0.5, f"令牌桶耗时异常: {elapsed:.3f}s"
+
+
+def test_success_grows_limit_additively():
+    """正常响应每个窗口约 +1"""
+    logger.info("--- 测试 AIMD 加性增长 ---")
+    limiter = _limiter(initial=4)
+
+    async def run():
+        for _ in range(4):
+            async with limiter.slot() as permit:
+                permit.record(200, 0.01)
+
+    asyncio.run(run())
+    assert 4.9 < limiter.concurrency.limit < 5.1, f"并发限制应增长约 1: {limiter.concurrency.limit}"
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_overload_backs_off():
+    """429、5xx 和超时都会乘性减小并发限制，429 的 Retry-After 会暂停令牌桶"""
+    logger.info("--- 测试 AIMD 乘性减小 ---")
+    limiter = _limiter(initial=16)
+
+    async def run():
+        async with limiter.slot() as permit:
+            permit.record(503, 0.01)
+        async with limiter.slot() as permit:
+            permit.record_timeout()
+        async with limiter.slot() as permit:
+            permit.record(429, 0.01, retry_after=5.0)
+
+    asyncio.run(run())
+    assert limiter.concurrency.limit == 2.0, f"三次过载后应为 16 * 0.5^3: {limiter.concurrency.limit}"
+    assert limiter.concurrency.backoffs == 3
+    assert limiter.throttled == 1
+    assert limiter.bucket._blocked_until > time.monotonic() + 4, "Retry-After 期间令牌桶不应发放令牌。"
+
+
+def test_cancelled_permit_does_not_back_off():
+    """请求被取消 (包括还在等令牌时) 只归还名额，不调整并发限制"""
+    logger.info("--- 测试被取消的请求不触发退避 ---")
+    limiter = _limiter(rate=1.0, capacity=1.0, initial=8)
+
+    async def hold():
+        async with limiter.slot():
+            await asyncio.sleep(60)
+
+    async def run():
+        # 桶里只有 1 个令牌：第一个请求拿到令牌后挂起，第二个请求卡在等令牌
+        tasks = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert limiter.concurrency.in_flight == 2
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    assert limiter.concurrency.limit == 8.0, f"取消不应改变并发限制: {limiter.concurrency.limit}"
+    assert limiter.concurrency.backoffs == 0
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_limit_caps_in_flight():
+    """同时在途的请求数不超过当前并发限制"""
+    logger.info("--- 测试并发上限 ---")
+    limiter = _limiter(initial=3)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot() as permit:
+            peak = max(peak, limiter.concurrency.in_flight)
+            await asyncio.sleep(0.01)
+            permit.record(200, 0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(12)))
+
+    asyncio.run(run())
+    assert peak <= 4, f"在途请求峰值超过限制: {peak}"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行限流器测试 =====")
+    test_token_bucket_paces_requests()
+    test_success_grows_limit_additively()
+    test_overload_backs_off()
+    test_cancelled_permit_does_not_back_off()
+    test_limit_caps_in_flight()
+    logger.info("===== 所有限流器测试完成 =====")
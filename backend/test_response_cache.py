@@ -0,0 +1,97 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.response_cache import ResponseCache
+from app.utils.logger import logger
+
+URL = "https://api.example.com/twitter/user/search"
+TTLS = {"/twitter/user/search": 3600}
+
+
+def _files(directory: str) -> list:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".zz"))
+
+
+def test_memory_hit_returns_original_body():
+    """命中时返回解压后的原始响应体，未配置 TTL 的端点不缓存"""
+    logger.info("--- 测试内存层命中 ---")
+    cache = ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024)
+    key = cache.make_key(URL, {"query": " Tesla "})
+    assert key == cache.make_key(URL, {"query": "tesla"})
+    assert cache.ttl_for("https://api.example.com/twitter/user/last_tweets") == 0
+
+    async def run():
+        assert await cache.get(key, 3600) is None
+        await cache.set(key, b'{"users": []}' * 100)
+        return await cache.get(key, 3600)
+
+    assert asyncio.run(run()) == b'{"users": []}' * 100
+    assert cache.counters["memory_hits"] == 1 and cache.counters["misses"] == 1
+
+
+def test_disk_hit_keeps_original_age():
+    """另一个进程写入的磁盘条目读回内存时沿用原写入时间，过期后不再命中"""
+    logger.info("--- 测试磁盘层命中 ---")
+    directory = tempfile.mkdtemp()
+    key = ResponseCache.make_key(URL, {"query": "tesla"})
+    asyncio.run(ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024, disk_dir=directory).set(key, b"{}"))
+
+    cache = ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024, disk_dir=directory)
+    assert asyncio.run(cache.get(key, 3600)) == b"{}"
+    assert cache.counters["disk_hits"] == 1
+    _, age = cache.memory.get(key)
+    assert age < 5
+
+    # 以 1 秒的 TTL 读取：已经写入 1 秒以上的条目既不应从磁盘命中，也不应因为读回内存而被续期
+    time.sleep(1.05)
+    assert asyncio.run(cache.get(key, 1)) is None
+
+
+def test_disk_directory_is_capped():
+    """磁盘目录超出上限时从最旧的文件开始删除"""
+    logger.info("--- 测试磁盘容量上限 ---")
+    directory = tempfile.mkdtemp()
+    cache = ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024, disk_dir=directory, disk_max_bytes=20_000)
+
+    async def run():
+        for i in range(20):
+            # 随机字节压缩不了，每个文件约 2 KB
+            await cache.set(cache.make_key(URL, {"query": f"q{i}"}), os.urandom(2000))
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    total = sum(os.path.getsize(os.path.join(directory, name)) for name in _files(directory))
+    assert total <= 20_000, f"磁盘缓存超出上限: {total}"
+    assert cache.counters["disk_evictions"] > 0
+    newest = cache._disk_path(cache.make_key(URL, {"query": "q19"}))
+    oldest = cache._disk_path(cache.make_key(URL, {"query": "q0"}))
+    assert os.path.exists(newest) and not os.path.exists(oldest), "应优先删除最旧的文件。"
+
+
+def test_expired_files_are_swept_on_startup():
+    """启动时删除已超过最长 TTL 的文件，不必等到被读取"""
+    logger.info("--- 测试启动时清扫过期文件 ---")
+    directory = tempfile.mkdtemp()
+    writer = ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024, disk_dir=directory)
+    asyncio.run(writer.set(writer.make_key(URL, {"query": "old"}), b"{}"))
+    asyncio.run(writer.set(writer.make_key(URL, {"query": "new"}), b"{}"))
+    old_path = writer._disk_path(writer.make_key(URL, {"query": "old"}))
+    past = time.time() - 7200
+    os.utime(old_path, (past, past))
+
+    ResponseCache(endpoint_ttls=TTLS, max_bytes=1024 * 1024, disk_dir=directory)
+    assert not os.path.exists(old_path)
+    assert len(_files(directory)) == 1
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行上游响应缓存测试 =====")
+    test_memory_hit_returns_original_body()
+    test_disk_hit_keeps_original_age()
+    test_disk_directory_is_capped()
+    test_expired_files_are_swept_on_startup()
+    logger.info("===== 所有上游响应缓存测试完成 =====")
@@ -0,0 +1,136 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.data.models.database import Base
+from app.services import result_cache as result_cache_module
+from app.services.result_cache import TieredResultCache
+from app.utils.cache import LRUCache
+from app.utils.logger import logger
+
+
+def _use_temp_database():
+    """每个测试使用独立的临时 SQLite 数据库"""
+    path = os.path.join(tempfile.mkdtemp(), "result_cache.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    result_cache_module.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _cache(**kwargs) -> TieredResultCache:
+    options = dict(max_entries=10, memory_ttl=60, persistent_ttl=600, stale_ttl=60, persistent=False)
+    options.update(kwargs)
+    return TieredResultCache(**options)
+
+
+class _Counter:
+    def __init__(self, value="fresh"):
+        self.calls = 0
+        self.value = value
+
+    async def __call__(self):
+        self.calls += 1
+        return [{"value": self.value, "call": self.calls}]
+
+
+def test_lru_evicts_oldest_and_keeps_stored_at():
+    """超出条目上限时淘汰最久未使用的条目；stored_at 决定条目年龄"""
+    logger.info("--- 测试 LRU 淘汰与写入时间 ---")
+    cache = LRUCache(max_entries=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a")[0] == 1 and cache.evictions == 1
+
+    cache.set("old", 4, stored_at=time.time() - 8)
+    assert 7.9 < cache.get("old")[1] < 9
+    cache.set("expired", 5, stored_at=time.time() - 11)
+    assert cache.get("expired") is None
+
+
+def test_memory_hit_and_miss():
+    """未命中时计算并写入，之后直接命中内存层"""
+    logger.info("--- 测试内存层命中 ---")
+    cache = _cache()
+    compute = _Counter()
+
+    async def run():
+        first = await cache.get_or_compute("k", compute)
+        second = await cache.get_or_compute("k", compute)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second and compute.calls == 1
+    assert cache.counters["misses"] == 1 and cache.counters["memory_hits"] == 1
+
+
+def test_stale_while_revalidate():
+    """过期但在 stale 窗口内的条目立即返回，同时在后台刷新"""
+    logger.info("--- 测试 stale-while-revalidate ---")
+    cache = _cache()
+    cache.memory.set("k", [{"value": "stale"}], stored_at=time.time() - 90)
+    compute = _Counter()
+
+    async def run():
+        served = await cache.get_or_compute("k", compute)
+        await asyncio.sleep(0.05)
+        return served, await cache.get_or_compute("k", compute)
+
+    served, refreshed = asyncio.run(run())
+    assert served == [{"value": "stale"}]
+    assert refreshed[0]["value"] == "fresh" and compute.calls == 1
+    assert cache.counters["stale_hits"] == 1 and cache.counters["refreshes"] == 1
+
+
+def test_uncacheable_results_are_not_stored():
+    """cacheable 返回 False 的结果 (如错误结果) 不写入缓存"""
+    logger.info("--- 测试不可缓存的结果 ---")
+    cache = _cache(cacheable=lambda value: value[0]["value"] != "error")
+    compute = _Counter("error")
+
+    async def run():
+        await cache.get_or_compute("k", compute)
+        await cache.get_or_compute("k", compute)
+
+    asyncio.run(run())
+    assert compute.calls == 2 and len(cache.memory) == 0
+
+
+def test_persistent_hit_keeps_original_age():
+    """持久化层命中写回内存层时沿用原写入时间，不会延长有效期"""
+    logger.info("--- 测试持久化层命中不延长有效期 ---")
+    _use_temp_database()
+    cache = _cache(memory_ttl=60, persistent_ttl=600, stale_ttl=60, persistent=True)
+    cache.persistent.set("k", [{"value": "stored"}])
+    # 模拟另一个 worker 在 500 秒前写入的条目
+    db = result_cache_module.SessionLocal()
+    try:
+        row = db.get(result_cache_module.ResultCacheEntry, "k")
+        row.stored_at = time.time() - 500
+        db.commit()
+    finally:
+        db.close()
+
+    compute = _Counter()
+    value = asyncio.run(cache.get_or_compute("k", compute))
+    assert value == [{"value": "stored"}] and cache.counters["persistent_hits"] == 1
+    cached = cache.memory.get("k")
+    assert cached is None or cached[1] >= 500, "内存层不应把读回的条目当作新写入的。"
+    assert compute.calls == 0
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行结果缓存测试 =====")
+    test_lru_evicts_oldest_and_keeps_stored_at()
+    test_memory_hit_and_miss()
+    test_stale_while_revalidate()
+    test_uncacheable_results_are_not_stored()
+    test_persistent_hit_keeps_original_age()
+    logger.info("===== 所有结果缓存测试完成 =====")
@@ -0,0 +1,103 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.data.collectors.scheduler import CollectionScheduler
+from app.utils.logger import logger
+
+
+class _FakeCollector:
+    """代替 IncrementalCollector：直接产出数据源给出的批次，不写数据库"""
+
+    async def iter_posts(self, platform, query, stream, merge_stored=True):
+        async for batch in stream(None):
+            yield batch
+
+
+def _scheduler(source, **kwargs) -> CollectionScheduler:
+    return CollectionScheduler(
+        sources={"twitter": source},
+        collector=_FakeCollector(),
+        tracked_keywords=["tesla"],
+        refresh_interval=600.0,
+        fresh_for=900.0,
+        tick_interval=10.0,
+        **kwargs,
+    )
+
+
+def _ok_source(query):
+    async def stream(since_id=None):
+        yield [{"url": f"https://example.com/{query}"}]
+    return stream
+
+
+def _failing_source(query):
+    async def stream(since_id=None):
+        raise RuntimeError("upstream down")
+        yield []
+    return stream
+
+
+def test_stale_pinned_keyword_is_queued_once():
+    """从未收集过的固定关键词进入队列，已在队列中的不会重复入队"""
+    logger.info("--- 测试调度入队 ---")
+    scheduler = _scheduler(_ok_source)
+    scheduler._schedule()
+    scheduler._schedule()
+    assert [job[2:] for job in scheduler._heap] == [("tesla", "twitter")]
+
+
+def test_request_collection_marks_keyword_fresh():
+    """用户请求从上游收集后调用 mark_collected，后台不会立刻重复收集"""
+    logger.info("--- 测试请求路径刷新新鲜度 ---")
+    scheduler = _scheduler(_ok_source)
+    assert not scheduler.is_fresh("twitter", "Tesla")
+    scheduler.mark_collected("twitter", "Tesla")
+    assert scheduler.is_fresh("twitter", "tesla")
+    scheduler._schedule()
+    assert not scheduler._heap, "刚收集过的关键词不应入队。"
+
+    # 未被跟踪的关键词不会因为请求而被加入跟踪
+    scheduler.mark_collected("twitter", "one-off query")
+    assert "one-off query" not in scheduler._keywords
+
+
+def test_successful_job_updates_freshness():
+    """后台任务成功后记录收集时间"""
+    logger.info("--- 测试后台任务成功 ---")
+    scheduler = _scheduler(_ok_source)
+    asyncio.run(scheduler._run_job("tesla", "twitter"))
+    assert scheduler.counters["posts_collected"] == 1
+    assert scheduler.is_fresh("twitter", "tesla")
+
+
+def test_failing_job_backs_off_exponentially():
+    """失败的任务按指数退避，退避期间不会每个周期都重新入队"""
+    logger.info("--- 测试失败退避 ---")
+    scheduler = _scheduler(_failing_source, max_backoff=60.0)
+    keyword = scheduler._keywords["tesla"]
+    delays = []
+    for _ in range(4):
+        asyncio.run(scheduler._run_job("tesla", "twitter"))
+        delays.append(round(keyword.retry_at["twitter"] - time.time()))
+    assert delays == [20, 40, 60, 60], f"退避时间不符合预期: {delays}"
+    assert scheduler.counters["jobs_failed"] == 4
+
+    scheduler._schedule()
+    assert not scheduler._heap, "退避期间不应重新入队。"
+
+    keyword.retry_at["twitter"] = time.time() - 1
+    scheduler._schedule()
+    assert len(scheduler._heap) == 1, "退避结束后应重新入队。"
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行后台收集调度测试 =====")
+    test_stale_pinned_keyword_is_queued_once()
+    test_request_collection_marks_keyword_fresh()
+    test_successful_job_updates_freshness()
+    test_failing_job_backs_off_exponentially()
+    logger.info("===== 所有后台收集调度测试完成 =====")
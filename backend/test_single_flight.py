@@ -0,0 +1,96 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.logger import logger
+from app.utils.query import normalize_query
+from app.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """相同 key 的并发调用只执行一次，所有等待者拿到同一个结果"""
+    logger.info("--- 测试请求合并 ---")
+    flight = SingleFlight()
+    executions = 0
+
+    async def compute():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.05)
+        return {"value": executions}
+
+    async def run():
+        queries = ["Tesla", "  tesla ", "TESLA", "openai"]
+        return await asyncio.gather(*(
+            flight.do(normalize_query(query), compute) for query in queries
+        ))
+
+    results = asyncio.run(run())
+    assert results[0] is results[1] is results[2]
+    assert executions == 2
+    assert flight.stats() == {"calls": 4, "executions": 2, "coalesced": 2, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter():
+    """计算抛出的异常传递给每一个等待者，之后同一个 key 重新计算"""
+    logger.info("--- 测试异常传递 ---")
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        return results, await flight.do("k", ok)
+
+    results, retried = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "ok"
+
+
+def test_cancellation_of_one_waiter_does_not_affect_others():
+    """单个等待者被取消不影响其他等待者；所有等待者都离开时才取消底层计算"""
+    logger.info("--- 测试取消 ---")
+    flight = SingleFlight()
+    finished = []
+
+    async def compute():
+        try:
+            await asyncio.sleep(0.1)
+            finished.append(True)
+            return "done"
+        except asyncio.CancelledError:
+            finished.append(False)
+            raise
+
+    async def run():
+        first = asyncio.create_task(flight.do("a", compute))
+        second = asyncio.create_task(flight.do("a", compute))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        shared = await second
+
+        lonely = asyncio.create_task(flight.do("b", compute))
+        await asyncio.sleep(0.02)
+        lonely.cancel()
+        await asyncio.gather(lonely, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return first.cancelled(), shared
+
+    cancelled, shared = asyncio.run(run())
+    assert cancelled and shared == "done"
+    assert finished == [True, False], "只剩一个等待者离开时应取消底层计算。"
+    assert flight.stats()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行请求合并测试 =====")
+    test_concurrent_calls_share_one_execution()
+    test_errors_reach_every_waiter()
+    test_cancellation_of_one_waiter_does_not_affect_others()
+    logger.info("===== 所有请求合并测试完成 =====")
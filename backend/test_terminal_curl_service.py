@@ -1,12 +1,13 @@
 import sys
 import os
+import asyncio
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.config import settings
 from app.services.terminal_curl_service import TerminalCurlService
 from app.utils.logger import logger
 
-def test_terminal_curl_service():
+async def test_terminal_curl_service():
     """
     测试完全模拟终端的 curl Twitter 服务
     """
@@ -17,7 +18,7 @@ def test_terminal_curl_service():
     
     # 1. 测试连接
     logger.info("\n1. 测试连接...")
-    if service.test_connection():
+    if await service.test_connection():
         logger.info("✅ 连接测试通过")
     else:
         logger.error("❌ 连接测试失败")
@@ -25,7 +26,7 @@ def test_terminal_curl_service():
     
     # 2. 测试用户搜索
     logger.info("\n2. 测试用户搜索...")
-    users = service.search_users("tesla", count=5)
+    users = await service.search_users("tesla", count=5)
     
     if users:
         logger.info(f"✅ 成功获取 {len(users)} 个用户")
@@ -37,7 +38,7 @@ def test_terminal_curl_service():
     
     # 3. 测试趋势内容生成
     logger.info("\n3. 测试趋势内容生成...")
-    trending_content = service.get_trending_content_via_users("tesla", limit=10)
+    trending_content = await service.get_trending_content_via_users("tesla", limit=10)
     
     if trending_content:
         logger.info(f"✅ 成功生成 {len(trending_content)} 条趋势内容")
@@ -52,7 +53,7 @@ def test_terminal_curl_service():
     return True
 
 if __name__ == "__main__":
-    success = test_terminal_curl_service()
+    success = asyncio.run(test_terminal_curl_service())
     if not success:
         logger.error("❌ 服务测试失败")
         sys.exit(1)
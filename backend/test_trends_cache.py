@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import trends
+from app.services.result_cache import TieredResultCache
+from app.utils.logger import logger
+
+app = FastAPI()
+app.include_router(trends.router, prefix="/api/v1/analyze-trends")
+client = TestClient(app)
+
+
+def _request_twice(results: list) -> int:
+    """用内存结果缓存连续请求两次同一关键词，返回实际执行分析的次数"""
+    calls = 0
+
+    async def analyze(query, tier):
+        nonlocal calls
+        calls += 1
+        return [dict(result) for result in results]
+
+    original = trends._analyze_query, trends.result_cache, trends.llm_provider
+    trends._analyze_query = analyze
+    trends.result_cache = TieredResultCache(
+        max_entries=10, memory_ttl=60, persistent_ttl=600, stale_ttl=60, persistent=False,
+        cacheable=trends._is_cacheable,
+    )
+    trends.llm_provider = trends.llm_provider or object()
+    try:
+        for _ in range(2):
+            response = client.get("/api/v1/analyze-trends/", params={"query": "tesla"})
+            assert response.status_code == 200, response.text
+    finally:
+        trends._analyze_query, trends.result_cache, trends.llm_provider = original
+    return calls
+
+
+def test_complete_results_are_cached():
+    """所有数据源都按时返回的结果进入缓存，第二次请求直接命中"""
+    logger.info("--- 测试完整结果进入缓存 ---")
+    assert _request_twice([{"title": "测试话题", "category": "热门讨论", "missed_sources": []}]) == 1
+
+
+def test_partial_results_are_not_cached():
+    """有数据源超时的部分结果不缓存，下一次请求重新抓取"""
+    logger.info("--- 测试部分结果不进入缓存 ---")
+    assert not trends._is_cacheable([{"title": "测试话题", "missed_sources": ["twitter"]}])
+    assert not trends._is_cacheable([{"title": "测试话题", "degraded": True}])
+    assert not trends._is_cacheable([{"category": "Error"}]) and not trends._is_cacheable([])
+    assert _request_twice([{"title": "测试话题", "category": "热门讨论", "missed_sources": ["twitter"]}]) == 2
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行趋势结果缓存测试 =====")
+    test_complete_results_are_cached()
+    test_partial_results_are_not_cached()
+    logger.info("===== 所有趋势结果缓存测试完成 =====")
@@ -0,0 +1,122 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import trends
+from app.data.models.database import RawPost
+from app.services.fan_out import FanOutResult
+from app.utils.logger import logger
+
+app = FastAPI()
+app.include_router(trends.router, prefix="/api/v1/analyze-trends")
+client = TestClient(app)
+
+
+class _StreamingProvider:
+    """逐段产出 token，最后产出完整结果的 LLM"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    async def astream_insights_for_cluster(self, cluster_posts, tier=None):
+        for piece in ('{"title": ', '"测试话题"}'):
+            yield {"type": "token", "content": piece}
+        if self.fail:
+            raise RuntimeError("llm down")
+        yield {"type": "result", "data": {"title": "测试话题", "posts": len(cluster_posts), "tier": tier}}
+
+
+def _collector(posts_by_source, missed=None, fail: bool = False):
+    async def collect(query, on_batch=None):
+        result = FanOutResult()
+        for source, posts in posts_by_source.items():
+            result.posts_by_source[source] = posts
+            if on_batch is not None:
+                on_batch(source, posts)
+        if fail:
+            raise RuntimeError("upstream down")
+        result.missed_sources = missed or {}
+        raw_posts = [RawPost(platform=source, text=post["text"]) for source, posts in posts_by_source.items() for post in posts]
+        return result, raw_posts
+    return collect
+
+
+def _events(response) -> list:
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream(collect, provider, query: str = " Tesla ") -> list:
+    original = trends._collect_posts, trends.llm_provider
+    trends._collect_posts, trends.llm_provider = collect, provider
+    try:
+        response = client.get("/api/v1/analyze-trends/stream", params={"query": query, "tier": "fast"})
+    finally:
+        trends._collect_posts, trends.llm_provider = original
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response)
+
+
+def test_stream_reports_progress_tokens_and_result():
+    """依次推送阶段进度、数据源批次、LLM 输出片段和最终结果"""
+    logger.info("--- 测试 SSE 事件顺序 ---")
+    collect = _collector({"twitter": [{"text": "a"}, {"text": "b"}], "reddit": [{"text": "c"}]}, {"reddit": "timeout"})
+    events = _stream(collect, _StreamingProvider())
+
+    assert [name for name, _ in events] == [
+        "stage", "batch", "batch", "stage", "stage", "stage", "token", "token", "result",
+    ]
+    assert events[0][1] == {"stage": "collecting", "query": "tesla"}
+    assert events[1][1] == {"source": "twitter", "posts": 2}
+    assert events[3][1]["posts_by_source"] == {"twitter": 2, "reddit": 1}
+    assert events[4][1] == {"stage": "deduplicated", "unique_posts": 3}
+    assert "".join(data["content"] for name, data in events if name == "token") == '{"title": "测试话题"}'
+    assert events[-1][1] == [{"title": "测试话题", "posts": 3, "tier": "fast", "missed_sources": ["reddit"]}]
+
+
+def test_stream_without_posts_returns_empty_result():
+    """没有抓到帖子时不调用 LLM，直接返回空结果"""
+    logger.info("--- 测试没有帖子时的 SSE ---")
+    events = _stream(_collector({"twitter": []}), _StreamingProvider())
+    assert events[-1] == ("result", [])
+    assert "token" not in [name for name, _ in events]
+
+
+def test_stream_reports_errors_as_events():
+    """抓取或 LLM 阶段失败时推送 error 事件，而不是中断连接"""
+    logger.info("--- 测试 SSE 错误事件 ---")
+    events = _stream(_collector({"twitter": [{"text": "a"}]}, fail=True), _StreamingProvider())
+    assert [name for name, _ in events] == ["stage", "batch", "error"]
+
+    events = _stream(_collector({"twitter": [{"text": "a"}]}), _StreamingProvider(fail=True))
+    assert events[-1][0] == "error" and "llm down" in events[-1][1]["detail"]
+    assert "result" not in [name for name, _ in events]
+
+
+def test_stream_requires_llm_provider():
+    """LLM 未配置时返回 503"""
+    logger.info("--- 测试 LLM 未配置 ---")
+    original = trends.llm_provider
+    trends.llm_provider = None
+    try:
+        response = client.get("/api/v1/analyze-trends/stream", params={"query": "tesla"})
+    finally:
+        trends.llm_provider = original
+    assert response.status_code == 503
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行趋势分析 SSE 测试 =====")
+    test_stream_reports_progress_tokens_and_result()
+    test_stream_without_posts_returns_empty_result()
+    test_stream_reports_errors_as_events()
+    test_stream_requires_llm_provider()
+    logger.info("===== 所有趋势分析 SSE 测试完成 =====")
@@ -0,0 +1,191 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.core.config import settings
+from app.services.api_key_pool import ApiKeyPool
+from app.services.http_transport import HttpTransport
+from app.services.social_media_service import SocialMediaService
+from app.services.working_social_media_service import WorkingSocialMediaService
+from app.utils.logger import logger
+
+
+def _user(name: str, followers: int = 0) -> dict:
+    return {"id": name, "screen_name": name, "name": f"{name} tesla fan", "followers_count": followers}
+
+
+def _tweets(name: str, count: int = 2, first_id: int = 100) -> list:
+    return [
+        {"id": str(first_id + i), "text": f"{name} tweet {i}", "likeCount": i, "author": {"userName": name}}
+        for i in range(count)
+    ]
+
+
+class _Upstream:
+    """模拟 twitterapi.io：按 cursor 分页返回用户，按用户名返回最近推文"""
+
+    def __init__(self, pages, timelines=None):
+        self.pages = pages
+        self.timelines = timelines or {}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.url.path, dict(request.url.params)))
+        if request.url.path == "/twitter/user/search":
+            page = int(request.url.params.get("cursor", "0"))
+            has_next = page + 1 < len(self.pages)
+            return httpx.Response(200, json={
+                "users": self.pages[page],
+                "has_next_page": has_next,
+                "next_cursor": str(page + 1) if has_next else "",
+            })
+        name = request.url.params["userName"]
+        return httpx.Response(200, json={"data": {"tweets": self.timelines.get(name, _tweets(name))}})
+
+    def count(self, path: str) -> int:
+        return sum(1 for seen, _ in self.requests if seen == path)
+
+
+def _service(upstream: _Upstream, host: str) -> WorkingSocialMediaService:
+    """不走共享的传输层和 Key 池，避免测试请求真实上游或读写响应缓存"""
+    service = WorkingSocialMediaService.__new__(WorkingSocialMediaService)
+    service.twitter_base_url = f"https://{host}"
+    service.key_pool = ApiKeyPool(["test-key-0000"])
+    service.transport = HttpTransport()
+    service.transport._client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    return service
+
+
+def _collect(service: WorkingSocialMediaService, query: str, limit: int, **kwargs) -> list:
+    async def run():
+        try:
+            return [batch async for batch in service.iter_twitter_posts(query, limit, **kwargs)]
+        finally:
+            await service.transport.aclose()
+    return asyncio.run(run())
+
+
+def test_follows_cursor_page_by_page():
+    """沿 next_cursor 翻页，每个用户的推文作为一批产出"""
+    logger.info("--- 测试按页流式产出 ---")
+    upstream = _Upstream([[_user("a")], [_user("b")], [_user("c")]])
+    batches = _collect(_service(upstream, "collector-pages.test"), "tesla", limit=100)
+
+    assert [[post["author"] for post in batch] for batch in batches] == [["a", "a"], ["b", "b"], ["c", "c"]]
+    assert upstream.count("/twitter/user/search") == 3
+    assert batches[0][0]["platform"] == "twitter" and batches[0][0]["text"] == "a tweet 0"
+
+
+def test_stops_at_limit_and_max_pages():
+    """凑够 limit 条或达到 COLLECTOR_MAX_PAGES 页后不再翻页"""
+    logger.info("--- 测试 limit 与最大页数 ---")
+    upstream = _Upstream([[_user(f"u{i}")] for i in range(5)])
+    batches = _collect(_service(upstream, "collector-limit.test"), "tesla", limit=3)
+    assert sum(len(batch) for batch in batches) == 3
+    assert upstream.count("/twitter/user/search") == 2
+
+    max_pages = settings.COLLECTOR_MAX_PAGES
+    settings.COLLECTOR_MAX_PAGES = 2
+    try:
+        upstream = _Upstream([[_user(f"u{i}")] for i in range(5)])
+        _collect(_service(upstream, "collector-max-pages.test"), "tesla", limit=100)
+    finally:
+        settings.COLLECTOR_MAX_PAGES = max_pages
+    assert upstream.count("/twitter/user/search") == 2
+
+
+def test_default_stream_yields_one_batch():
+    """基类的默认实现把 get_* 的全部结果作为一批产出，空结果不产出"""
+    logger.info("--- 测试默认的流式实现 ---")
+
+    class _Static(SocialMediaService):
+        async def get_twitter_posts(self, query, limit=100):
+            return [{"id": 1}, {"id": 2}]
+
+        async def get_reddit_posts(self, subreddit, limit=100):
+            return []
+
+    async def run():
+        service = _Static()
+        twitter = [batch async for batch in service.iter_twitter_posts("tesla")]
+        reddit = [batch async for batch in service.iter_reddit_posts("tesla")]
+        return twitter, reddit
+
+    assert asyncio.run(run()) == ([[{"id": 1}, {"id": 2}]], [])
+
+
+def test_timelines_of_most_followed_users():
+    """只拉取粉丝最多的 TWITTER_TIMELINE_MAX_USERS 个相关用户的推文"""
+    logger.info("--- 测试按粉丝数选取用户 ---")
+    users = [_user("small", 10), _user("big", 1000), _user("mid", 100), {"screen_name": "other", "name": "x"}]
+    upstream = _Upstream([users])
+    max_users = settings.TWITTER_TIMELINE_MAX_USERS
+    settings.TWITTER_TIMELINE_MAX_USERS = 2
+    try:
+        batches = _collect(_service(upstream, "collector-ranking.test"), "tesla", limit=100)
+    finally:
+        settings.TWITTER_TIMELINE_MAX_USERS = max_users
+
+    fetched = sorted(params["userName"] for path, params in upstream.requests if path == "/twitter/user/last_tweets")
+    assert fetched == ["big", "mid"]
+    followers = {batch[0]["author"]: batch[0]["user_info"]["followers"] for batch in batches}
+    assert followers == {"big": 1000, "mid": 100}
+
+
+def test_since_id_and_tweets_per_user():
+    """只产出比 since_id 更新的推文，每个用户最多 TWITTER_TWEETS_PER_USER 条"""
+    logger.info("--- 测试 since_id 与每用户条数 ---")
+    upstream = _Upstream([[_user("a")]], {"a": _tweets("a", count=5, first_id=100)})
+    per_user = settings.TWITTER_TWEETS_PER_USER
+    settings.TWITTER_TWEETS_PER_USER = 4
+    try:
+        batches = _collect(_service(upstream, "collector-since.test"), "tesla", limit=100, since_id="101")
+    finally:
+        settings.TWITTER_TWEETS_PER_USER = per_user
+    assert [post["id"] for batch in batches for post in batch] == ["102", "103"]
+
+
+def test_call_budget_caps_search_and_timelines():
+    """一次查询的搜索翻页和用户推文请求合计不超过 TWITTER_CALL_BUDGET"""
+    logger.info("--- 测试上游调用预算 ---")
+    upstream = _Upstream([[_user(f"u{i}", i) for i in range(4)] for _ in range(3)])
+    budget = settings.TWITTER_CALL_BUDGET
+    settings.TWITTER_CALL_BUDGET = 6
+    try:
+        _collect(_service(upstream, "collector-budget.test"), "tesla", limit=100)
+    finally:
+        settings.TWITTER_CALL_BUDGET = budget
+    assert len(upstream.requests) == 6, f"上游请求数超出预算: {len(upstream.requests)}"
+    assert upstream.count("/twitter/user/search") == 2
+
+
+def test_refresh_stops_paging_at_the_watermark():
+    """增量刷新时一页用户的推文全部不新于 since_id 就停止翻页，不再花费调用预算"""
+    logger.info("--- 测试水位线停止翻页 ---")
+    pages = [[_user(f"u{page}-{i}", 10 - i) for i in range(2)] for page in range(3)]
+    upstream = _Upstream(pages)
+    batches = _collect(_service(upstream, "collector-watermark.test"), "tesla", limit=100, since_id="200")
+    assert batches == []
+    assert upstream.count("/twitter/user/search") == 1, "第一页没有新推文时不应继续翻页。"
+    assert upstream.count("/twitter/user/last_tweets") == 2
+
+    # 有新推文的页照常继续翻页
+    upstream = _Upstream(pages, {"u0-0": _tweets("u0-0", first_id=300)})
+    batches = _collect(_service(upstream, "collector-watermark-new.test"), "tesla", limit=100, since_id="200")
+    assert [post["id"] for batch in batches for post in batch] == ["300", "301"]
+    assert upstream.count("/twitter/user/search") == 2
+
+
+if __name__ == "__main__":
+    logger.info("===== 开始执行 Twitter 收集器测试 =====")
+    test_follows_cursor_page_by_page()
+    test_stops_at_limit_and_max_pages()
+    test_default_stream_yields_one_batch()
+    test_timelines_of_most_followed_users()
+    test_since_id_and_tweets_per_user()
+    test_call_budget_caps_search_and_timelines()
+    test_refresh_stops_paging_at_the_watermark()
+    logger.info("===== 所有 Twitter 收集器测试完成 =====")